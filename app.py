@@ -1,7 +1,31 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, make_response, abort
-from flask_mysqldb import MySQL
+from flask import Flask, render_template, request, redirect, url_for, flash, session, make_response, abort, g, Response, stream_with_context
 import MySQLdb.cursors
+import hmac
+import os
+import datetime
 from functools import wraps
+from occupancy_index import OccupancyIndex
+import timetable_generator
+import timetable_grid
+import student_reports
+import bulk_import
+import timetable_export
+import calendar_feeds
+import class_attendance
+import attendance_rollups
+import cascade_delete
+import dashboard_metrics
+import room_heatmap
+import schedule_validation
+import schedule_clone
+import schedule_options
+import sql_metrics
+import static_assets
+from reference_cache import ReferenceCache
+from db_pool import PooledMySQL, PoolTimeout
+from data_versions import read_versions, code_version, VersionedConnection
+from http_cache import conditional_page
+from pagination import ListQuery, paginate
 
 # Role-based access decorator
 def role_required(*roles):
@@ -35,14 +59,146 @@ ROOM_COLORS = [
     '#FFA07A', '#20B2AA', '#87CEEB'
 ]
 
+# schedule.DayNo ordinal for each day name (see migrations/0001_schedule_day_ordinal.sql)
+DAY_NUMBERS = {'Monday': 1, 'Tuesday': 2, 'Wednesday': 3, 'Thursday': 4, 'Friday': 5, 'Saturday': 6, 'Sunday': 7}
+
 # Configure MySQL connection (XAMPP settings)
 app.config['MYSQL_HOST'] = 'localhost'
 app.config['MYSQL_USER'] = 'root'  # Default MySQL username in XAMPP
 app.config['MYSQL_PASSWORD'] = ''  # Default password for MySQL in XAMPP
 app.config['MYSQL_DB'] = 'timetable_system'  # Database name
 
-# Initialize MySQL
-mysql = MySQL(app)
+# Connection pool (see db_pool.py): connections kept open, extra ones allowed under load,
+# and how long a request waits for a free connection before failing
+app.config['MYSQL_POOL_SIZE'] = 10
+app.config['MYSQL_POOL_MAX_OVERFLOW'] = 10
+app.config['MYSQL_POOL_TIMEOUT'] = 30
+
+# Optional read replica (see db_pool.py): the timetable views marked @mysql.replica_reads read from it
+# unless it lags more than MYSQL_REPLICA_MAX_LAG seconds or the browser wrote in the last
+# MYSQL_PRIMARY_AFTER_WRITE seconds; every write goes to MYSQL_HOST
+app.config['MYSQL_REPLICA_HOST'] = os.environ.get('MYSQL_REPLICA_HOST')
+app.config['MYSQL_REPLICA_PORT'] = int(os.environ.get('MYSQL_REPLICA_PORT', 3306))
+app.config['MYSQL_REPLICA_MAX_LAG'] = 5
+app.config['MYSQL_PRIMARY_AFTER_WRITE'] = 10
+
+# Initialize MySQL (mysql.connection is borrowed from the pool for each request);
+# its cursors time every statement for sql_metrics, and each commit bumps the
+# data_versions of the tables the transaction wrote
+class AppConnection(VersionedConnection, sql_metrics.InstrumentedConnection):
+    pass
+
+mysql = PooledMySQL(app, connection_class=AppConnection)
+
+@app.errorhandler(PoolTimeout)
+def pool_exhausted(e):
+    # Every pooled connection stayed busy for MYSQL_POOL_TIMEOUT seconds
+    print(f"Connection pool exhausted: {e}")
+    return "The server is busy. Please try again in a moment.", 503, {'Retry-After': '5'}
+
+# SQL instrumentation (see sql_metrics.py): statements slower than this are logged, and
+# /metrics also answers scrapers sending "Authorization: Bearer <METRICS_TOKEN>"
+app.config['SQL_SLOW_QUERY_SECONDS'] = 0.2
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+
+# Query counts, timings and rows per endpoint
+sql_stats = sql_metrics.SQLMetrics(slow_seconds=app.config['SQL_SLOW_QUERY_SECONDS'])
+
+@app.before_request
+def start_sql_metrics():
+    if request.endpoint != 'static':
+        sql_stats.start()
+
+@app.teardown_request
+def finish_sql_metrics(exception):
+    # After the response, so streamed exports are counted in full
+    sql_stats.finish(request.endpoint)
+
+# Static files may be cached by browsers for a week (revalidated by ETag after that)
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 7 * 24 * 3600
+
+# asset_url() in templates links the fingerprinted builds in static/dist (static_assets.py),
+# which are cached for a year without revalidation
+assets = static_assets.StaticAssets(app)
+
+def data_versions():
+    # Per-table versions from the data_versions table, read once per request
+    if 'data_versions' not in g:
+        cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        g.data_versions = read_versions(cur)
+        cur.close()
+    return g.data_versions
+
+# Read-only timetable pages answer If-None-Match with 304 while the data is unchanged
+timetable_page = conditional_page(data_versions, code_version(os.path.dirname(os.path.abspath(__file__)),
+                                                              files=('app.py', 'static/' + static_assets.MANIFEST)))
+
+# Cached reference tables (rooms, faculty, courses, ...) for dropdowns and grid headers.
+# Every route that writes one of these tables calls reference_cache.invalidate();
+# writes from other processes are picked up through data_versions().
+reference_cache = ReferenceCache()
+
+def reference_rows(tables, query):
+    # Rows for a reference-table query, loaded from MySQL only on a cache miss
+    # Versions from a lagging replica are older than ones already seen: serve the cache, don't fill it
+    current = reference_cache.observe(data_versions())
+    def load(sql):
+        cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        cur.execute(sql)
+        rows = cur.fetchall()
+        cur.close()
+        return rows
+    return reference_cache.get(tables, query, load, store=current)
+
+# Dashboard metrics, rebuilt at most every dashboard_metrics.TTL seconds and whenever the tables
+# they read change (data_versions); schedule_written() also drops them.
+dashboard_cache = dashboard_metrics.MetricsCache()
+
+def dashboard_payload():
+    return dashboard_cache.get(data_versions(), lambda: dashboard_metrics.compute(mysql.connection))
+
+# In-memory room/faculty/program occupancy used by the schedule conflict checks
+schedule_index = OccupancyIndex()
+
+def get_schedule_index():
+    # Built from MySQL the first time it is needed (and at startup in __main__), and
+    # rebuilt when schedule was written by another process since it was loaded
+    version = data_versions().get('schedule')
+    with schedule_index.lock:
+        if not schedule_index.loaded or schedule_index.version != version:
+            cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+            cur.execute("SELECT ScheduleID, CourseID, FacultyID, RoomID, SlotID, DayOfWeek, SemesterID, ProgramID FROM schedule")
+            schedule_index.load(cur.fetchall(), version)
+            cur.close()
+    return schedule_index
+
+def schedule_written():
+    # Our own committed write moved the schedule version by exactly one, whatever its row
+    # count (VersionedConnection bumps once per commit). Keep the index (already updated
+    # in place) if it was built at the version just before, else another writer got in.
+    version = mysql.connection.committed_versions.get('schedule')
+    with schedule_index.lock:
+        if version is not None and schedule_index.version == version - 1:
+            schedule_index.version = version
+        else:
+            schedule_index.invalidate()
+    dashboard_cache.invalidate()
+    g.pop('data_versions', None)
+
+# Deletes that take the rows referencing them along, ordered by the schema's foreign keys
+cascade = cascade_delete.CascadeDelete()
+
+def delete_with_dependents(table, id):
+    # One transaction, chunked by primary key; then drop what the caches held of the removed rows
+    plan = cascade.delete(mysql.connection, table, id)
+    reference_cache.invalidate(*plan.tables())
+    removed = plan.rows.get('schedule', ())
+    for schedule_id in removed:
+        schedule_index.remove(schedule_id)
+    if removed:
+        schedule_written()
+    g.pop('data_versions', None)
+    return plan
 
 
 
@@ -64,16 +220,16 @@ def index():
 @app.route('/dashboard')
 @role_required('admin')
 def dashboard():
-    cur = mysql.connection.cursor()
-    cur.execute("SELECT COUNT(*) FROM offered_programs")
-    total_offered_programs = cur.fetchone()[0]
-    cur.execute("SELECT COUNT(*) FROM rooms")
-    total_rooms = cur.fetchone()[0]
-    cur.execute("SELECT COUNT(*) FROM sessions")
-    total_sessions = cur.fetchone()[0]
+    metrics = dashboard_payload()
+    totals = metrics['totals']
+    return render_template('dashboard.html', metrics=metrics, total_offered_programs=totals['offered_programs'],
+                           total_rooms=totals['rooms'], total_sessions=totals['sessions'])
 
-    cur.close()
-    return render_template('dashboard.html', total_offered_programs=total_offered_programs, total_rooms=total_rooms, total_sessions=total_sessions)
+# Same payload as JSON, for dashboards that refresh themselves
+@app.route('/api/dashboard_metrics')
+@role_required('admin')
+def api_dashboard_metrics():
+    return jsonify(dashboard_payload())
 
 # -------------------- Departments --------------------
 
@@ -96,6 +252,7 @@ def add_department():
         cur = mysql.connection.cursor()
         cur.execute("INSERT INTO departments (DepartmentName) VALUES (%s)", (department_name,))
         mysql.connection.commit()
+        reference_cache.invalidate('departments')
         cur.close()
         return redirect(url_for('list_departments'))
     return render_template('departments/add_department.html')
@@ -112,6 +269,7 @@ def update_department(id):
         cur = mysql.connection.cursor()
         cur.execute("UPDATE departments SET DepartmentName = %s WHERE DepartmentID = %s", (department_name, id))
         mysql.connection.commit()
+        reference_cache.invalidate('departments')
         cur.close()
         return redirect(url_for('list_departments'))
     return render_template('departments/update_department.html', department=department)
@@ -120,55 +278,8 @@ def update_department(id):
 @app.route('/departments/delete/<int:id>', methods=['POST'])
 def delete_department(id):
     try:
-        cur = mysql.connection.cursor()
-        # Delete all related records in correct order to maintain referential integrity
-
-        # Delete related enrolled students (if any) via courses and students
-        cur.execute("""
-            DELETE es FROM enrolledstudents es
-            JOIN courses c ON es.CourseID = c.CourseID
-            WHERE c.DepartmentID = %s
-        """, (id,))
-        cur.execute("""
-            DELETE es FROM enrolledstudents es
-            JOIN students s ON es.StudentID = s.StudentID
-            WHERE s.DepartmentID = %s
-        """, (id,))
-
-        # Delete related attendance records via students and courses
-        cur.execute("""
-            DELETE a FROM attendance a
-            JOIN students s ON a.StudentID = s.StudentID
-            WHERE s.DepartmentID = %s
-        """, (id,))
-        cur.execute("""
-            DELETE a FROM attendance a
-            JOIN courses c ON a.CourseID = c.CourseID
-            WHERE c.DepartmentID = %s
-        """, (id,))
-
-        # Delete related timetables via courses
-        cur.execute("""
-            DELETE t FROM timetables t
-            JOIN courses c ON t.CourseID = c.CourseID
-            WHERE c.DepartmentID = %s
-        """, (id,))
-
-        # Delete related offered_courses via department
-        cur.execute("DELETE FROM offered_courses WHERE DepartmentID = %s", (id,))
-
-        # Delete related offered_programs
-        cur.execute("DELETE FROM offered_programs WHERE DepartmentID = %s", (id,))
-
-        # Delete related faculty, courses, students
-        cur.execute("DELETE FROM faculty WHERE DepartmentID = %s", (id,))
-        cur.execute("DELETE FROM courses WHERE DepartmentID = %s", (id,))
-        cur.execute("DELETE FROM students WHERE DepartmentID = %s", (id,))
-
-        # Now delete the department
-        cur.execute("DELETE FROM departments WHERE DepartmentID = %s", (id,))
-        mysql.connection.commit()
-        cur.close()
+        # Faculty, students, courses, programs and everything recorded against them go too
+        delete_with_dependents('departments', id)
         return redirect(url_for('list_departments'))
     except Exception as e:
         print(f"Error deleting department: {e}")
@@ -177,14 +288,26 @@ def delete_department(id):
 
 # -------------------- Faculty --------------------
 
+# Faculty list: one page at a time, sortable by name, filtered by department
+FACULTY_LIST = ListQuery(
+    select="f.FacultyID, f.FirstName, f.LastName, f.Email, d.DepartmentName",
+    joins="faculty f LEFT JOIN departments d ON f.DepartmentID = d.DepartmentID",
+    key='f.FacultyID',
+    sorts={'id': ('f.FacultyID', 'FacultyID'), 'last_name': ('f.LastName', 'LastName'),
+           'first_name': ('f.FirstName', 'FirstName')},
+    default_sort='id',
+    filters={'department_id': ('f.DepartmentID = %s', int)},
+    search=('f.FirstName', 'f.LastName', 'f.Email'),
+    table='faculty')
+
 # Route to list faculty
 @app.route('/faculty')
 def list_faculty():
-    cur = mysql.connection.cursor()
-    cur.execute("SELECT f.FacultyID, f.FirstName, f.LastName, f.Email, d.DepartmentName FROM faculty f LEFT JOIN departments d ON f.DepartmentID = d.DepartmentID")
-    faculty_members = cur.fetchall()
+    cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+    page = paginate(cur, FACULTY_LIST, request.args)
     cur.close()
-    return render_template('faculty/list_faculty.html', faculty_members=faculty_members)
+    departments = reference_rows('departments', "SELECT * FROM departments")
+    return render_template('faculty/list_faculty.html', faculty_members=page.rows, page=page, departments=departments)
 
 # Route to add a new faculty
 @app.route('/faculty/add', methods=['GET', 'POST'])
@@ -204,6 +327,7 @@ def add_faculty():
         cur = mysql.connection.cursor()
         cur.execute("INSERT INTO faculty (FirstName, LastName, Email, password, DepartmentID) VALUES (%s, %s, %s, %s, %s)", (first_name, last_name, email, password, department_id))
         mysql.connection.commit()
+        reference_cache.invalidate('faculty')
         cur.close()
         flash(f"Faculty added. Auto-generated password: {password}", "success")
         return redirect(url_for('list_faculty'))
@@ -227,6 +351,7 @@ def update_faculty(id):
         cur = mysql.connection.cursor()
         cur.execute("UPDATE faculty SET FirstName = %s, LastName = %s, Email = %s, password = %s, DepartmentID = %s WHERE FacultyID = %s", (first_name, last_name, email, password, department_id, id))
         mysql.connection.commit()
+        reference_cache.invalidate('faculty')
         cur.close()
         return redirect(url_for('list_faculty'))
     return render_template('faculty/update_faculty.html', faculty=faculty, departments=departments)
@@ -235,10 +360,8 @@ def update_faculty(id):
 @app.route('/faculty/delete/<int:id>', methods=['POST'])
 def delete_faculty(id):
     try:
-        cur = mysql.connection.cursor()
-        cur.execute("DELETE FROM faculty WHERE FacultyID = %s", (id,))
-        mysql.connection.commit()
-        cur.close()
+        # Their classes go; their courses stay, without a teacher
+        delete_with_dependents('faculty', id)
         return redirect(url_for('list_faculty'))
     except Exception as e:
         print(f"Error deleting faculty: {e}")
@@ -249,14 +372,27 @@ def delete_faculty(id):
 # Route to list courses
 # ---------------- COURSES CRUD ---------------- #
 
+# Course list: one page at a time, sortable by name, filtered by department or faculty
+COURSE_LIST = ListQuery(
+    select="c.CourseID, c.CourseName, d.DepartmentName, f.FirstName, f.LastName, "
+           "CONCAT_WS(' ', f.FirstName, f.LastName) AS FacultyName",
+    joins="courses c LEFT JOIN departments d ON c.DepartmentID = d.DepartmentID "
+          "LEFT JOIN faculty f ON c.FacultyID = f.FacultyID",
+    key='c.CourseID',
+    sorts={'id': ('c.CourseID', 'CourseID'), 'name': ('c.CourseName', 'CourseName')},
+    default_sort='name',
+    filters={'department_id': ('c.DepartmentID = %s', int), 'faculty_id': ('c.FacultyID = %s', int)},
+    search=('c.CourseName',),
+    table='courses')
+
 # Route to list courses
 @app.route('/courses')
 def list_courses():
     cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)  # Use DictCursor
-    cur.execute("SELECT c.CourseID, c.CourseName, d.DepartmentName, f.FirstName, f.LastName FROM courses c LEFT JOIN departments d ON c.DepartmentID = d.DepartmentID LEFT JOIN faculty f ON c.FacultyID = f.FacultyID")
-    courses = cur.fetchall()
+    page = paginate(cur, COURSE_LIST, request.args)
     cur.close()
-    return render_template('courses/list_courses.html', courses=courses)
+    departments = reference_rows('departments', "SELECT * FROM departments")
+    return render_template('courses/list_courses.html', courses=page.rows, page=page, departments=departments)
 
 # Route to add a new course
 @app.route('/courses/add', methods=['GET', 'POST'])
@@ -269,6 +405,7 @@ def add_course():
             cur = mysql.connection.cursor()
             cur.execute("INSERT INTO courses (CourseName, DepartmentID, FacultyID) VALUES (%s, %s, %s)", (course_name, department_id, faculty_id))
             mysql.connection.commit()
+            reference_cache.invalidate('courses')
             cur.close()
             return redirect(url_for('list_courses'))  # Redirect to the course list after adding
         except Exception as e:
@@ -302,6 +439,7 @@ def update_course(id):
         cur = mysql.connection.cursor()
         cur.execute("UPDATE courses SET CourseName = %s, DepartmentID = %s, FacultyID = %s WHERE CourseID = %s", (course_name, department_id, faculty_id, id))
         mysql.connection.commit()
+        reference_cache.invalidate('courses')
         cur.close()
         return redirect(url_for('list_courses'))
     return render_template('courses/update_course.html', course=course, departments=departments, faculty=faculty)
@@ -310,10 +448,7 @@ def update_course(id):
 @app.route('/courses/delete/<int:id>', methods=['POST'])
 def delete_course(id):
     try:
-        cur = mysql.connection.cursor()
-        cur.execute("DELETE FROM courses WHERE CourseID = %s", (id,))
-        mysql.connection.commit()
-        cur.close()
+        delete_with_dependents('courses', id)
         return redirect(url_for('list_courses'))
     except Exception as e:
         print(f"Error deleting course: {e}")
@@ -321,14 +456,26 @@ def delete_course(id):
 
 # -------------------- Students --------------------
 
+# Student list: one page at a time, sortable by name or enrollment number, filtered by department
+STUDENT_LIST = ListQuery(
+    select="s.StudentID, s.FirstName, s.LastName, s.EnrollmentNo, s.Email, d.DepartmentName",
+    joins="students s LEFT JOIN departments d ON s.DepartmentID = d.DepartmentID",
+    key='s.StudentID',
+    sorts={'id': ('s.StudentID', 'StudentID'), 'last_name': ('s.LastName', 'LastName'),
+           'first_name': ('s.FirstName', 'FirstName'), 'enrollment': ('s.EnrollmentNo', 'EnrollmentNo')},
+    default_sort='id',
+    filters={'department_id': ('s.DepartmentID = %s', int)},
+    search=('s.FirstName', 's.LastName', 's.EnrollmentNo', 's.Email'),
+    table='students')
+
 # Route to list students
 @app.route('/students')
 def list_students():
     cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)  # Use DictCursor
-    cur.execute("SELECT s.StudentID, s.FirstName, s.LastName, s.EnrollmentNo, s.Email, d.DepartmentName FROM students s LEFT JOIN departments d ON s.DepartmentID = d.DepartmentID")
-    students = cur.fetchall()
+    page = paginate(cur, STUDENT_LIST, request.args)
     cur.close()
-    return render_template('students/list_students.html', students=students)
+    departments = reference_rows('departments', "SELECT * FROM departments")
+    return render_template('students/list_students.html', students=page.rows, page=page, departments=departments)
 
 # Route to add a new student
 @app.route('/students/add', methods=['GET', 'POST'])
@@ -385,30 +532,58 @@ def update_student(id):
 @app.route('/students/delete/<int:id>', methods=['POST'])
 def delete_student(id):
     try:
-        cur = mysql.connection.cursor()
-        cur.execute("DELETE FROM students WHERE StudentID = %s", (id,))  # Corrected column name
-        mysql.connection.commit()
-        cur.close()
+        delete_with_dependents('students', id)
         return redirect(url_for('list_students'))
     except Exception as e:
         print(f"Error deleting student: {e}")
         return "An error occurred while deleting the student.", 500
 
+# -------------------- Bulk Import --------------------
+
+# Route to import students, faculty, courses or course assignments from a CSV/XLSX file
+@app.route('/import', methods=['GET', 'POST'])
+@role_required('admin')
+def bulk_import_data():
+    result = None
+    if request.method == 'POST':
+        kind = request.form.get('kind')
+        upload = request.files.get('file')
+        if kind not in bulk_import.KINDS or not upload or not upload.filename:
+            flash("Choose what to import and a CSV or XLSX file.", "danger")
+            return redirect(url_for('bulk_import_data'))
+        result = bulk_import.run_import(mysql.connection, kind, upload.stream, upload.filename,
+                                        dry_run=bool(request.form.get('dry_run')))
+        if result['inserted'] and not result['dry_run'] and kind in ('faculty', 'courses'):
+            reference_cache.invalidate(kind)
+    return render_template('import/import_data.html', result=result, kinds=bulk_import.COLUMNS)
+
 # -------------------- Attendance --------------------
 
+# Attendance list: newest first, one page at a time, filtered by student, course, status and date range
+ATTENDANCE_LIST = ListQuery(
+    select="a.AttendanceID, a.StudentID, a.CourseID, s.FirstName, s.LastName, s.EnrollmentNo, c.CourseName, "
+           "a.AttendanceDate, a.AttendanceStatus",
+    joins="attendance a LEFT JOIN students s ON a.StudentID = s.StudentID "
+          "LEFT JOIN courses c ON a.CourseID = c.CourseID",
+    key='a.AttendanceID',
+    sorts={'date': ('a.AttendanceDate', 'AttendanceDate'), 'id': ('a.AttendanceID', 'AttendanceID')},
+    default_sort='date',
+    default_dir='desc',
+    filters={'student_id': ('a.StudentID = %s', int), 'course_id': ('a.CourseID = %s', int),
+             'status': ('a.AttendanceStatus = %s', str),
+             'date_from': ('a.AttendanceDate >= %s', datetime.date.fromisoformat),
+             'date_to': ('a.AttendanceDate <= %s', datetime.date.fromisoformat)},
+    search=('s.EnrollmentNo', 's.LastName'),
+    table='attendance')
+
 # Route to list attendance records
 @app.route('/attendance')
 def list_attendance():
     cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-    cur.execute("""
-        SELECT a.AttendanceID, s.FirstName, s.LastName, c.CourseName, a.AttendanceDate, a.AttendanceStatus
-        FROM attendance a
-        LEFT JOIN students s ON a.StudentID = s.StudentID
-        LEFT JOIN courses c ON a.CourseID = c.CourseID
-    """)  # Updated to use CourseID
-    attendance_records = cur.fetchall()
+    page = paginate(cur, ATTENDANCE_LIST, request.args)
     cur.close()
-    return render_template('attendance/list_attendance.html', attendance_records=attendance_records)
+    courses = reference_rows('courses', "SELECT CourseID, CourseName FROM courses ORDER BY CourseName")
+    return render_template('attendance/list_attendance.html', attendance_records=page.rows, page=page, courses=courses)
 
 # Route to add a new attendance record
 @app.route('/attendance/add', methods=['GET', 'POST'])
@@ -424,8 +599,13 @@ def add_attendance():
         course_id = request.form['CourseID']  # Updated to 'CourseID'
         attendance_date = request.form['AttendanceDate']
         attendance_status = 'Present' if 'AttendanceStatus' in request.form else 'Absent'
+        key = (student_id, course_id, attendance_date)
+        rollups = attendance_rollups.RollupUpdate(mysql.connection, [key])
         cur = mysql.connection.cursor()
-        cur.execute("INSERT INTO attendance (StudentID, CourseID, AttendanceDate, AttendanceStatus) VALUES (%s, %s, %s, %s)", (student_id, course_id, attendance_date, attendance_status))  # Updated query
+        # ux_attendance allows one row per student, course and date; marking it again updates the status
+        cur.execute("INSERT INTO attendance (StudentID, CourseID, AttendanceDate, AttendanceStatus) VALUES (%s, %s, %s, %s) "
+                    "ON DUPLICATE KEY UPDATE AttendanceStatus = VALUES(AttendanceStatus)", (student_id, course_id, attendance_date, attendance_status))
+        rollups.apply({key: attendance_status})
         mysql.connection.commit()
         cur.close()
         return redirect(url_for('list_attendance'))  # Redirect to the attendance list after adding
@@ -447,8 +627,15 @@ def update_attendance(id):
         course_id = request.form['CourseID']  # Updated to 'CourseID'
         attendance_date = request.form['AttendanceDate']
         attendance_status = 'Present' if 'AttendanceStatus' in request.form else 'Absent'
+        if attendance is None:
+            abort(404)
+        old_key = (attendance['StudentID'], attendance['CourseID'], attendance['AttendanceDate'])
+        new_key = (student_id, course_id, attendance_date)
+        rollups = attendance_rollups.RollupUpdate(mysql.connection, [old_key, new_key])
         cur = mysql.connection.cursor()
         cur.execute("UPDATE attendance SET StudentID = %s, CourseID = %s, AttendanceDate = %s, AttendanceStatus = %s WHERE AttendanceID = %s", (student_id, course_id, attendance_date, attendance_status, id))  # Updated query
+        # The row moves from old_key to new_key (the same key when only the status changed)
+        rollups.apply({old_key: None, new_key: attendance_status})
         mysql.connection.commit()
         cur.close()
         return redirect(url_for('list_attendance'))
@@ -458,8 +645,14 @@ def update_attendance(id):
 @app.route('/attendance/delete/<int:id>', methods=['POST'])
 def delete_attendance(id):
     try:
-        cur = mysql.connection.cursor()
-        cur.execute("DELETE FROM attendance WHERE AttendanceID = %s", (id,))
+        cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        cur.execute("SELECT StudentID, CourseID, AttendanceDate FROM attendance WHERE AttendanceID = %s", (id,))
+        row = cur.fetchone()
+        if row:
+            key = (row['StudentID'], row['CourseID'], row['AttendanceDate'])
+            rollups = attendance_rollups.RollupUpdate(mysql.connection, [key])
+            cur.execute("DELETE FROM attendance WHERE AttendanceID = %s", (id,))
+            rollups.apply({key: None})
         mysql.connection.commit()
         cur.close()
         return redirect(url_for('list_attendance'))
@@ -467,6 +660,79 @@ def delete_attendance(id):
         print(f"Error deleting attendance record: {e}")
         return "An error occurred while deleting the attendance record.", 500
 
+# Route to mark attendance for a whole scheduled class on one date
+# The roster comes from the students assigned the course in the program's current semester, and
+# all statuses are saved with one multi-row upsert (see class_attendance.py).
+@app.route('/attendance/class/<int:schedule_id>', methods=['GET', 'POST'])
+@role_required('admin', 'teacher')
+def class_attendance_sheet(schedule_id):
+    cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+    schedule = class_attendance.load_class(cur, schedule_id)
+    if schedule is None:
+        cur.close()
+        abort(404)
+    # Teachers can only mark their own classes
+    if session.get('role') == 'teacher' and schedule['FacultyID'] != session.get('faculty_id'):
+        cur.close()
+        abort(403)
+
+    date_arg = request.values.get('date')
+    try:
+        date = datetime.date.fromisoformat(date_arg) if date_arg else class_attendance.default_date(schedule)
+    except ValueError:
+        cur.close()
+        abort(400)
+    students = class_attendance.roster(cur, schedule, date)
+    cur.close()
+
+    if request.method == 'POST':
+        # Only students on the roster are written, whatever else the form carries
+        statuses = {}
+        for student in students:
+            status = request.form.get(f"status_{student['StudentID']}")
+            if status in class_attendance.STATUSES:
+                statuses[student['StudentID']] = status
+        try:
+            class_attendance.save(mysql.connection, schedule['CourseID'], date, statuses)
+        except MySQLdb.Error as e:
+            print(f"Error saving class attendance: {e}")
+            flash('Attendance could not be saved, please try again.', 'danger')
+            return redirect(url_for('class_attendance_sheet', schedule_id=schedule_id, date=date.isoformat()))
+        flash(f"Attendance saved for {len(statuses)} students.", 'success')
+        return redirect(url_for('class_attendance_sheet', schedule_id=schedule_id, date=date.isoformat()))
+
+    return render_template('attendance/class_attendance.html', schedule=schedule, date=date, students=students,
+                           statuses=class_attendance.STATUSES)
+
+# Attendance shortfall: students under a percentage in a course, lowest first, from attendance_rollups
+ATTENDANCE_SHORTFALL_LIST = ListQuery(
+    select="r.RollupID, r.StudentID, r.CourseID, r.SemesterID, r.Present, r.Absent, r.Total, r.Percentage, "
+           "s.FirstName, s.LastName, s.EnrollmentNo, c.CourseName, sem.SemesterName",
+    joins="attendance_rollups r JOIN students s ON r.StudentID = s.StudentID "
+          "JOIN courses c ON r.CourseID = c.CourseID "
+          "LEFT JOIN semesters sem ON r.SemesterID = sem.SemesterID",
+    key='r.RollupID',
+    sorts={'percentage': ('r.Percentage', 'Percentage'), 'absent': ('r.Absent', 'Absent')},
+    default_sort='percentage',
+    filters={'threshold': ('r.Percentage < %s', float), 'semester_id': ('r.SemesterID = %s', int),
+             'course_id': ('r.CourseID = %s', int), 'min_classes': ('r.Total >= %s', int)},
+    search=('s.EnrollmentNo', 's.LastName'),
+    table='attendance_rollups')
+
+# Route to list students below the attendance threshold (75% unless given)
+@app.route('/attendance/shortfall')
+@role_required('admin')
+def attendance_shortfall():
+    args = request.args.to_dict()
+    args.setdefault('threshold', str(attendance_rollups.SHORTFALL_THRESHOLD))
+    cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+    page = paginate(cur, ATTENDANCE_SHORTFALL_LIST, args)
+    cur.close()
+    courses = reference_rows('courses', "SELECT CourseID, CourseName FROM courses ORDER BY CourseName")
+    semesters = reference_rows('semesters', "SELECT * FROM semesters")
+    return render_template('attendance/attendance_shortfall.html', rollups=page.rows, page=page, courses=courses,
+                           semesters=semesters)
+
 # -------------------- Timetables --------------------
 
 # Route to list timetables
@@ -765,6 +1031,7 @@ def add_semester():
         cur = mysql.connection.cursor()
         cur.execute("INSERT INTO semesters (SemesterName, Email, Password) VALUES (%s, %s, %s)", (semester_name, email, password))
         mysql.connection.commit()
+        reference_cache.invalidate('semesters')
         cur.close()
         return redirect(url_for('list_semesters'))
     return render_template('semesters/add_semester.html')
@@ -783,6 +1050,7 @@ def update_semester(id):
         cur = mysql.connection.cursor()
         cur.execute("UPDATE semesters SET SemesterName = %s, Email = %s, Password = %s WHERE SemesterID = %s", (semester_name, email, password, id))
         mysql.connection.commit()
+        reference_cache.invalidate('semesters')
         cur.close()
         return redirect(url_for('list_semesters'))
     return render_template('semesters/update_semester.html', semester=semester)
@@ -794,6 +1062,7 @@ def delete_semester(id):
         cur = mysql.connection.cursor()
         cur.execute("DELETE FROM semesters WHERE SemesterID = %s", (id,))
         mysql.connection.commit()
+        reference_cache.invalidate('semesters')
         cur.close()
         return redirect(url_for('list_semesters'))
     except Exception as e:
@@ -822,6 +1091,7 @@ def add_session():
         cur = mysql.connection.cursor()
         cur.execute("INSERT INTO sessions (StartYear, EndYear) VALUES (%s, %s)", (start_year, end_year))
         mysql.connection.commit()
+        reference_cache.invalidate('sessions')
         cur.close()
         return redirect(url_for('list_sessions'))
     return render_template('sessions/add_session.html')
@@ -839,6 +1109,7 @@ def update_session(id):
         cur = mysql.connection.cursor()
         cur.execute("UPDATE sessions SET StartYear = %s, EndYear = %s WHERE SessionID = %s", (start_year, end_year, id))
         mysql.connection.commit()
+        reference_cache.invalidate('sessions')
         cur.close()
         return redirect(url_for('list_sessions'))
     return render_template('sessions/update_session.html', session=session)
@@ -850,6 +1121,7 @@ def delete_session(id):
         cur = mysql.connection.cursor()
         cur.execute("DELETE FROM sessions WHERE SessionID = %s", (id,))
         mysql.connection.commit()
+        reference_cache.invalidate('sessions')
         cur.close()
         return redirect(url_for('list_sessions'))
     except Exception as e:
@@ -861,19 +1133,27 @@ def delete_session(id):
 # Route to list offered programs
 # ---------------- PROGRAMS CRUD ---------------- #
 
+# Offered program list: one page at a time, sortable by name, filtered by department or session
+OFFERED_PROGRAM_LIST = ListQuery(
+    select="op.ProgramID, op.ProgramName, s.StartYear, s.EndYear, d.DepartmentName",
+    joins="offered_programs op JOIN sessions s ON op.SessionID = s.SessionID "
+          "LEFT JOIN departments d ON op.DepartmentID = d.DepartmentID",
+    key='op.ProgramID',
+    sorts={'id': ('op.ProgramID', 'ProgramID'), 'name': ('op.ProgramName', 'ProgramName')},
+    default_sort='name',
+    filters={'department_id': ('op.DepartmentID = %s', int), 'session_id': ('op.SessionID = %s', int)},
+    search=('op.ProgramName',),
+    table='offered_programs')
+
 # Route to list offered programs
 @app.route('/offered_programs')
 def list_offered_programs():
     cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-    cur.execute("""
-        SELECT op.ProgramID, op.ProgramName, s.StartYear, s.EndYear, d.DepartmentName
-        FROM offered_programs op
-        JOIN sessions s ON op.SessionID = s.SessionID
-        LEFT JOIN departments d ON op.DepartmentID = d.DepartmentID
-    """)
-    programs = cur.fetchall()
+    page = paginate(cur, OFFERED_PROGRAM_LIST, request.args)
     cur.close()
-    return render_template('offered_programs/list_offered_programs.html', programs=programs)
+    departments = reference_rows('departments', "SELECT * FROM departments")
+    return render_template('offered_programs/list_offered_programs.html', programs=page.rows, page=page,
+                           departments=departments)
 
 # Route to add a new offered program
 @app.route('/offered_programs/add', methods=['GET', 'POST'])
@@ -892,6 +1172,7 @@ def add_offered_program():
         cur = mysql.connection.cursor()
         cur.execute("INSERT INTO offered_programs (ProgramID, ProgramName, SessionID, DepartmentID) VALUES (%s, %s, %s, %s)", (program_id, program_name, session_id, department_id))
         mysql.connection.commit()
+        reference_cache.invalidate('offered_programs')
         cur.close()
         return redirect(url_for('list_offered_programs'))
     return render_template('offered_programs/add_offered_program.html', sessions=sessions, departments=departments)
@@ -918,6 +1199,7 @@ def update_offered_program(id):
             WHERE ProgramID = %s
         """, (program_name, session_id, department_id, id))
         mysql.connection.commit()
+        reference_cache.invalidate('offered_programs')
         cur.close()
         return redirect(url_for('list_offered_programs'))
     return render_template('offered_programs/update_offered_program.html', program=program, sessions=sessions, departments=departments)
@@ -929,6 +1211,7 @@ def delete_offered_program(id):
         cur = mysql.connection.cursor()
         cur.execute("DELETE FROM offered_programs WHERE ProgramID = %s", (id,))
         mysql.connection.commit()
+        reference_cache.invalidate('offered_programs')
         cur.close()
         return redirect(url_for('list_offered_programs'))
     except Exception as e:
@@ -991,27 +1274,47 @@ def delete_current_semester(id):
 
 # -------------------- Assign Courses to Students --------------------
 
+# Students who have course assignments, paged by student; each page then loads only their assignments
+ASSIGNED_STUDENT_LIST = ListQuery(
+    select="s.StudentID, s.FirstName, s.LastName, s.EnrollmentNo",
+    joins="students s",
+    key='s.StudentID',
+    sorts={'id': ('s.StudentID', 'StudentID'), 'first_name': ('s.FirstName', 'FirstName'),
+           'enrollment': ('s.EnrollmentNo', 'EnrollmentNo')},
+    default_sort='id',
+    filters={'program_id': ('EXISTS (SELECT 1 FROM assign_courses_to_student pf '
+                            'WHERE pf.StudentID = s.StudentID AND pf.ProgramID = %s)', int)},
+    search=('s.FirstName', 's.LastName', 's.EnrollmentNo'),
+    where="EXISTS (SELECT 1 FROM assign_courses_to_student ex WHERE ex.StudentID = s.StudentID)")
+
 # Route to list assigned courses to students (grouped by student, program, duration, semester)
 @app.route('/assign_courses_to_student')
 def list_assign_courses_to_student():
     cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-    cur.execute("""
-        SELECT 
-            ac.AssignID,
-            s.StudentID, s.FirstName, op.ProgramName, se.StartYear, se.EndYear,
-            sem.SemesterName, c.CourseName,
-            ac.Allowed, ac.Is_Repeater
-        FROM assign_courses_to_student ac
-        JOIN students s ON ac.StudentID = s.StudentID
-        JOIN offered_programs op ON ac.ProgramID = op.ProgramID
-        JOIN sessions se ON ac.SessionID = se.SessionID
-        JOIN current_semester cs ON ac.CurrentSemesterID = cs.CurrentSemesterID
-        JOIN semesters sem ON cs.SemesterID = sem.SemesterID
-        JOIN courses c ON ac.CourseID = c.CourseID
-        ORDER BY s.StudentID, sem.SemesterName, c.CourseName
-    """)
-    rows = cur.fetchall()
+    page = paginate(cur, ASSIGNED_STUDENT_LIST, request.args)
+    order = {row['StudentID']: i for i, row in enumerate(page.rows)}
+    rows = []
+    if order:
+        cur.execute(f"""
+            SELECT 
+                ac.AssignID,
+                s.StudentID, s.FirstName, op.ProgramName, se.StartYear, se.EndYear,
+                sem.SemesterName, c.CourseName,
+                ac.Allowed, ac.Is_Repeater
+            FROM assign_courses_to_student ac
+            JOIN students s ON ac.StudentID = s.StudentID
+            JOIN offered_programs op ON ac.ProgramID = op.ProgramID
+            JOIN sessions se ON ac.SessionID = se.SessionID
+            JOIN current_semester cs ON ac.CurrentSemesterID = cs.CurrentSemesterID
+            JOIN semesters sem ON cs.SemesterID = sem.SemesterID
+            JOIN courses c ON ac.CourseID = c.CourseID
+            WHERE ac.StudentID IN ({', '.join(['%s'] * len(order))})
+            ORDER BY sem.SemesterName, c.CourseName
+        """, tuple(order))
+        # Keep the page's student order
+        rows = sorted(cur.fetchall(), key=lambda row: order[row['StudentID']])
     cur.close()
+    programs = reference_rows('offered_programs', "SELECT * FROM offered_programs")
 
     grouped = {}
     for row in rows:
@@ -1033,7 +1336,7 @@ def list_assign_courses_to_student():
 
     return render_template(
         'assign_courses_to_student/list_assign_courses_to_student.html',
-        grouped=grouped
+        grouped=grouped, page=page, programs=programs
     )
 
 # Route to assign a course to a student
@@ -1080,6 +1383,7 @@ def add_assign_courses_to_student():
         """, (student_id, program_id, session_id, current_semester_id, course_id, allowed, is_repeater))
         mysql.connection.commit()
         cur.close()
+        student_reports.refresh_for_assignment(mysql.connection, student_id, current_semester_id)
         return redirect(url_for('list_assign_courses_to_student'))
     return render_template(
         'assign_courses_to_student/add_assign_courses_to_student.html',
@@ -1131,6 +1435,7 @@ def add_room():
         cur = mysql.connection.cursor()
         cur.execute("INSERT INTO rooms (RoomNumber) VALUES (%s)", (room_number,))
         mysql.connection.commit()
+        reference_cache.invalidate('rooms')
         cur.close()
         return redirect(url_for('list_rooms'))
     return render_template('rooms/add_room.html')
@@ -1146,6 +1451,7 @@ def update_room(id):
         cur = mysql.connection.cursor()
         cur.execute("UPDATE rooms SET RoomNumber = %s WHERE RoomID = %s", (room_number, id))
         mysql.connection.commit()
+        reference_cache.invalidate('rooms')
         cur.close()
         return redirect(url_for('list_rooms'))
     return render_template('rooms/update_room.html', room=room)
@@ -1153,10 +1459,7 @@ def update_room(id):
 @app.route('/rooms/delete/<int:id>', methods=['POST'])
 def delete_room(id):
     try:
-        cur = mysql.connection.cursor()
-        cur.execute("DELETE FROM rooms WHERE RoomID = %s", (id,))
-        mysql.connection.commit()
-        cur.close()
+        delete_with_dependents('rooms', id)
         return redirect(url_for('list_rooms'))
     except Exception as e:
         print(f"Error deleting room: {e}")
@@ -1166,13 +1469,12 @@ def delete_room(id):
 
 # View timetable for a given day (default: Monday)
 @app.route('/timetable', methods=['GET', 'POST'])
+@timetable_page
 def view_timetable():
     day = request.args.get('day', 'Monday')
     cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-    cur.execute("SELECT * FROM rooms")
-    rooms = cur.fetchall()
-    cur.execute("SELECT * FROM time_slots ORDER BY StartTime")
-    slots = cur.fetchall()
+    rooms = reference_rows('rooms', "SELECT * FROM rooms")
+    slots = reference_rows('time_slots', "SELECT * FROM time_slots ORDER BY StartTime")
     # Fetch all scheduled classes for the day
     cur.execute("""
         SELECT s.*, r.RoomNumber, f.FirstName, f.LastName, c.CourseName, ts.StartTime, ts.EndTime, op.ProgramName
@@ -1182,8 +1484,8 @@ def view_timetable():
         JOIN courses c ON s.CourseID = c.CourseID
         JOIN time_slots ts ON s.SlotID = ts.SlotID
         LEFT JOIN offered_programs op ON s.ProgramID = op.ProgramID
-        WHERE s.DayOfWeek = %s
-    """, (day,))
+        WHERE s.DayNo = %s
+    """, (DAY_NUMBERS.get(day, 0),))
     scheduled = cur.fetchall()
     cur.close()
     # Build a lookup: {(room_id, slot_id): class_info}
@@ -1193,26 +1495,17 @@ def view_timetable():
 # Add a class (with conflict prevention)
 @app.route('/timetable/add', methods=['GET', 'POST'])
 def add_class():
-    cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-    cur.execute("SELECT * FROM sessions")
-    sessions = cur.fetchall()
-    cur.execute("SELECT * FROM rooms")
-    rooms = cur.fetchall()
-    cur.execute("SELECT * FROM faculty")
-    faculty = cur.fetchall()
-    cur.execute("SELECT * FROM courses")
-    courses = cur.fetchall()
-    cur.execute("SELECT * FROM offered_programs")
-    programs = cur.fetchall()
-    cur.execute("SELECT * FROM departments")
-    departments = cur.fetchall()
-    cur.execute("SELECT * FROM time_slots ORDER BY StartTime")
-    slots = cur.fetchall()
+    sessions = reference_rows('sessions', "SELECT * FROM sessions")
+    rooms = reference_rows('rooms', "SELECT * FROM rooms")
+    faculty = reference_rows('faculty', "SELECT * FROM faculty")
+    courses = reference_rows('courses', "SELECT * FROM courses")
+    programs = reference_rows('offered_programs', "SELECT * FROM offered_programs")
+    departments = reference_rows('departments', "SELECT * FROM departments")
+    slots = reference_rows('time_slots', "SELECT * FROM time_slots ORDER BY StartTime")
     # Convert timedelta to HH:MM string
     for slot in slots:
         slot['StartTime'] = f"{slot['StartTime'].seconds // 3600:02d}:{(slot['StartTime'].seconds % 3600) // 60:02d}"
         slot['EndTime'] = f"{slot['EndTime'].seconds // 3600:02d}:{(slot['EndTime'].seconds % 3600) // 60:02d}"
-    cur.close()
     days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
 
     if request.method == 'POST':
@@ -1236,54 +1529,39 @@ def add_class():
             flash("Invalid ProgramID: does not exist in offered_programs.", "danger")
             return redirect(url_for('add_class'))
 
-        # Conflict check: no overlap in same room, same day, same slot
-        cur.execute("""
-            SELECT * FROM schedule
-            WHERE RoomID = %s AND SlotID = %s AND DayOfWeek = %s
-        """, (room_id, slot_id, day_of_week))
-        conflict = cur.fetchone()
-
-        if conflict:
-            flash("Conflict: Room already booked for this slot and day.", "danger")
-            return redirect(url_for('add_class'))
-
-        # Check for faculty conflict
-        cur.execute("""
-            SELECT * FROM schedule
-            WHERE FacultyID = %s AND SlotID = %s AND DayOfWeek = %s
-        """, (faculty_id, slot_id, day_of_week))
-        faculty_conflict = cur.fetchone()
-
-        if faculty_conflict:
-            flash("Conflict: Faculty already booked for this slot and day.", "danger")
-            return redirect(url_for('add_class'))
-
-        # Check if subject is already scheduled for this program on the same day
-        cur.execute("""
-            SELECT c.CourseName, s.* 
-            FROM schedule s
-            JOIN courses c ON s.CourseID = c.CourseID
-            WHERE s.ProgramID = %s AND s.DayOfWeek = %s AND s.CourseID = %s
-        """, (program_id, day_of_week, course_id))
-        subject_conflict = cur.fetchone()
-
-        if subject_conflict:
-            cur.execute("SELECT CourseName FROM courses WHERE CourseID = %s", (course_id,))
-            course_info = cur.fetchone()
-            course_name = course_info['CourseName'] if course_info else ""
-            flash(f"Conflict: {course_name} is already scheduled for this program on {day_of_week}.", "danger")
-            cur.close()
-            return redirect(url_for('add_class'))
-
-        # Insert class
-        cur = mysql.connection.cursor()
-        # Assuming default SemesterID as 1, adjust if needed
-        cur.execute("""
-            INSERT INTO schedule (CourseID, FacultyID, RoomID, SlotID, DayOfWeek, SemesterID, ProgramID)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """, (course_id, faculty_id, room_id, slot_id, day_of_week, 1, program_id))
-        mysql.connection.commit()
         cur.close()
+        index = get_schedule_index()
+        with index.lock:
+            # Conflict check: no overlap in same room, same day, same slot
+            if index.room_conflict(room_id, slot_id, day_of_week):
+                flash("Conflict: Room already booked for this slot and day.", "danger")
+                return redirect(url_for('add_class'))
+
+            # Check for faculty conflict
+            if index.faculty_conflict(faculty_id, slot_id, day_of_week):
+                flash("Conflict: Faculty already booked for this slot and day.", "danger")
+                return redirect(url_for('add_class'))
+
+            # Check if subject is already scheduled for this program on the same day
+            if index.course_conflict(program_id, day_of_week, course_id):
+                course_name = next((c['CourseName'] for c in courses if str(c['CourseID']) == str(course_id)), "")
+                flash(f"Conflict: {course_name} is already scheduled for this program on {day_of_week}.", "danger")
+                return redirect(url_for('add_class'))
+
+            # Insert class
+            cur = mysql.connection.cursor()
+            # Assuming default SemesterID as 1, adjust if needed
+            row = {'CourseID': course_id, 'FacultyID': faculty_id, 'RoomID': room_id, 'SlotID': slot_id,
+                   'DayOfWeek': day_of_week, 'SemesterID': 1, 'ProgramID': program_id}
+            cur.execute("""
+                INSERT INTO schedule (CourseID, FacultyID, RoomID, SlotID, DayOfWeek, SemesterID, ProgramID)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """, (course_id, faculty_id, room_id, slot_id, day_of_week, 1, program_id))
+            mysql.connection.commit()
+            index.add(cur.lastrowid, row)
+            cur.close()
+            schedule_written()
+        student_reports.refresh_for_schedule(mysql.connection, row)
         flash("Class scheduled successfully!", "success")
         return redirect(url_for('room_timetable'))
 
@@ -1291,43 +1569,24 @@ def add_class():
 
 # Helper: Check for room/faculty conflicts
 def has_conflict(room_id, faculty_id, slot_id, day, semester_id, program_id):
-    cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+    index = get_schedule_index()
     # Room conflict
-    cur.execute("""
-        SELECT * FROM schedule
-        WHERE RoomID=%s AND SlotID=%s AND DayOfWeek=%s AND SemesterID=%s
-    """, (room_id, slot_id, day, semester_id))
-    if cur.fetchone():
-        cur.close()
+    if index.room_conflict(room_id, slot_id, day, semester_id):
         return "Room is already booked for this slot."
     # Faculty conflict (including ProgramID to match unique constraint)
-    cur.execute("""
-        SELECT * FROM schedule
-        WHERE FacultyID=%s AND SlotID=%s AND DayOfWeek=%s AND ProgramID=%s
-    """, (faculty_id, slot_id, day, program_id))
-    if cur.fetchone():
-        cur.close()
+    if index.faculty_conflict(faculty_id, slot_id, day, program_id=program_id):
         return "Faculty is already booked for this slot in this program."
-    cur.close()
     return None
 
 # Add a course to a class (assign slot, room, faculty)
 @app.route('/schedule/add', methods=['GET', 'POST'])
 def add_schedule():
-    cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-    cur.execute("SELECT * FROM programs")
-    programs = cur.fetchall()
-    cur.execute("SELECT * FROM semesters")
-    semesters = cur.fetchall()
-    cur.execute("SELECT * FROM courses")
-    courses = cur.fetchall()
-    cur.execute("SELECT * FROM faculty")
-    faculty = cur.fetchall()
-    cur.execute("SELECT * FROM rooms")
-    rooms = cur.fetchall()
-    cur.execute("SELECT * FROM time_slots ORDER BY StartTime")
-    slots = cur.fetchall()
-    cur.close()
+    programs = reference_rows('programs', "SELECT * FROM programs")
+    semesters = reference_rows('semesters', "SELECT * FROM semesters")
+    courses = reference_rows('courses', "SELECT * FROM courses")
+    faculty = reference_rows('faculty', "SELECT * FROM faculty")
+    rooms = reference_rows('rooms', "SELECT * FROM rooms")
+    slots = reference_rows('time_slots', "SELECT * FROM time_slots ORDER BY StartTime")
     days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
 
     if request.method == 'POST':
@@ -1339,26 +1598,173 @@ def add_schedule():
         slot_id = request.form['SlotID']
         day = request.form['DayOfWeek']
 
-        # Conflict check
-        conflict = has_conflict(room_id, faculty_id, slot_id, day, semester_id)
-        if conflict:
-            flash(conflict, "danger")
-            return redirect(url_for('add_schedule'))
+        index = get_schedule_index()
+        with index.lock:
+            # Conflict check
+            conflict = has_conflict(room_id, faculty_id, slot_id, day, semester_id, program_id)
+            if conflict:
+                flash(conflict, "danger")
+                return redirect(url_for('add_schedule'))
 
-        cur = mysql.connection.cursor()
-        cur.execute("""
-            INSERT INTO schedule (CourseID, FacultyID, RoomID, SlotID, DayOfWeek, SemesterID, ProgramID)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """, (course_id, faculty_id, room_id, slot_id, day, semester_id, program_id))
-        mysql.connection.commit()
-        cur.close()
+            cur = mysql.connection.cursor()
+            cur.execute("""
+                INSERT INTO schedule (CourseID, FacultyID, RoomID, SlotID, DayOfWeek, SemesterID, ProgramID)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """, (course_id, faculty_id, room_id, slot_id, day, semester_id, program_id))
+            mysql.connection.commit()
+            row = {'CourseID': course_id, 'FacultyID': faculty_id, 'RoomID': room_id, 'SlotID': slot_id,
+                   'DayOfWeek': day, 'SemesterID': semester_id, 'ProgramID': program_id}
+            index.add(cur.lastrowid, row)
+            cur.close()
+            schedule_written()
+        student_reports.refresh_for_schedule(mysql.connection, row)
         flash("Class scheduled successfully!", "success")
         return redirect(url_for('room_timetable'))
 
     return render_template('schedule/add_schedule.html', programs=programs, semesters=semesters, courses=courses, faculty=faculty, rooms=rooms, slots=slots, days=days)
 
+# Check a draft list of schedule entries against each other and the current schedule, saving nothing.
+# Body: {"entries": [{"CourseID", "FacultyID", "RoomID", "SlotID", "DayOfWeek", "SemesterID", "ProgramID"}, ...]}
+@app.route('/api/schedule/validate', methods=['POST'])
+@role_required('admin')
+def api_validate_schedule():
+    payload = request.get_json(silent=True)
+    entries = payload.get('entries') if isinstance(payload, dict) else payload
+    if not isinstance(entries, list):
+        return jsonify({'error': 'Send a JSON list of entries, or {"entries": [...]}.'}), 400
+    if len(entries) > schedule_validation.MAX_ENTRIES:
+        return jsonify({'error': f"At most {schedule_validation.MAX_ENTRIES} entries per request."}), 413
+
+    known = {
+        'CourseID': {row['CourseID'] for row in reference_rows('courses', "SELECT * FROM courses")},
+        'FacultyID': {row['FacultyID'] for row in reference_rows('faculty', "SELECT * FROM faculty")},
+        'RoomID': {row['RoomID'] for row in reference_rows('rooms', "SELECT * FROM rooms")},
+        'SlotID': {row['SlotID'] for row in reference_rows('time_slots', "SELECT * FROM time_slots ORDER BY StartTime")},
+        'SemesterID': {row['SemesterID'] for row in reference_rows('semesters', "SELECT * FROM semesters")},
+        'ProgramID': {row['ProgramID'] for row in reference_rows('offered_programs', "SELECT * FROM offered_programs")},
+    }
+    index = get_schedule_index()
+    with index.lock:
+        result = schedule_validation.validate(entries, index, known)
+    return jsonify(result)
+
+# Generate a timetable automatically for a program/semester (or all of current_semester)
+@app.route('/timetable/generate', methods=['GET', 'POST'])
+@role_required('admin')
+def generate_schedule():
+    cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+    cur.execute("""
+        SELECT cs.CurrentSemesterID, cs.ProgramID, cs.SemesterID, op.ProgramName, s.SemesterName
+        FROM current_semester cs
+        JOIN offered_programs op ON cs.ProgramID = op.ProgramID
+        JOIN semesters s ON cs.SemesterID = s.SemesterID
+    """)
+    current_semesters = cur.fetchall()
+    cur.close()
+
+    placements = unplaced = None
+    dry_run = True
+    if request.method == 'POST':
+        # 'all' fills every program/semester listed in current_semester
+        program_id = semester_id = None
+        target = request.form.get('CurrentSemesterID', 'all')
+        for cs in current_semesters:
+            if str(cs['CurrentSemesterID']) == target:
+                program_id, semester_id = cs['ProgramID'], cs['SemesterID']
+        sessions_per_week = request.form.get('Sessions', timetable_generator.SESSIONS_PER_WEEK, type=int)
+        dry_run = 'DryRun' in request.form
+
+        index = get_schedule_index()
+        with index.lock:
+            cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+            lessons, rooms, slots, existing = timetable_generator.load_inputs(cur, program_id, semester_id)
+            placements, unplaced = timetable_generator.generate_timetable(
+                lessons, rooms, slots, existing=existing, sessions_per_week=sessions_per_week)
+            if not dry_run:
+                timetable_generator.save_placements(cur, placements)
+                mysql.connection.commit()
+                index.invalidate()
+                student_reports.refresh_for_schedule(mysql.connection, *placements)
+
+            # Names for the result table
+            cur.execute("SELECT CourseID, CourseName FROM courses")
+            course_names = {c['CourseID']: c['CourseName'] for c in cur.fetchall()}
+            cur.execute("SELECT FacultyID, FirstName, LastName FROM faculty")
+            faculty_names = {f['FacultyID']: f"{f['FirstName']} {f['LastName']}" for f in cur.fetchall()}
+            cur.execute("SELECT RoomID, RoomNumber FROM rooms")
+            room_names = {r['RoomID']: r['RoomNumber'] for r in cur.fetchall()}
+            cur.execute("SELECT SlotID, StartTime, EndTime FROM time_slots")
+            slot_names = {s['SlotID']: f"{str(s['StartTime'])[:-3]} - {str(s['EndTime'])[:-3]}" for s in cur.fetchall()}
+            cur.close()
+
+        for row in placements + unplaced:
+            row['CourseName'] = course_names.get(row['CourseID'], row['CourseID'])
+            row['FacultyName'] = faculty_names.get(row['FacultyID'], row['FacultyID'])
+        for row in placements:
+            row['RoomNumber'] = room_names.get(row['RoomID'], row['RoomID'])
+            row['SlotName'] = slot_names.get(row['SlotID'], row['SlotID'])
+
+        if dry_run:
+            flash(f"Preview: {len(placements)} classes would be scheduled.", "info")
+        else:
+            flash(f"{len(placements)} classes scheduled.", "success")
+        if unplaced:
+            flash(f"{len(unplaced)} course(s) could not get all their sessions.", "warning")
+
+    return render_template('schedule/generate_timetable.html', current_semesters=current_semesters,
+                           placements=placements, unplaced=unplaced, dry_run=dry_run,
+                           sessions_per_week=timetable_generator.SESSIONS_PER_WEEK)
+
+# Copy a program's semester (or a whole session) into another semester, program or session,
+# with optional room/faculty remapping; conflicts with the target block the copy.
+@app.route('/timetable/clone', methods=['GET', 'POST'])
+@role_required('admin')
+def clone_schedule():
+    programs = reference_rows('offered_programs', "SELECT * FROM offered_programs")
+    semesters = reference_rows('semesters', "SELECT * FROM semesters")
+    sessions = reference_rows('sessions', "SELECT * FROM sessions")
+    result = None
+    if request.method == 'POST':
+        by_session = request.form.get('Source') == 'session'
+        ids = {name: request.form.get(name, type=int)
+               for name in ('ProgramID', 'SemesterID', 'SessionID', 'ToProgramID', 'ToSemesterID', 'ToSessionID')}
+        if by_session:
+            ids.update(ProgramID=None, SemesterID=None, ToProgramID=None, ToSemesterID=None)
+        else:
+            ids.update(SessionID=None, ToSessionID=None)
+        dry_run = 'DryRun' in request.form
+        index = get_schedule_index()
+        try:
+            with index.lock:
+                result = schedule_clone.clone(
+                    mysql.connection, ids['ProgramID'], ids['SemesterID'], ids['SessionID'], ids['ToProgramID'],
+                    ids['ToSemesterID'], ids['ToSessionID'], schedule_clone.parse_map(request.form.get('RoomMap')),
+                    schedule_clone.parse_map(request.form.get('FacultyMap')), dry_run=dry_run)
+                if result['inserted']:
+                    index.invalidate()
+        except schedule_clone.CloneError as e:
+            flash(str(e), "danger")
+            return render_template('schedule/clone_timetable.html', programs=programs, semesters=semesters,
+                                   sessions=sessions, result=None)
+        if result['cloned']:
+            student_reports.refresh_for_schedule(mysql.connection, *result['cloned'])
+
+        if result['conflicts']:
+            flash(f"{len(result['conflicts'])} conflict(s) in the target; nothing was copied.", "danger")
+        elif dry_run:
+            flash(f"Preview: {result['rows']} classes would be copied.", "info")
+        else:
+            flash(f"{result['inserted']} classes copied.", "success")
+        if result['skipped']:
+            flash(f"{result['skipped']} classes skipped: their program has no counterpart in the target session.",
+                  "warning")
+    return render_template('schedule/clone_timetable.html', programs=programs, semesters=semesters,
+                           sessions=sessions, result=result)
+
 # Class-wise timetable (filterable)
 @app.route('/timetable/room', methods=['GET'])
+@mysql.replica_reads
+@timetable_page
 def room_timetable():
     program_id = request.args.get('program_id', type=int)
     semester_id = request.args.get('semester_id', type=int)
@@ -1366,36 +1772,20 @@ def room_timetable():
     cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
     
     # Get all programs and semesters for filters
-    cur.execute("SELECT * FROM offered_programs")
-    programs = cur.fetchall()
-    cur.execute("SELECT * FROM semesters")
-    semesters = cur.fetchall()
-    cur.execute("SELECT * FROM time_slots ORDER BY StartTime")
-    slots = cur.fetchall()
-    cur.execute("SELECT * FROM rooms")
-    rooms = cur.fetchall()
-
-    # Fetch scheduled classes with comprehensive filtering
-    query = """
-        SELECT s.*, c.CourseName, f.FirstName, f.LastName, r.RoomNumber,
-               ts.StartTime, ts.EndTime, op.ProgramName, d.DepartmentName, sem.SemesterName
-        FROM schedule s
-        JOIN courses c ON s.CourseID = c.CourseID
-        JOIN faculty f ON s.FacultyID = f.FacultyID
-        JOIN rooms r ON s.RoomID = r.RoomID
-        JOIN time_slots ts ON s.SlotID = ts.SlotID
-        LEFT JOIN offered_programs op ON s.ProgramID = op.ProgramID
-        LEFT JOIN departments d ON op.DepartmentID = d.DepartmentID
-        LEFT JOIN semesters sem ON s.SemesterID = sem.SemesterID
-        WHERE s.DayOfWeek=%s
-    """
-    params = [day]
+    programs = reference_rows('offered_programs', "SELECT * FROM offered_programs")
+    semesters = reference_rows('semesters', "SELECT * FROM semesters")
+    slots = reference_rows('time_slots', "SELECT * FROM time_slots ORDER BY StartTime")
+    rooms = reference_rows('rooms', "SELECT * FROM rooms")
+
+    # Fetch scheduled classes with comprehensive filtering (schedule_view carries the names)
+    query = "SELECT * FROM schedule_view WHERE DayNo=%s"
+    params = [DAY_NUMBERS.get(day, 0)]
     
     if program_id:
-        query += " AND s.ProgramID=%s"
+        query += " AND ProgramID=%s"
         params.append(program_id)
     if semester_id:
-        query += " AND s.SemesterID=%s"
+        query += " AND SemesterID=%s"
         params.append(semester_id)
     
     cur.execute(query, tuple(params))
@@ -1412,8 +1802,44 @@ def room_timetable():
                          scheduled_lookup=scheduled_lookup, 
                          program_id=program_id, semester_id=semester_id, day=day)
 
-# Faculty-wise timetable
+# Room occupancy tensor for the heatmap, rebuilt when the schedule or its axes change
+room_tensor = room_heatmap.OccupancyTensor()
+ROOM_TENSOR_TABLES = ('schedule', 'rooms', 'time_slots', 'semesters')
+
+def get_room_tensor():
+    versions = data_versions()
+    version = tuple(versions.get(table) for table in ROOM_TENSOR_TABLES)
+    with room_tensor.lock:
+        if room_tensor.version != version:
+            rooms = reference_rows('rooms', "SELECT * FROM rooms ORDER BY RoomNumber")
+            slots = reference_rows('time_slots', "SELECT * FROM time_slots ORDER BY StartTime")
+            semesters = reference_rows('semesters', "SELECT * FROM semesters")
+            cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+            cur.execute(room_heatmap.SCHEDULE_QUERY, (len(room_heatmap.DAYS),))
+            room_tensor.load(cur.fetchall(), rooms, slots, semesters, version)
+            cur.close()
+    return room_tensor
+
+# Campus-wide room utilization heatmap (days x slots), with peaks and idle rooms
+@app.route('/timetable/heatmap', methods=['GET'])
+@role_required('admin')
+def room_heatmap_page():
+    semester_id = request.args.get('semester_id', type=int)
+    tensor = get_room_tensor()
+    analysis = room_heatmap.analyze(tensor, semester_id)
+    semesters = [{'SemesterID': sid, 'SemesterName': name} for sid, name in tensor.semesters]
+    return render_template('schedule/room_heatmap.html', analysis=analysis, semesters=semesters,
+                           semester_id=semester_id)
+
+# Same analysis as JSON
+@app.route('/api/room_heatmap', methods=['GET'])
+@role_required('admin')
+def api_room_heatmap():
+    return jsonify(room_heatmap.analyze(get_room_tensor(), request.args.get('semester_id', type=int)))
+
+# Faculty-wise timetable (a teacher's own timetable, so no ETag: it keeps no-store)
 @app.route('/timetable/faculty', methods=['GET'])
+@mysql.replica_reads
 def faculty_timetable():
     # Session-based access control
     if not session.get('loggedin'):
@@ -1437,72 +1863,62 @@ def faculty_timetable():
 
     cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
     # Fetch all faculty with their department for dropdown
-    cur.execute("""
+    faculties = reference_rows(('faculty', 'departments'), """
         SELECT f.FacultyID, f.FirstName, f.LastName, d.DepartmentName
         FROM faculty f
         LEFT JOIN departments d ON f.DepartmentID = d.DepartmentID
         ORDER BY f.FirstName, f.LastName
     """)
-    faculties = cur.fetchall()
 
     # Fetch time slots
-    cur.execute("SELECT * FROM time_slots ORDER BY StartTime")
-    time_slots = cur.fetchall()
+    time_slots = reference_rows('time_slots', "SELECT * FROM time_slots ORDER BY StartTime")
 
     # Fetch schedules with optional filtering by day and faculty
     query = """
-        SELECT s.ScheduleID, s.DayOfWeek, ts.StartTime, ts.EndTime, r.RoomNumber, c.CourseName, f.FacultyID,
-               op.ProgramName, sem.SemesterName
-        FROM schedule s
-        JOIN time_slots ts ON s.SlotID = ts.SlotID
-        JOIN rooms r ON s.RoomID = r.RoomID
-        JOIN courses c ON s.CourseID = c.CourseID
-        JOIN faculty f ON s.FacultyID = f.FacultyID
-        LEFT JOIN offered_programs op ON s.ProgramID = op.ProgramID
-        LEFT JOIN semesters sem ON s.SemesterID = sem.SemesterID
+        SELECT ScheduleID, DayOfWeek, SlotID, StartTime, EndTime, RoomNumber, CourseName, FacultyID,
+               ProgramName, SemesterName
+        FROM schedule_view
     """
     params = []
     conditions = []
 
     if day != 'All':
-        conditions.append("s.DayOfWeek = %s")
-        params.append(day)
+        conditions.append("DayNo = %s")
+        params.append(DAY_NUMBERS.get(day, 0))
 
     if faculty_id != 'All':
-        conditions.append("f.FacultyID = %s")
+        conditions.append("FacultyID = %s")
         params.append(int(faculty_id))
 
     if conditions:
         query += " WHERE " + " AND ".join(conditions)
 
-    query += " ORDER BY f.FacultyID, s.DayOfWeek, ts.StartTime"
+    query += " ORDER BY FacultyID, DayNo, StartTime"
     cur.execute(query, tuple(params))
     schedules = cur.fetchall()
     cur.close()
 
-    # Group schedules by faculty
-    faculty_schedules = {}
-    for faculty in faculties:
-        faculty_schedules[faculty['FacultyID']] = {
-            'faculty': faculty,
-            'schedules': [s for s in schedules if s['FacultyID'] == faculty['FacultyID']]
-        }
-
     # If filtering by specific faculty, only show that faculty
+    shown = faculties
     if faculty_id != 'All':
-        faculty_schedules = {faculty_id: faculty_schedules.get(int(faculty_id), {'faculty': None, 'schedules': []})}
+        shown = [f for f in faculties if f['FacultyID'] == int(faculty_id)]
 
+    # Group schedules by faculty and lay them out as day x slot grids in one pass
     days = ['All', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+    faculty_schedules = timetable_grid.group_by_faculty(schedules, shown, days[1:], time_slots)
 
-    # Handle case where faculty has no schedule
-    for fs in faculty_schedules.values():
-        if not fs['schedules']:
-            flash(f"No schedule found for faculty {fs['faculty']['FirstName']} {fs['faculty']['LastName']}.", "info")
+    # Handle case where a selected faculty member has no schedule
+    if faculty_id != 'All':
+        for fs in faculty_schedules.values():
+            if not fs['schedules']:
+                flash(f"No schedule found for faculty {fs['faculty']['FirstName']} {fs['faculty']['LastName']}.", "info")
 
-    return render_template('schedule/faculty_timetable.html', faculty_schedules=faculty_schedules, day=day, days=days, faculties=faculties, faculty=faculty_id, time_slots=time_slots)
+    return render_template('schedule/faculty_timetable.html', faculty_schedules=faculty_schedules, day=day, days=days, faculties=faculties, faculty=faculty_id, time_slots=time_slots,
+                           slot_headers=timetable_grid.slot_headers(time_slots))
 
-# Student-wise timetable
+# Student-wise timetable (a student's own timetable, so no ETag: it keeps no-store)
 @app.route('/timetable/student', methods=['GET'])
+@mysql.replica_reads
 def student_timetable():
     # Session-based access control
     if not session.get('loggedin'):
@@ -1542,12 +1958,9 @@ def student_timetable():
     cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
 
     # Fetch all programs and semesters for filters
-    cur.execute("SELECT * FROM offered_programs")
-    programs = cur.fetchall()
-    cur.execute("SELECT * FROM semesters")
-    semesters = cur.fetchall()
-    cur.execute("SELECT * FROM time_slots ORDER BY StartTime")
-    time_slots = cur.fetchall()
+    programs = reference_rows('offered_programs', "SELECT * FROM offered_programs")
+    semesters = reference_rows('semesters', "SELECT * FROM semesters")
+    time_slots = reference_rows('time_slots', "SELECT * FROM time_slots ORDER BY StartTime")
 
     # Fetch student data
     if session.get('role') == 'student':
@@ -1568,40 +1981,38 @@ def student_timetable():
 
     # Fetch schedules with optional filtering by program, semester, and day
     query = """
-        SELECT s.ScheduleID, s.DayOfWeek, ts.StartTime, ts.EndTime, r.RoomNumber, c.CourseName,
-               f.FirstName, f.LastName, op.ProgramName, sem.SemesterName
-        FROM schedule s
-        JOIN time_slots ts ON s.SlotID = ts.SlotID
-        JOIN rooms r ON s.RoomID = r.RoomID
-        JOIN courses c ON s.CourseID = c.CourseID
-        JOIN faculty f ON s.FacultyID = f.FacultyID
-        LEFT JOIN offered_programs op ON s.ProgramID = op.ProgramID
-        LEFT JOIN semesters sem ON s.SemesterID = sem.SemesterID
+        SELECT ScheduleID, DayOfWeek, SlotID, StartTime, EndTime, RoomNumber, CourseName,
+               FirstName, LastName, ProgramName, SemesterName
+        FROM schedule_view
     """
     params = []
     conditions = []
 
     if program_id:
-        conditions.append("s.ProgramID = %s")
+        conditions.append("ProgramID = %s")
         params.append(program_id)
     if semester_id:
-        conditions.append("s.SemesterID = %s")
+        conditions.append("SemesterID = %s")
         params.append(semester_id)
     if day != 'All':
-        conditions.append("s.DayOfWeek = %s")
-        params.append(day)
+        conditions.append("DayNo = %s")
+        params.append(DAY_NUMBERS.get(day, 0))
 
     if conditions:
         query += " WHERE " + " AND ".join(conditions)
 
-    query += " ORDER BY s.DayOfWeek, ts.StartTime"
+    query += " ORDER BY DayNo, StartTime"
     cur.execute(query, tuple(params))
     schedules = cur.fetchall()
     cur.close()
 
+    # Place every class in its day x slot cell once, instead of per cell in the template
+    grid = timetable_grid.build_grid(schedules, ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday'], time_slots)
+
     return render_template('schedule/student_timetable.html',
                          schedules=schedules, programs=programs, semesters=semesters,
-                         time_slots=time_slots, program_id=program_id, semester_id=semester_id, day=day, student=student)
+                         time_slots=time_slots, program_id=program_id, semester_id=semester_id, day=day, student=student,
+                         grid=grid, slot_headers=timetable_grid.slot_headers(time_slots))
 
 # -------------------- Time Slots --------------------
 
@@ -1621,6 +2032,7 @@ def add_time_slot():
         cur = mysql.connection.cursor()
         cur.execute("INSERT INTO time_slots (StartTime, EndTime) VALUES (%s, %s)", (start_time, end_time))
         mysql.connection.commit()
+        reference_cache.invalidate('time_slots')
         cur.close()
         return redirect(url_for('list_time_slots'))
     return render_template('time_slots/add_time_slot.html')
@@ -1637,6 +2049,7 @@ def update_time_slot(id):
         cur = mysql.connection.cursor()
         cur.execute("UPDATE time_slots SET StartTime = %s, EndTime = %s WHERE SlotID = %s", (start_time, end_time, id))
         mysql.connection.commit()
+        reference_cache.invalidate('time_slots')
         cur.close()
         return redirect(url_for('list_time_slots'))
     return render_template('time_slots/update_time_slot.html', time_slot=time_slot)
@@ -1644,10 +2057,7 @@ def update_time_slot(id):
 @app.route('/time_slots/delete/<int:id>', methods=['POST'])
 def delete_time_slot(id):
     try:
-        cur = mysql.connection.cursor()
-        cur.execute("DELETE FROM time_slots WHERE SlotID = %s", (id,))
-        mysql.connection.commit()
-        cur.close()
+        delete_with_dependents('time_slots', id)
         return redirect(url_for('list_time_slots'))
     except Exception as e:
         print(f"Error deleting time slot: {e}")
@@ -1656,6 +2066,8 @@ def delete_time_slot(id):
 # -------------------- Professional Faculty-Wise Timetable Report --------------------
 
 @app.route('/faculty_timetable_report', methods=['GET'])
+@mysql.replica_reads
+@timetable_page
 def faculty_timetable_report():
     day = request.args.get('day', 'All')
     faculty_id = request.args.get('faculty', 'All')
@@ -1664,66 +2076,56 @@ def faculty_timetable_report():
 
     cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
     # Fetch all faculty with their department for dropdown
-    cur.execute("""
+    faculties = reference_rows(('faculty', 'departments'), """
         SELECT f.FacultyID, f.FirstName, f.LastName, f.Email, d.DepartmentName
         FROM faculty f
         LEFT JOIN departments d ON f.DepartmentID = d.DepartmentID
         ORDER BY f.FirstName, f.LastName
     """)
-    faculties = cur.fetchall()
 
     # Fetch time slots
-    cur.execute("SELECT * FROM time_slots ORDER BY StartTime")
-    time_slots = cur.fetchall()
+    time_slots = reference_rows('time_slots', "SELECT * FROM time_slots ORDER BY StartTime")
 
     # Fetch schedules with optional filtering by day and faculty
     query = """
-        SELECT s.ScheduleID, s.DayOfWeek, ts.StartTime, ts.EndTime, r.RoomNumber, c.CourseName, f.FacultyID,
-               op.ProgramName, sem.SemesterName
-        FROM schedule s
-        JOIN time_slots ts ON s.SlotID = ts.SlotID
-        JOIN rooms r ON s.RoomID = r.RoomID
-        JOIN courses c ON s.CourseID = c.CourseID
-        JOIN faculty f ON s.FacultyID = f.FacultyID
-        LEFT JOIN offered_programs op ON s.ProgramID = op.ProgramID
-        LEFT JOIN semesters sem ON s.SemesterID = sem.SemesterID
+        SELECT ScheduleID, DayOfWeek, SlotID, StartTime, EndTime, RoomNumber, CourseName, FacultyID,
+               ProgramName, SemesterName
+        FROM schedule_view
     """
     params = []
     conditions = []
 
     if day != 'All':
-        conditions.append("s.DayOfWeek = %s")
-        params.append(day)
+        conditions.append("DayNo = %s")
+        params.append(DAY_NUMBERS.get(day, 0))
 
     if faculty_id != 'All':
-        conditions.append("f.FacultyID = %s")
+        conditions.append("FacultyID = %s")
         params.append(faculty_id)
 
     if conditions:
         query += " WHERE " + " AND ".join(conditions)
 
-    query += " ORDER BY f.FacultyID, s.DayOfWeek, ts.StartTime"
+    query += " ORDER BY FacultyID, DayNo, StartTime"
     cur.execute(query, tuple(params))
     schedules = cur.fetchall()
     cur.close()
 
-    # Group schedules by faculty
-    faculty_schedules = {}
-    for faculty in faculties:
-        faculty_schedules[faculty['FacultyID']] = {
-            'faculty': faculty,
-            'schedules': [s for s in schedules if s['FacultyID'] == faculty['FacultyID']]
-        }
-
     # If filtering by specific faculty, only show that faculty
+    shown = faculties
     if faculty_id != 'All':
-        faculty_schedules = {faculty_id: faculty_schedules.get(int(faculty_id), {'faculty': None, 'schedules': []})}
+        shown = [f for f in faculties if str(f['FacultyID']) == str(faculty_id)]
 
+    # Group schedules by faculty and lay them out as day x slot grids in one pass
     days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
-    return render_template('schedule/faculty_timetable_report.html', faculty_schedules=faculty_schedules, day=day, days=days, faculties=faculties, faculty=faculty_id, time_slots=time_slots)
+    faculty_schedules = timetable_grid.group_by_faculty(schedules, shown, days, time_slots)
+    return render_template('schedule/faculty_timetable_report.html', faculty_schedules=faculty_schedules, day=day, days=days, faculties=faculties, faculty=faculty_id, time_slots=time_slots,
+                           slot_headers=timetable_grid.slot_headers(time_slots))
 
 # Student Timetable Report
 @app.route('/timetable/student_report', methods=['GET'])
+@mysql.replica_reads
+@timetable_page
 def student_timetable_report():
     program = request.args.get('program', 'All')
     semester = request.args.get('semester', 'All')
@@ -1732,55 +2134,47 @@ def student_timetable_report():
     cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
 
     # Fetch programs
-    cur.execute("SELECT ProgramID, ProgramName FROM offered_programs")
-    programs = cur.fetchall()
+    programs = reference_rows('offered_programs', "SELECT ProgramID, ProgramName FROM offered_programs")
 
     # Fetch semesters
-    cur.execute("SELECT SemesterID, SemesterName FROM semesters")
-    semesters = cur.fetchall()
+    semesters = reference_rows('semesters', "SELECT SemesterID, SemesterName FROM semesters")
 
     # Days of the week
     days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
 
     # Fetch time slots, filter out invalid ones (e.g., duration > 3 hours or specific invalid times)
-    cur.execute("""
+    time_slots = reference_rows('time_slots', """
         SELECT SlotID, StartTime, EndTime
         FROM time_slots
         WHERE TIMEDIFF(EndTime, StartTime) <= '03:00:00'
         AND StartTime NOT IN ('07:38:00', '13:30:00')
         ORDER BY StartTime
     """)
-    time_slots = cur.fetchall()
 
-    # Build base query for schedule data with joins, include semester
+    # Build base query for schedule data, include semester
     query = """
-        SELECT s.DayOfWeek, ts.SlotID, ts.StartTime, ts.EndTime, c.CourseName, f.FirstName, f.LastName, r.RoomNumber, sem.SemesterID, sem.SemesterName
-        FROM schedule s
-        JOIN time_slots ts ON s.SlotID = ts.SlotID
-        JOIN courses c ON s.CourseID = c.CourseID
-        JOIN faculty f ON s.FacultyID = f.FacultyID
-        JOIN rooms r ON s.RoomID = r.RoomID
-        JOIN semesters sem ON s.SemesterID = sem.SemesterID
+        SELECT DayOfWeek, SlotID, StartTime, EndTime, CourseName, FirstName, LastName, RoomNumber, SemesterID, SemesterName
+        FROM schedule_view
     """
     conditions = []
     params = []
 
     if program != 'All':
-        conditions.append("s.ProgramID = %s")
+        conditions.append("ProgramID = %s")
         params.append(program)
 
     if semester != 'All':
-        conditions.append("s.SemesterID = %s")
+        conditions.append("SemesterID = %s")
         params.append(semester)
 
     if day != 'All':
-        conditions.append("s.DayOfWeek = %s")
-        params.append(day)
+        conditions.append("DayNo = %s")
+        params.append(DAY_NUMBERS.get(day, 0))
 
     if conditions:
         query += " WHERE " + " AND ".join(conditions)
 
-    query += " ORDER BY sem.SemesterID, s.DayOfWeek, ts.StartTime"
+    query += " ORDER BY SemesterID, DayNo, StartTime"
 
     cur.execute(query, tuple(params))
     schedules = cur.fetchall()
@@ -1849,6 +2243,7 @@ def add_program():
         cur = mysql.connection.cursor()
         cur.execute("INSERT INTO offered_programs (ProgramName, SessionID, DepartmentID) VALUES (%s, %s, %s)", (program_name, session_id, department_id))
         mysql.connection.commit()
+        reference_cache.invalidate('offered_programs')
         cur.close()
         return redirect(url_for('list_programs'))
     return render_template('programs/add_program.html', sessions=sessions, departments=departments)
@@ -1876,6 +2271,7 @@ def update_program_page(id):   # <-- unique function name
             WHERE ProgramID = %s
         """, (program_name, session_id, department_id, id))
         mysql.connection.commit()
+        reference_cache.invalidate('offered_programs')
         cur.close()
         return redirect(url_for('list_programs'))
 
@@ -1893,6 +2289,7 @@ def delete_program(id):
         cur = mysql.connection.cursor()
         cur.execute("DELETE FROM offered_programs WHERE ProgramID = %s", (id,))
         mysql.connection.commit()
+        reference_cache.invalidate('offered_programs')
         cur.close()
         return redirect(url_for('list_programs'))
     except Exception as e:
@@ -1905,22 +2302,14 @@ def edit_schedule(schedule_id):
     cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
     cur.execute("""SELECT s.*, op.SessionID, op.DepartmentID FROM schedule s LEFT JOIN offered_programs op ON s.ProgramID = op.ProgramID WHERE s.ScheduleID = %s""", (schedule_id,))
     sched = cur.fetchone()
-    cur.execute("SELECT * FROM sessions")
-    sessions = cur.fetchall()
-    cur.execute("SELECT * FROM departments")
-    departments = cur.fetchall()
-    cur.execute("SELECT * FROM offered_programs")
-    programs = cur.fetchall()
-    cur.execute("SELECT * FROM semesters")
-    semesters = cur.fetchall()
-    cur.execute("SELECT * FROM courses")
-    courses = cur.fetchall()
-    cur.execute("SELECT * FROM faculty")
-    faculty = cur.fetchall()
-    cur.execute("SELECT * FROM rooms")
-    rooms = cur.fetchall()
-    cur.execute("SELECT * FROM time_slots ORDER BY StartTime")
-    slots = cur.fetchall()
+    sessions = reference_rows('sessions', "SELECT * FROM sessions")
+    departments = reference_rows('departments', "SELECT * FROM departments")
+    programs = reference_rows('offered_programs', "SELECT * FROM offered_programs")
+    semesters = reference_rows('semesters', "SELECT * FROM semesters")
+    courses = reference_rows('courses', "SELECT * FROM courses")
+    faculty = reference_rows('faculty', "SELECT * FROM faculty")
+    rooms = reference_rows('rooms', "SELECT * FROM rooms")
+    slots = reference_rows('time_slots', "SELECT * FROM time_slots ORDER BY StartTime")
     cur.close()
     days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
 
@@ -1942,24 +2331,28 @@ def edit_schedule(schedule_id):
             flash("Invalid ProgramID: does not exist in offered_programs.", "danger")
             return redirect(url_for('edit_schedule', schedule_id=schedule_id))
 
-        # Conflict check (ignore self)
-        cur.execute("""
-            SELECT * FROM schedule
-            WHERE ScheduleID != %s AND ((RoomID=%s AND SlotID=%s AND DayOfWeek=%s AND SemesterID=%s) OR (FacultyID=%s AND SlotID=%s AND DayOfWeek=%s AND SemesterID=%s))
-        """, (schedule_id, room_id, slot_id, day, semester_id, faculty_id, slot_id, day, semester_id))
-        conflict = cur.fetchone()
-        cur.close()
-        if conflict:
-            flash("Conflict: Room or Faculty already booked for this slot and day.", "danger")
-            return redirect(url_for('edit_schedule', schedule_id=schedule_id))
-
-        cur = mysql.connection.cursor()
-        cur.execute(""" 
-            UPDATE schedule SET CourseID=%s, FacultyID=%s, RoomID=%s, SlotID=%s, DayOfWeek=%s, SemesterID=%s, ProgramID=%s 
-            WHERE ScheduleID=%s 
-        """, (course_id, faculty_id, room_id, slot_id, day, semester_id, program_id, schedule_id))
-        mysql.connection.commit()
         cur.close()
+        index = get_schedule_index()
+        with index.lock:
+            # Conflict check (ignore self)
+            if (index.room_conflict(room_id, slot_id, day, semester_id, ignore=schedule_id) or
+                    index.faculty_conflict(faculty_id, slot_id, day, semester_id, ignore=schedule_id)):
+                flash("Conflict: Room or Faculty already booked for this slot and day.", "danger")
+                return redirect(url_for('edit_schedule', schedule_id=schedule_id))
+
+            old_row = dict(index.get(schedule_id) or {})
+            cur = mysql.connection.cursor()
+            cur.execute(""" 
+                UPDATE schedule SET CourseID=%s, FacultyID=%s, RoomID=%s, SlotID=%s, DayOfWeek=%s, SemesterID=%s, ProgramID=%s 
+                WHERE ScheduleID=%s 
+            """, (course_id, faculty_id, room_id, slot_id, day, semester_id, program_id, schedule_id))
+            mysql.connection.commit()
+            cur.close()
+            row = {'CourseID': course_id, 'FacultyID': faculty_id, 'RoomID': room_id, 'SlotID': slot_id,
+                   'DayOfWeek': day, 'SemesterID': semester_id, 'ProgramID': program_id}
+            index.update(schedule_id, row)
+            schedule_written()
+        student_reports.refresh_for_schedule(mysql.connection, old_row, row)
         flash("Schedule updated successfully!", "success")
         return redirect(url_for('room_timetable'))
 
@@ -1968,10 +2361,15 @@ def edit_schedule(schedule_id):
 # Delete a scheduled class
 @app.route('/schedule/delete/<int:schedule_id>', methods=['POST'])
 def delete_schedule(schedule_id):
+    index = get_schedule_index()
+    old_row = dict(index.get(schedule_id) or {})
     cur = mysql.connection.cursor()
     cur.execute("DELETE FROM schedule WHERE ScheduleID = %s", (schedule_id,))
     mysql.connection.commit()
     cur.close()
+    index.remove(schedule_id)
+    schedule_written()
+    student_reports.refresh_for_schedule(mysql.connection, old_row)
     flash("Schedule deleted.", "success")
     return redirect(request.referrer or url_for('room_timetable'))
 
@@ -2065,9 +2463,12 @@ def logout():
     resp.headers['Expires'] = '0'
     return resp
 
-# Prevent browser caching for all routes (so back button after logout doesn't restore session)
+# Prevent browser caching for all routes (so back button after logout doesn't restore session).
+# Static files and the ETag-validated timetable pages set their own caching headers.
 @app.after_request
 def add_no_cache_headers(response):
+    if request.endpoint == 'static' or g.get('conditional_response'):
+        return response
     response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
     response.headers['Pragma'] = 'no-cache'
     response.headers['Expires'] = '0'
@@ -2105,7 +2506,164 @@ def api_courses(department_id):
     cur.close()
     return jsonify(courses)
 
+# The whole session -> department -> program -> course tree in one response (schedule_options.py),
+# built once per version of its tables; the schedule forms cascade on it in the browser
+options_cache = schedule_options.OptionsCache()
+
+@app.route('/api/schedule_options')
+def api_schedule_options():
+    versions = data_versions()
+    gzipped = 'gzip' in request.accept_encodings
+    # The plain and the gzip body are different representations, so they get different ETags
+    etag = schedule_options.options_etag(versions)
+    response_etag = etag + '-gzip' if gzipped else etag
+    if response_etag in request.if_none_match:
+        options_cache.record_not_modified()
+        response = make_response('', 304)
+    else:
+        body, compressed = options_cache.get(etag, lambda: schedule_options.build(mysql.connection))
+        response = make_response(compressed if gzipped else body)
+        response.mimetype = 'application/json'
+        if gzipped:
+            response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(response_etag)
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = 'private, no-cache'
+    g.conditional_response = True
+    return response
+
+# Dry run of a delete: the rows each table would lose, children first, without deleting anything
+CASCADE_DELETES = ('departments', 'faculty', 'courses', 'students', 'rooms', 'time_slots')
+
+@app.route('/api/delete_plan/<table>/<int:id>')
+@role_required('admin')
+def delete_plan(table, id):
+    if table not in CASCADE_DELETES:
+        abort(404)
+    plan = cascade.plan(mysql.connection, table, id)
+    if not plan.rows:
+        abort(404)
+    return jsonify({'table': table, 'id': id,
+                    'delete': [{'table': name, 'rows': rows} for name, rows in plan.counts()],
+                    'set_null': [{'column': column, 'rows': rows} for column, rows in plan.cleared()]})
+
+# Hit/miss counters for the in-memory caches
+@app.route('/api/cache_stats')
+@role_required('admin')
+def api_cache_stats():
+    return jsonify({'reference': reference_cache.stats(), 'calendar_feeds': feed_cache.stats(),
+                    'dashboard': dashboard_cache.stats(), 'schedule_options': options_cache.stats()})
+
+# Connection pool gauges (in use, idle, waits)
+@app.route('/api/pool_stats')
+@role_required('admin')
+def api_pool_stats():
+    return jsonify(mysql.stats())
+
+# SQL histograms per endpoint in the Prometheus text format
+@app.route('/metrics')
+def metrics():
+    token = app.config.get('METRICS_TOKEN')
+    scraper = token and hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}")
+    if not scraper and session.get('role') != 'admin':
+        abort(403)
+    return Response(sql_stats.prometheus(), mimetype='text/plain; version=0.0.4')
+
+# Endpoints and statements costing the most MySQL time, N+1 suspects and recent slow queries
+@app.route('/admin/sql_metrics')
+@role_required('admin')
+def sql_metrics_page():
+    report = sql_stats.report()
+    return render_template('metrics/sql_metrics.html', report=report,
+                           since=datetime.datetime.fromtimestamp(report['since']))
+
+@app.route('/admin/sql_metrics/reset', methods=['POST'])
+@role_required('admin')
+def reset_sql_metrics():
+    sql_stats.reset()
+    flash("SQL metrics reset.", "success")
+    return redirect(url_for('sql_metrics_page'))
+
+# Download the timetable as CSV, XLSX or ICS, optionally split per program, faculty or room.
+# Rows are streamed from a server-side cursor, so the response starts at once and memory stays flat.
+@app.route('/timetable/export', methods=['GET'])
+@role_required('admin', 'teacher')
+def export_timetable():
+    fmt = request.args.get('format', 'csv')
+    split = request.args.get('split') or None
+    if fmt not in timetable_export.FORMATS or (split and split not in timetable_export.SPLITS):
+        abort(400)
+    filters = {name: request.args.get(name, type=int)
+               for name in ('program_id', 'semester_id', 'faculty_id', 'room_id')}
+    # Teachers can only export their own timetable
+    if session.get('role') == 'teacher':
+        filters['faculty_id'] = session.get('faculty_id')
+
+    extension, mimetype = timetable_export.output_type(fmt, split)
+    filename = f"timetable{'_' + split if split else ''}.{extension}"
+    chunks = timetable_export.stream_export(mysql.connection, fmt, split, **filters)
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+# -------------------- Calendar Feeds --------------------
+
+# Built ICS feeds and the token -> owner map, both checked against data_versions()
+feed_cache = calendar_feeds.FeedCache()
+calendar_tokens = calendar_feeds.TokenMap()
+
+def calendar_owner():
+    # (feed kind, owner id) of the logged-in teacher or student
+    if session.get('role') == 'teacher':
+        return 'faculty', session.get('faculty_id')
+    return 'student', session.get('student_id')
+
+# Page with the logged-in teacher's or student's feed URL
+@app.route('/calendar', methods=['GET'])
+@role_required('teacher', 'student')
+def calendar_subscription():
+    kind, owner_id = calendar_owner()
+    token = calendar_feeds.get_token(mysql.connection, kind, owner_id)
+    feed_url = url_for('calendar_feed', kind=kind, token=token, _external=True)
+    return render_template('calendar/subscribe.html', feed_url=feed_url)
+
+# Replace the feed token; calendars subscribed to the old URL stop updating
+@app.route('/calendar/reset', methods=['POST'])
+@role_required('teacher', 'student')
+def reset_calendar_token():
+    kind, owner_id = calendar_owner()
+    calendar_feeds.reset_token(mysql.connection, kind, owner_id)
+    flash("Your calendar link was reset. Subscribe again with the new link.", "success")
+    return redirect(url_for('calendar_subscription'))
+
+# The feed itself: no login, the token is the credential. Polls cost one
+# data_versions read and get 304 until the timetable changes.
+@app.route('/calendar/<kind>/<token>.ics', methods=['GET'])
+def calendar_feed(kind, token):
+    if kind not in calendar_feeds.KINDS:
+        abort(404)
+    versions = data_versions()
+    owner = calendar_tokens.lookup(mysql.connection, token, versions.get('calendar_tokens'))
+    if owner is None or owner[0] != kind:
+        abort(404)
+    owner_id = owner[1]
+
+    etag = calendar_feeds.feed_etag(kind, owner_id, versions)
+    if etag in request.if_none_match:
+        feed_cache.record_not_modified()
+        response = make_response('', 304)
+    else:
+        body = feed_cache.get(kind, owner_id, etag,
+                              lambda: calendar_feeds.build_feed(mysql.connection, kind, owner_id))
+        response = make_response(body)
+        response.mimetype = 'text/calendar'
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    g.conditional_response = True
+    return response
+
 @app.route('/weekly_timetable', methods=['GET'])
+@mysql.replica_reads
+@timetable_page
 def weekly_timetable():
     session_id = request.args.get('session_id', type=int)
     program_id = request.args.get('program_id', type=int)
@@ -2114,39 +2672,31 @@ def weekly_timetable():
     cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
 
     # Fetch time slots
-    cur.execute("SELECT * FROM time_slots ORDER BY StartTime")
-    time_slots = cur.fetchall()
+    time_slots = reference_rows('time_slots', "SELECT * FROM time_slots ORDER BY StartTime")
 
     # Days of the week
     days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
 
     # Build base query for schedule entries filtered by session, program, semester
+    # Programs without a department or session were left out by the joins this replaced
     query = """
-        SELECT s.DayOfWeek, s.SlotID, c.CourseName, f.FirstName, f.LastName, r.RoomNumber, sem.SemesterID, sem.SemesterName, ts.StartTime, ts.EndTime, op.ProgramName, d.DepartmentName
-        FROM schedule s
-        JOIN courses c ON s.CourseID = c.CourseID
-        JOIN faculty f ON s.FacultyID = f.FacultyID
-        JOIN rooms r ON s.RoomID = r.RoomID
-        JOIN offered_programs op ON s.ProgramID = op.ProgramID
-        JOIN departments d ON op.DepartmentID = d.DepartmentID
-        JOIN semesters sem ON s.SemesterID = sem.SemesterID
-        JOIN sessions sess ON op.SessionID = sess.SessionID
-        JOIN time_slots ts ON s.SlotID = ts.SlotID
-        WHERE 1=1
+        SELECT DayOfWeek, SlotID, CourseName, FirstName, LastName, RoomNumber, SemesterID, SemesterName, StartTime, EndTime, ProgramName, DepartmentName
+        FROM schedule_view
+        WHERE DepartmentName IS NOT NULL AND SessionID IS NOT NULL
     """
     params = []
 
     if session_id:
-        query += " AND sess.SessionID = %s"
+        query += " AND SessionID = %s"
         params.append(session_id)
     if program_id:
-        query += " AND op.ProgramID = %s"
+        query += " AND ProgramID = %s"
         params.append(program_id)
     if semester_id:
-        query += " AND sem.SemesterID = %s"
+        query += " AND SemesterID = %s"
         params.append(semester_id)
 
-    query += " ORDER BY sem.SemesterID, s.DayOfWeek, ts.StartTime"
+    query += " ORDER BY SemesterID, DayNo, StartTime"
 
     cur.execute(query, tuple(params))
     schedules = cur.fetchall()
@@ -2175,12 +2725,9 @@ def weekly_timetable():
             }
 
     # Fetch filter options
-    cur.execute("SELECT * FROM sessions ORDER BY StartYear DESC")
-    sessions = cur.fetchall()
-    cur.execute("SELECT * FROM offered_programs ORDER BY ProgramName")
-    programs = cur.fetchall()
-    cur.execute("SELECT * FROM semesters ORDER BY SemesterName")
-    semesters = cur.fetchall()
+    sessions = reference_rows('sessions', "SELECT * FROM sessions ORDER BY StartYear DESC")
+    programs = reference_rows('offered_programs', "SELECT * FROM offered_programs ORDER BY ProgramName")
+    semesters = reference_rows('semesters', "SELECT * FROM semesters ORDER BY SemesterName")
 
     cur.close()
 
@@ -2195,5 +2742,8 @@ def weekly_timetable():
                            selected_semester=semester_id,
                            days=days)
 if __name__ == '__main__':
+    # Warm the schedule occupancy index before serving requests
+    with app.app_context():
+        get_schedule_index()
     app.run(debug=True)
 
@@ -0,0 +1,232 @@
+"""Per-student, per-course, per-semester attendance counters.
+
+attendance_rollups (migration 0008) keeps Present, Absent and Total
+counts for every (StudentID, CourseID, SemesterID), so an attendance
+percentage or a shortfall report reads one small indexed table instead
+of aggregating attendance. Percentage is a stored generated column,
+indexed per semester, so "everyone under 75%" is a range scan.
+
+attendance has no semester column. An attendance row belongs to the
+semester of the student's assignment of the course
+(assign_courses_to_student -> current_semester) whose StartDate-EndDate
+covers the date, else the latest such assignment; attendance for a
+course the student is not assigned is counted under SemesterID 0.
+
+The attendance write routes keep the counters current in their own
+transaction with RollupUpdate:
+
+    update = RollupUpdate(connection, keys)   # before writing the rows
+    ...INSERT/UPDATE/DELETE attendance...
+    update.apply(new_statuses)                # then commit
+
+RollupUpdate locks the rollup rows of the keys first, in key order, so
+writers of the same student and course are serialised, then reads the
+statuses before the write FOR UPDATE. A locking read sees the latest
+committed rows, not the snapshot the caller's earlier SELECTs fixed, so
+the statuses it reads are the ones the write replaces even when another
+writer committed in between; apply() adds the differences. Writers of
+different classes touch different rollup rows and do not wait for each
+other.
+
+backfill() rebuilds the counters from the attendance table, one chunk of
+students per transaction. Run it once after the migration, and again
+after reassigning courses to other semesters, which moves existing
+attendance between semesters without going through these hooks.
+
+Usage (from the project root, after `python migrate.py`):
+
+    python attendance_rollups.py --backfill
+    python attendance_rollups.py --backfill --chunk 100
+    python attendance_rollups.py --student 42 --student 43
+"""
+import argparse
+import datetime
+
+import MySQLdb.cursors
+
+CHUNK_SIZE = 200            # students per backfill transaction
+BATCH_SIZE = 1000           # rows per multi-row upsert
+SHORTFALL_THRESHOLD = 75    # percent
+
+UNASSIGNED_SEMESTER = 0
+
+ASSIGNMENTS_QUERY = """
+    SELECT DISTINCT acs.StudentID, acs.CourseID, cs.SemesterID, cs.StartDate, cs.EndDate
+    FROM assign_courses_to_student acs
+    JOIN current_semester cs ON acs.CurrentSemesterID = cs.CurrentSemesterID
+    WHERE {where}
+"""
+
+LOCK = ("INSERT INTO attendance_rollups (StudentID, CourseID, SemesterID) VALUES {values} "
+        "ON DUPLICATE KEY UPDATE Total = Total")
+
+ADD = ("INSERT INTO attendance_rollups (StudentID, CourseID, SemesterID, Present, Absent, Total) "
+       "VALUES (%s, %s, %s, %s, %s, %s) "
+       "ON DUPLICATE KEY UPDATE Present = Present + VALUES(Present), Absent = Absent + VALUES(Absent), "
+       "Total = Total + VALUES(Total)")
+
+
+def _date(value):
+    return datetime.date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _key(student_id, course_id, date):
+    return int(student_id), int(course_id), _date(date)
+
+
+def semester_for(windows, date):
+    """The SemesterID among [(SemesterID, StartDate, EndDate)] that a date of attendance belongs to."""
+    if not windows:
+        return UNASSIGNED_SEMESTER
+    covering = [w for w in windows if w[1] and w[2] and w[1] <= date <= w[2]]
+    return max(covering or windows, key=lambda w: (w[1] or datetime.date.min, w[0] or 0))[0] or UNASSIGNED_SEMESTER
+
+
+def load_windows(cur, where, params):
+    """{(StudentID, CourseID): [(SemesterID, StartDate, EndDate)]} for the assignments matching where."""
+    cur.execute(ASSIGNMENTS_QUERY.format(where=where), params)
+    windows = {}
+    for row in cur.fetchall():
+        windows.setdefault((row['StudentID'], row['CourseID']), []).append(
+            (row['SemesterID'], row['StartDate'], row['EndDate']))
+    return windows
+
+
+def counts(status):
+    """(present, absent, total) contributed by one attendance row with this status (None: no row)."""
+    if status is None:
+        return 0, 0, 0
+    return int(status == 'Present'), int(status == 'Absent'), 1
+
+
+def _add(cur, deltas):
+    """Add {(StudentID, CourseID, SemesterID): [present, absent, total]} to the counters, skipping zeros."""
+    rows = [key + tuple(values) for key, values in sorted(deltas.items()) if any(values)]
+    for i in range(0, len(rows), BATCH_SIZE):
+        cur.executemany(ADD, rows[i:i + BATCH_SIZE])
+    return len(rows)
+
+
+class RollupUpdate:
+    """Counter maintenance for one attendance write, in the caller's transaction.
+
+    keys are the (StudentID, CourseID, AttendanceDate) of every row the
+    write may insert, change or delete.
+    """
+
+    def __init__(self, connection, keys):
+        self.connection = connection
+        keys = sorted({_key(*key) for key in keys})
+        pairs = sorted({key[:2] for key in keys})
+        self.semesters = {}
+        self.before = {}
+        if not keys:
+            return
+        cur = connection.cursor(MySQLdb.cursors.DictCursor)
+        windows = load_windows(cur, f"(acs.StudentID, acs.CourseID) IN ({', '.join(['(%s, %s)'] * len(pairs))})",
+                               [value for pair in pairs for value in pair])
+        self.semesters = {key: semester_for(windows.get(key[:2]), key[2]) for key in keys}
+
+        rollups = sorted({key[:2] + (semester,) for key, semester in self.semesters.items()})
+        cur.execute(LOCK.format(values=', '.join(['(%s, %s, %s)'] * len(rollups))),
+                    [value for rollup in rollups for value in rollup])
+        cur.execute(f"SELECT StudentID, CourseID, AttendanceDate, AttendanceStatus FROM attendance "
+                    f"WHERE (StudentID, CourseID, AttendanceDate) IN ({', '.join(['(%s, %s, %s)'] * len(keys))}) "
+                    "FOR UPDATE",
+                    [value for key in keys for value in key])
+        for row in cur.fetchall():
+            self.before[(row['StudentID'], row['CourseID'], row['AttendanceDate'])] = row['AttendanceStatus']
+        cur.close()
+
+    def apply(self, after):
+        """Record the write: after maps keys to their new status, None for deleted rows.
+
+        Keys left out of after are taken as unchanged; of keys naming the
+        same row, the last one wins.
+        """
+        deltas = {}
+        for key, status in {_key(*key): status for key, status in after.items()}.items():
+            old, new = counts(self.before.get(key)), counts(status)
+            values = deltas.setdefault(key[:2] + (self.semesters[key],), [0, 0, 0])
+            for i in range(3):
+                values[i] += new[i] - old[i]
+        cur = self.connection.cursor()
+        written = _add(cur, deltas)
+        cur.close()
+        return written
+
+
+def _rebuild(cur, condition, params):
+    """Recount the students matching condition, a filter on {column}; return the rollup rows written.
+
+    The counters are deleted (locking them, as RollupUpdate does) before
+    the attendance rows are read with a shared lock, so writers wait for
+    the chunk instead of being lost from it.
+    """
+    cur.execute(f"DELETE FROM attendance_rollups WHERE {condition.format(column='StudentID')}", params)
+    windows = load_windows(cur, condition.format(column='acs.StudentID'), params)
+    cur.execute(f"SELECT StudentID, CourseID, AttendanceDate, AttendanceStatus FROM attendance "
+                f"WHERE {condition.format(column='StudentID')} LOCK IN SHARE MODE", params)
+    totals = {}
+    for row in cur.fetchall():
+        semester = semester_for(windows.get((row['StudentID'], row['CourseID'])), row['AttendanceDate'])
+        values = totals.setdefault((row['StudentID'], row['CourseID'], semester), [0, 0, 0])
+        for i, n in enumerate(counts(row['AttendanceStatus'])):
+            values[i] += n
+    return _add(cur, totals)
+
+
+def backfill(connection, chunk_size=CHUNK_SIZE, student_ids=None, log=None):
+    """Rebuild the counters from attendance, chunk_size students per transaction; return rows written.
+
+    With student_ids only those students are rebuilt.
+    """
+    cur = connection.cursor(MySQLdb.cursors.DictCursor)
+    written = 0
+    if student_ids:
+        ids = sorted(set(student_ids))
+        for i in range(0, len(ids), chunk_size):
+            chunk = ids[i:i + chunk_size]
+            written += _rebuild(cur, f"{{column}} IN ({', '.join(['%s'] * len(chunk))})", chunk)
+            connection.commit()
+        cur.close()
+        return written
+    last_id = 0
+    while True:
+        cur.execute("SELECT DISTINCT StudentID FROM attendance WHERE StudentID > %s ORDER BY StudentID LIMIT %s",
+                    (last_id, chunk_size))
+        ids = [row['StudentID'] for row in cur.fetchall()]
+        if not ids:
+            break
+        low, high = ids[0], ids[-1]
+        # From last_id, so counters of students whose attendance is all gone are cleared too
+        w = _rebuild(cur, "{column} > %s AND {column} <= %s", (last_id, high))
+        connection.commit()
+        written += w
+        last_id = high
+        if log:
+            log(f"students {low}-{high}: {w} rollup row(s)")
+    cur.execute("DELETE FROM attendance_rollups WHERE StudentID > %s", (last_id,))
+    connection.commit()
+    cur.close()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backfill', action='store_true', help='rebuild the counters of every student')
+    parser.add_argument('--chunk', type=int, default=CHUNK_SIZE, help='students per transaction')
+    parser.add_argument('--student', type=int, action='append', default=[], help='rebuild one student (repeatable)')
+    args = parser.parse_args()
+    if not args.backfill and not args.student:
+        parser.error("give --backfill or --student")
+
+    from app import app, mysql
+
+    with app.app_context():
+        written = backfill(mysql.connection, args.chunk, student_ids=args.student or None, log=print)
+        print(f"{written} rollup row(s) written.")
+
+
+if __name__ == '__main__':
+    main()
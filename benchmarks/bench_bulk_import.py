@@ -0,0 +1,93 @@
+"""Benchmark: bulk_import of a large student file.
+
+Run from the project root:
+
+    python -m benchmarks.bench_bulk_import
+    python -m benchmarks.bench_bulk_import --rows 50000 --chunk 1000 --bad 0.01
+
+Writes a CSV of --rows students (a --bad fraction of them with an unknown
+department or a repeated enrollment number) and imports it into a scratch
+database (--database, default timetable_bench) created from
+database_schema.sql and the migrations, first with --dry-run and then for
+real. Prints rows per second, the error count and the peak Python memory
+(tracemalloc) of each run. The scratch database is dropped at the end
+unless --keep is given. --rows-per-insert 1 shows the old one INSERT and
+commit per row for comparison.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import bulk_import
+from synthetic_data import create_database, insert_many
+
+
+def write_csv(path, rows, bad, seed):
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write('FirstName,LastName,EnrollmentNo,Email,DepartmentName\n')
+        for i in range(1, rows + 1):
+            enrollment = f"ENR{i:07d}"
+            department = f"Dept {i % 10 + 1}"
+            if rng.random() < bad:
+                if rng.random() < 0.5:
+                    department = 'No Such Dept'
+                else:
+                    enrollment = f"ENR{max(1, i - 1):07d}"
+            f.write(f"Student,{i},{enrollment},s{i}@example.edu,{department}\n")
+
+
+def run(conn, path, chunk, dry_run):
+    tracemalloc.start()
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        result = bulk_import.run_import(conn, 'students', f, path, dry_run=dry_run, chunk_size=chunk)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    name = 'dry run' if dry_run else f"import x{chunk}"
+    print(f"{name:<14} {elapsed:7.2f} s  {result['rows'] / elapsed:9.0f} rows/s  {result['inserted']:>7} ok  "
+          f"{result['failed']:>5} errors  peak {peak / 1e6:6.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--chunk', type=int, default=bulk_import.CHUNK_SIZE, help='rows per INSERT/commit')
+    parser.add_argument('--rows-per-insert', type=int, help='run a second import with this chunk size')
+    parser.add_argument('--bad', type=float, default=0.01, help='fraction of invalid rows')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--database', default='timetable_bench')
+    parser.add_argument('--keep', action='store_true', help='keep the scratch database')
+    args = parser.parse_args()
+
+    from app import app
+
+    conn = create_database(app.config, args.database)
+    fd, path = tempfile.mkstemp(suffix='.csv')
+    os.close(fd)
+    try:
+        cur = conn.cursor()
+        insert_many(cur, 'departments', ('DepartmentID', 'DepartmentName'), [(d, f"Dept {d}") for d in range(1, 11)])
+        conn.commit()
+        cur.close()
+        write_csv(path, args.rows, args.bad, args.seed)
+        print(f"{args.rows} students, {os.path.getsize(path) / 1e6:.1f} MB CSV\n")
+        run(conn, path, args.chunk, dry_run=True)
+        run(conn, path, args.chunk, dry_run=False)
+        if args.rows_per_insert:
+            conn.cursor().execute("DELETE FROM students")
+            conn.commit()
+            run(conn, path, args.rows_per_insert, dry_run=False)
+    finally:
+        os.remove(path)
+        if not args.keep:
+            conn.cursor().execute(f"DROP DATABASE IF EXISTS `{args.database}`")
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
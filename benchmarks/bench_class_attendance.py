@@ -0,0 +1,149 @@
+"""Benchmark: the class attendance sheet, opened then saved, on one pooled connection.
+
+Run from the project root:
+
+    python -m benchmarks.bench_class_attendance
+    python -m benchmarks.bench_class_attendance --classes 200 --students 20000 --schedule 60000 --seed 1
+    python -m benchmarks.bench_class_attendance --reuse --keep
+
+The benchmark needs the MySQL server the app is configured for. It creates
+a scratch database (--database, default timetable_bench_attendance) and
+fills it with synthetic_data.py at the given sizes and seed, or with
+--reuse times the one already there. The database is dropped at the end
+unless --keep or --reuse is given.
+
+The pool is limited to one connection, so every request of a teacher
+opening a sheet and saving it runs on the same connection, as it does
+under load. For --classes scheduled classes, through the Flask test
+client as an admin:
+
+    open        GET /attendance/class/<id>
+    save        POST of the sheet with every status flipped
+    re-save     POST of the same statuses again (rows unchanged)
+
+A save that does not flash success stops the benchmark with the message
+the teacher would have seen.
+"""
+import argparse
+import random
+import statistics
+import time
+
+import MySQLdb.cursors
+
+import class_attendance
+import synthetic_data
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def pick(conn, classes, seed):
+    """[(ScheduleID, date, roster)] for a sample of classes that have students."""
+    cur = conn.cursor(MySQLdb.cursors.DictCursor)
+    cur.execute("SELECT ScheduleID FROM schedule ORDER BY ScheduleID")
+    ids = [row['ScheduleID'] for row in cur.fetchall()]
+    picked = []
+    for schedule_id in random.Random(seed).sample(ids, len(ids)):
+        schedule = class_attendance.load_class(cur, schedule_id)
+        date = class_attendance.default_date(schedule)
+        students = class_attendance.roster(cur, schedule, date)
+        if students:
+            picked.append((schedule_id, date, students))
+        if len(picked) == classes:
+            break
+    cur.close()
+    conn.rollback()
+    return picked
+
+
+def flashed(client):
+    """The (category, message) pairs flashed since the last call."""
+    with client.session_transaction() as session:
+        return session.pop('_flashes', [])
+
+
+def post(client, schedule_id, date, form):
+    start = time.perf_counter()
+    response = client.post(f"/attendance/class/{schedule_id}?date={date.isoformat()}", data=form)
+    elapsed = time.perf_counter() - start
+    messages = flashed(client)
+    if response.status_code != 302 or not messages or messages[-1][0] != 'success':
+        raise SystemExit(f"saving class {schedule_id} on {date} answered {response.status_code}: "
+                         f"{messages[-1][1] if messages else 'no message'}")
+    return elapsed
+
+
+def run(client, picked):
+    timings = {'open': [], 'save': [], 're-save': []}
+    for schedule_id, date, students in picked:
+        start = time.perf_counter()
+        response = client.get(f"/attendance/class/{schedule_id}?date={date.isoformat()}")
+        response.get_data()
+        timings['open'].append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise SystemExit(f"opening class {schedule_id} answered {response.status_code}")
+
+        form = {f"status_{student['StudentID']}": 'Absent' if student['AttendanceStatus'] == 'Present' else 'Present'
+                for student in students}
+        timings['save'].append(post(client, schedule_id, date, form))
+        timings['re-save'].append(post(client, schedule_id, date, form))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', default='timetable_bench_attendance')
+    parser.add_argument('--reuse', action='store_true', help='time the data already in --database')
+    parser.add_argument('--keep', action='store_true', help='keep the scratch database')
+    parser.add_argument('--classes', type=int, default=100, help='classes opened and saved')
+    synthetic_data.add_size_arguments(parser)
+    args = parser.parse_args()
+
+    import app as app_module
+
+    app = app_module.app
+    if args.database == app.config['MYSQL_DB']:
+        parser.error(f"{args.database} is the app's own database; choose another name")
+
+    sizes = synthetic_data.sizes_from(args)
+    if not args.reuse:
+        start = time.perf_counter()
+        tables, summary = synthetic_data.generate(sizes, args.seed)
+        conn = synthetic_data.create_database(app.config, args.database, app_module.AppConnection)
+        synthetic_data.load(conn, tables)
+        print(f"Loaded {summary['schedule']} classes, {sizes['students']} students in "
+              f"{time.perf_counter() - start:.1f} s\n")
+    else:
+        conn = synthetic_data.connect(app.config, args.database, app_module.AppConnection)
+    picked = pick(conn, args.classes, args.seed)
+    conn.close()
+    if not picked:
+        raise SystemExit(f"no class in {args.database} has students")
+
+    # Before the pool opens its first connection: one connection, shared by every request
+    app.config.update(MYSQL_DB=args.database, MYSQL_POOL_SIZE=1, MYSQL_POOL_MAX_OVERFLOW=0, TESTING=True)
+    try:
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session.update({'loggedin': True, 'role': 'admin', 'username': 'admin'})
+        timings = run(client, picked)
+    finally:
+        app_module.mysql.get_pool().close_all()
+        if not args.keep and not args.reuse:
+            conn = synthetic_data.connect(app.config, connection_class=app_module.AppConnection)
+            conn.cursor().execute(f"DROP DATABASE IF EXISTS `{args.database}`")
+            conn.close()
+
+    students = statistics.mean(len(roster) for _, _, roster in picked)
+    print(f"{len(picked)} classes, {students:.1f} students each, on one pooled connection\n")
+    print(f"{'':<10} {'median':>9} {'p95':>9} {'max':>9}")
+    for name, samples in timings.items():
+        ms = [s * 1000 for s in samples]
+        print(f"{name:<10} {statistics.median(ms):9.1f} {percentile(ms, 95):9.1f} {max(ms):9.1f}")
+
+
+if __name__ == '__main__':
+    main()
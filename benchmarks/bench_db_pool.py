@@ -0,0 +1,92 @@
+"""Load test: a new MySQL connection per request vs the connection pool.
+
+Run from the project root against the database configured in app.py:
+
+    python -m benchmarks.bench_db_pool
+    python -m benchmarks.bench_db_pool --threads 64 --requests 200 --pool-size 10 --overflow 10
+
+Each simulated request borrows a connection, runs --query and gives the
+connection back, from --threads concurrent threads. The "connect" run
+opens and closes a connection per request, as flask_mysqldb does; the
+"pool" run uses db_pool.ConnectionPool with the given size and overflow.
+Both report throughput and latency percentiles; the pool run also prints
+its gauges (waits, wait time, connections created).
+"""
+import argparse
+import threading
+import time
+
+from db_pool import ConnectionPool
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(name, borrow, give_back, threads, requests, query):
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker():
+        mine = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            try:
+                conn = borrow()
+                cur = conn.cursor()
+                cur.execute(query)
+                cur.fetchall()
+                cur.close()
+                give_back(conn)
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+                continue
+            mine.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(mine)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+
+    if latencies:
+        print(f"{name:<8} {len(latencies) / elapsed:9.0f} req/s  "
+              f"p50 {percentile(latencies, 50) * 1000:7.2f} ms  p95 {percentile(latencies, 95) * 1000:7.2f} ms  "
+              f"p99 {percentile(latencies, 99) * 1000:7.2f} ms  errors {len(errors)}")
+    else:
+        print(f"{name:<8} every request failed: {errors[0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=200, help='requests per thread')
+    parser.add_argument('--pool-size', type=int, default=10)
+    parser.add_argument('--overflow', type=int, default=10)
+    parser.add_argument('--query', default='SELECT RoomID, RoomNumber FROM rooms')
+    args = parser.parse_args()
+
+    from app import mysql
+
+    connect = mysql._connect
+    print(f"{args.threads} threads x {args.requests} requests, query: {args.query}\n")
+
+    run('connect', connect, lambda conn: conn.close(), args.threads, args.requests, args.query)
+
+    pool = ConnectionPool(connect, size=args.pool_size, max_overflow=args.overflow, timeout=60)
+    run('pool', pool.acquire, pool.release, args.threads, args.requests, args.query)
+    print()
+    for key, value in pool.stats().items():
+        print(f"  {key:<20} {value}")
+    pool.close_all()
+
+
+if __name__ == '__main__':
+    main()
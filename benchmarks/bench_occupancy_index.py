@@ -0,0 +1,143 @@
+"""Benchmark: OccupancyIndex vs the SQL conflict checks at 50k schedule rows.
+
+Run from the project root:
+
+    python -m benchmarks.bench_occupancy_index            # in-memory only
+    python -m benchmarks.bench_occupancy_index --sql      # also time MySQL
+
+The --sql run loads the same rows into a scratch `schedule_bench` table
+(same columns as `schedule`, no indexes beyond the primary key, just like
+the real table) and drops it again afterwards.
+"""
+import argparse
+import random
+import time
+
+from occupancy_index import OccupancyIndex
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+
+
+def make_rows(count, seed=42, rooms=400, faculty=1000, courses=2000, slots=10, semesters=8, programs=60):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(1, count + 1):
+        rows.append({
+            'ScheduleID': i,
+            'CourseID': rng.randint(1, courses),
+            'FacultyID': rng.randint(1, faculty),
+            'RoomID': rng.randint(1, rooms),
+            'SlotID': rng.randint(1, slots),
+            'DayOfWeek': rng.choice(DAYS),
+            'SemesterID': rng.randint(1, semesters),
+            'ProgramID': rng.randint(1, programs),
+        })
+    return rows
+
+
+def make_probes(rows, count, seed=7):
+    # Half the probes hit an existing booking, half are random misses
+    rng = random.Random(seed)
+    probes = []
+    for i in range(count):
+        if i % 2 == 0:
+            probes.append(dict(rng.choice(rows)))
+        else:
+            probes.append(make_rows(1, seed=rng.random())[0])
+    return probes
+
+
+def report(name, seconds, calls):
+    print(f"{name:<34} {seconds * 1000:10.1f} ms total {seconds / calls * 1e6:10.2f} us/check")
+
+
+def bench_index(rows, probes):
+    index = OccupancyIndex()
+    start = time.perf_counter()
+    index.load(rows)
+    print(f"{'index build':<34} {(time.perf_counter() - start) * 1000:10.1f} ms for {len(rows)} rows")
+
+    start = time.perf_counter()
+    for p in probes:
+        index.room_conflict(p['RoomID'], p['SlotID'], p['DayOfWeek'], p['SemesterID'])
+    report('index room_conflict', time.perf_counter() - start, len(probes))
+
+    start = time.perf_counter()
+    for p in probes:
+        index.faculty_conflict(p['FacultyID'], p['SlotID'], p['DayOfWeek'], program_id=p['ProgramID'])
+    report('index faculty_conflict', time.perf_counter() - start, len(probes))
+
+    start = time.perf_counter()
+    for p in probes:
+        index.course_conflict(p['ProgramID'], p['DayOfWeek'], p['CourseID'])
+    report('index course_conflict', time.perf_counter() - start, len(probes))
+
+
+def bench_sql(rows, probes):
+    import MySQLdb.cursors
+    from app import app, mysql
+
+    with app.app_context():
+        cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        cur.execute("DROP TABLE IF EXISTS schedule_bench")
+        cur.execute("""
+            CREATE TABLE schedule_bench (
+                ScheduleID INT AUTO_INCREMENT PRIMARY KEY,
+                CourseID INT, FacultyID INT, RoomID INT, SlotID INT,
+                DayOfWeek VARCHAR(255), SemesterID INT, ProgramID INT
+            )
+        """)
+        columns = ('ScheduleID', 'CourseID', 'FacultyID', 'RoomID', 'SlotID', 'DayOfWeek', 'SemesterID', 'ProgramID')
+        for i in range(0, len(rows), 5000):
+            cur.executemany(
+                "INSERT INTO schedule_bench (ScheduleID, CourseID, FacultyID, RoomID, SlotID, DayOfWeek, SemesterID, ProgramID) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+                [tuple(r[c] for c in columns) for r in rows[i:i + 5000]])
+        mysql.connection.commit()
+
+        try:
+            # Same statements as has_conflict / add_class
+            start = time.perf_counter()
+            for p in probes:
+                cur.execute("SELECT * FROM schedule_bench WHERE RoomID=%s AND SlotID=%s AND DayOfWeek=%s AND SemesterID=%s",
+                            (p['RoomID'], p['SlotID'], p['DayOfWeek'], p['SemesterID']))
+                cur.fetchone()
+            report('sql room conflict', time.perf_counter() - start, len(probes))
+
+            start = time.perf_counter()
+            for p in probes:
+                cur.execute("SELECT * FROM schedule_bench WHERE FacultyID=%s AND SlotID=%s AND DayOfWeek=%s AND ProgramID=%s",
+                            (p['FacultyID'], p['SlotID'], p['DayOfWeek'], p['ProgramID']))
+                cur.fetchone()
+            report('sql faculty conflict', time.perf_counter() - start, len(probes))
+
+            start = time.perf_counter()
+            for p in probes:
+                cur.execute("SELECT * FROM schedule_bench WHERE ProgramID=%s AND DayOfWeek=%s AND CourseID=%s",
+                            (p['ProgramID'], p['DayOfWeek'], p['CourseID']))
+                cur.fetchone()
+            report('sql course conflict', time.perf_counter() - start, len(probes))
+        finally:
+            cur.execute("DROP TABLE IF EXISTS schedule_bench")
+            cur.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--checks', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--sql', action='store_true', help='also time the SQL checks against MySQL')
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows, seed=args.seed)
+    probes = make_probes(rows, args.checks)
+    print(f"{args.rows} schedule rows, {args.checks} checks per method\n")
+    bench_index(rows, probes)
+    if args.sql:
+        print()
+        bench_sql(rows, probes)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Benchmark: room heatmap tensor build and analysis for a whole campus week.
+
+Run from the project root:
+
+    python -m benchmarks.bench_room_heatmap
+    python -m benchmarks.bench_room_heatmap --rooms 600 --rows 100000
+
+Rows are random (semester, room, day, slot) bookings, so some cells are
+double booked; no database is needed.
+"""
+import argparse
+import datetime
+import random
+import time
+
+import room_heatmap
+
+
+def make_axes(rooms, slots, semesters):
+    room_rows = [{'RoomID': i, 'RoomNumber': f"R{i:03d}"} for i in range(1, rooms + 1)]
+    start = datetime.datetime(2000, 1, 1, 8)
+    slot_rows = [{'SlotID': i, 'StartTime': (start + datetime.timedelta(minutes=30 * (i - 1))).time(),
+                  'EndTime': (start + datetime.timedelta(minutes=30 * i)).time()} for i in range(1, slots + 1)]
+    semester_rows = [{'SemesterID': i, 'SemesterName': f"Semester {i}"} for i in range(1, semesters + 1)]
+    return room_rows, slot_rows, semester_rows
+
+
+def make_rows(count, rooms, slots, semesters, seed=42):
+    rng = random.Random(seed)
+    # Leave the last tenth of the rooms empty so the idle-room list has work to do
+    busy = max(1, rooms - rooms // 10)
+    return [{'SemesterID': rng.randint(1, semesters), 'RoomID': rng.randint(1, busy),
+             'DayNo': rng.randint(1, len(room_heatmap.DAYS)), 'SlotID': rng.randint(1, slots)}
+            for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--rooms', type=int, default=300)
+    parser.add_argument('--slots', type=int, default=48)
+    parser.add_argument('--semesters', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    rooms, slots, semesters = make_axes(args.rooms, args.slots, args.semesters)
+    rows = make_rows(args.rows, args.rooms, args.slots, args.semesters)
+    tensor = room_heatmap.OccupancyTensor()
+    start = time.perf_counter()
+    tensor.load(rows, rooms, slots, semesters)
+    print(f"{args.rows} schedule rows, {args.rooms} rooms x {len(room_heatmap.DAYS)} days x {args.slots} slots "
+          f"x {args.semesters} semesters ({tensor.counts.nbytes / 1024:.0f} KiB)\n")
+    print(f"{'tensor build':<28} {(time.perf_counter() - start) * 1000:10.1f} ms")
+
+    for label, semester_id in (('analyze, all semesters', None), ('analyze, one semester', 1)):
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            result = room_heatmap.analyze(tensor, semester_id)
+        print(f"{label:<28} {(time.perf_counter() - start) / args.repeat * 1000:10.2f} ms/call "
+              f"(utilization {result['utilization']}%, {len(result['idle_rooms'])} idle rooms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""Benchmark: student_timetable_reports full rebuild vs incremental refresh.
+
+Run from the project root:
+
+    python -m benchmarks.bench_student_reports
+    python -m benchmarks.bench_student_reports --students 20000 --edits 50 --seed 1
+
+The benchmark needs the MySQL server the app is configured for. It creates
+a scratch database (--database, default timetable_bench), loads
+database_schema.sql and the migrations into it and seeds a synthetic
+campus: 40 programs of 8 courses, 3 weekly sessions each placed by the
+timetable generator, and --students students, each taking every course of
+their program. The scratch database is dropped at the end unless --keep
+is given.
+
+Timed:
+
+    legacy rebuild      DELETE + one INSERT ... SELECT (populate_student_reports_v3.py)
+    chunked rebuild     student_reports.rebuild() into an empty table
+    chunked re-check    student_reports.rebuild() when nothing changed
+    incremental         refresh_for_schedule() after moving one schedule row
+"""
+import argparse
+import random
+import time
+
+import MySQLdb.cursors
+
+import student_reports
+from synthetic_data import create_database, insert_many
+from timetable_generator import generate_timetable
+
+
+def seed(conn, students, programs=40, courses_per_program=8, sessions=3, rooms=300, slots=8, seed=1):
+    rng = random.Random(seed)
+    cur = conn.cursor()
+    insert_many(cur, 'departments', ('DepartmentID', 'DepartmentName'), [(d, f"Dept {d}") for d in range(1, 11)])
+    insert_many(cur, 'faculty', ('FacultyID', 'FirstName', 'LastName', 'DepartmentID'),
+                [(f, 'Teacher', str(f), f % 10 + 1) for f in range(1, programs * 4 + 1)])
+    insert_many(cur, 'rooms', ('RoomID', 'RoomNumber'), [(r, f"R{r}") for r in range(1, rooms + 1)])
+    insert_many(cur, 'time_slots', ('SlotID', 'StartTime', 'EndTime'),
+                [(s, f"{7 + s:02d}:00:00", f"{8 + s:02d}:00:00") for s in range(1, slots + 1)])
+    insert_many(cur, 'semesters', ('SemesterID', 'SemesterName'), [(s, f"Semester {s}") for s in range(1, 9)])
+    insert_many(cur, 'sessions', ('SessionID', 'StartYear', 'EndYear'), [(1, 2024, 2028)])
+    insert_many(cur, 'offered_programs', ('ProgramID', 'ProgramName', 'SessionID', 'DepartmentID'),
+                [(p, f"Program {p}", 1, p % 10 + 1) for p in range(1, programs + 1)])
+
+    lessons, program_courses, current = [], {}, []
+    for p in range(1, programs + 1):
+        semester = rng.randint(1, 8)
+        current.append((p, p, semester))
+        program_courses[p] = []
+        for i in range(courses_per_program):
+            course = (p - 1) * courses_per_program + i + 1
+            program_courses[p].append(course)
+            lessons.append({'CourseID': course, 'FacultyID': rng.randint(1, programs * 4),
+                            'ProgramID': p, 'SemesterID': semester, 'Sessions': sessions})
+    insert_many(cur, 'courses', ('CourseID', 'CourseName', 'DepartmentID'),
+                [(l['CourseID'], f"Course {l['CourseID']}", l['ProgramID'] % 10 + 1) for l in lessons])
+    insert_many(cur, 'current_semester', ('CurrentSemesterID', 'ProgramID', 'SemesterID'), current)
+
+    placements, _ = generate_timetable(lessons, list(range(1, rooms + 1)), list(range(1, slots + 1)), seed=seed)
+    insert_many(cur, 'schedule', ('CourseID', 'FacultyID', 'RoomID', 'SlotID', 'DayOfWeek', 'SemesterID', 'ProgramID'),
+                [tuple(row[c] for c in ('CourseID', 'FacultyID', 'RoomID', 'SlotID', 'DayOfWeek', 'SemesterID', 'ProgramID'))
+                 for row in placements])
+
+    insert_many(cur, 'students', ('StudentID', 'FirstName', 'LastName', 'DepartmentID'),
+                [(s, 'Student', str(s), s % 10 + 1) for s in range(1, students + 1)])
+    assignments = []
+    for s in range(1, students + 1):
+        p = s % programs + 1
+        assignments.extend((s, p, 1, p, course, 'Yes', 'No') for course in program_courses[p])
+    insert_many(cur, 'assign_courses_to_student',
+                ('StudentID', 'ProgramID', 'SessionID', 'CurrentSemesterID', 'CourseID', 'Allowed', 'Is_Repeater'),
+                assignments)
+    conn.commit()
+    cur.close()
+    return len(placements), len(assignments)
+
+
+def count_reports(conn):
+    cur = conn.cursor(MySQLdb.cursors.DictCursor)
+    cur.execute("SELECT COUNT(*) AS n FROM student_timetable_reports")
+    n = cur.fetchone()['n']
+    cur.close()
+    return n
+
+
+def bench_legacy(conn):
+    cur = conn.cursor()
+    start = time.perf_counter()
+    cur.execute("DELETE FROM student_timetable_reports")
+    cur.execute(f"INSERT INTO student_timetable_reports ({', '.join(student_reports.COLUMNS)}) "
+                + student_reports.SOURCE_QUERY.format(where='1 = 1'))
+    conn.commit()
+    elapsed = time.perf_counter() - start
+    cur.close()
+    print(f"{'legacy rebuild':<22} {elapsed:8.2f} s   {count_reports(conn)} rows")
+
+
+def bench_chunked(conn, chunk):
+    cur = conn.cursor()
+    cur.execute("DELETE FROM student_timetable_reports")
+    conn.commit()
+    cur.close()
+    start = time.perf_counter()
+    written, _ = student_reports.rebuild(conn, chunk)
+    print(f"{'chunked rebuild':<22} {time.perf_counter() - start:8.2f} s   {written} rows written")
+
+    start = time.perf_counter()
+    written, deleted = student_reports.rebuild(conn, chunk)
+    print(f"{'chunked re-check':<22} {time.perf_counter() - start:8.2f} s   {written} written, {deleted} deleted")
+
+
+def bench_incremental(conn, edits, slots, seed):
+    rng = random.Random(seed)
+    cur = conn.cursor(MySQLdb.cursors.DictCursor)
+    cur.execute("SELECT ScheduleID, CourseID, SlotID, SemesterID, ProgramID FROM schedule")
+    rows = cur.fetchall()
+    elapsed = 0.0
+    written = 0
+    for row in rng.sample(rows, min(edits, len(rows))):
+        new_slot = row['SlotID'] % slots + 1
+        cur.execute("UPDATE schedule SET SlotID = %s WHERE ScheduleID = %s", (new_slot, row['ScheduleID']))
+        conn.commit()
+        start = time.perf_counter()
+        w, _ = student_reports.refresh_for_schedule(conn, row)
+        elapsed += time.perf_counter() - start
+        written += w
+    cur.close()
+    n = min(edits, len(rows))
+    print(f"{'incremental':<22} {elapsed / n * 1000:8.1f} ms per schedule edit ({n} edits, {written // n} rows each)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=20000)
+    parser.add_argument('--edits', type=int, default=50, help='schedule rows to move for the incremental run')
+    parser.add_argument('--chunk', type=int, default=student_reports.CHUNK_SIZE, help='students per rebuild step')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--database', default='timetable_bench')
+    parser.add_argument('--keep', action='store_true', help='keep the scratch database')
+    args = parser.parse_args()
+
+    from app import app
+
+    conn = create_database(app.config, args.database)
+    try:
+        classes, assignments = seed(conn, args.students, seed=args.seed)
+        print(f"{args.students} students, {assignments} course assignments, {classes} scheduled classes "
+              f"(seed {args.seed})\n")
+        bench_legacy(conn)
+        bench_chunked(conn, args.chunk)
+        bench_incremental(conn, args.edits, 8, args.seed)
+    finally:
+        if not args.keep:
+            conn.cursor().execute(f"DROP DATABASE IF EXISTS `{args.database}`")
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
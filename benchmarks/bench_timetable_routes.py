@@ -0,0 +1,293 @@
+"""Benchmark: timetable routes and helpers against a synthetic campus.
+
+Run from the project root:
+
+    python -m benchmarks.bench_timetable_routes
+    python -m benchmarks.bench_timetable_routes --students 20000 --faculty 1000 --rooms 400 --schedule 60000 \\
+        --repeat 20 --output before.json
+    python -m benchmarks.bench_timetable_routes --reuse --compare before.json --output after.json
+
+The benchmark needs the MySQL server the app is configured for. It creates
+a scratch database (--database, default timetable_bench_routes) and fills
+it with synthetic_data.py at the given sizes and seed, or with --reuse
+times the one already there. The database is dropped at the end unless
+--keep or --reuse is given.
+
+Every route is requested through the Flask test client as an admin: the
+first request is reported as cold (empty reference, dashboard and index
+caches), the next --repeat as warm. Each request is split into
+
+    sql       time in MySQL, from sql_metrics (what /admin/sql_metrics shows)
+    render    render_template(), from Flask's template signals
+    other     the rest: Python in the view, the caches, Werkzeug
+
+Helpers are called directly inside a request context and split into sql
+and other the same way.
+
+--output writes the results with the seed and sizes as JSON; --compare
+prints the median change against an earlier --output file.
+"""
+import argparse
+import datetime
+import json
+import platform
+import random
+import statistics
+import time
+
+import MySQLdb.cursors
+from flask import before_render_template, g, template_rendered
+
+import dashboard_metrics
+import room_heatmap
+import schedule_validation
+import student_reports
+import synthetic_data
+import timetable_grid
+
+
+def summarize(name, kind, samples):
+    """Timing stats in ms over samples [(total, sql, queries, render)]; the first sample is the cold one."""
+    warm = samples[1:] or samples
+    totals = sorted(s[0] * 1000 for s in warm)
+
+    def mean(i):
+        return statistics.mean(s[i] for s in warm)
+
+    sql_ms, render_ms = mean(1) * 1000, mean(3) * 1000
+    return {'name': name, 'kind': kind, 'runs': len(warm), 'cold_ms': round(samples[0][0] * 1000, 3),
+            'mean_ms': round(statistics.mean(totals), 3), 'median_ms': round(statistics.median(totals), 3),
+            'p95_ms': round(totals[min(len(totals) - 1, int(len(totals) * 0.95))], 3),
+            'min_ms': round(totals[0], 3), 'sql_ms': round(sql_ms, 3), 'queries': round(mean(2), 1),
+            'render_ms': round(render_ms, 3), 'other_ms': round(statistics.mean(totals) - sql_ms - render_ms, 3)}
+
+
+class RenderTimer:
+    """Time spent in render_template() since the last take()."""
+
+    def __init__(self, app):
+        self.seconds = 0.0
+        self._started = None
+        before_render_template.connect(self._before, app)
+        template_rendered.connect(self._after, app)
+
+    def _before(self, sender, **extra):
+        self._started = time.perf_counter()
+
+    def _after(self, sender, **extra):
+        if self._started is not None:
+            self.seconds += time.perf_counter() - self._started
+            self._started = None
+
+    def take(self):
+        seconds, self.seconds = self.seconds, 0.0
+        return seconds
+
+
+def bench_route(client, app_module, renders, endpoint, url, repeat):
+    stats = app_module.sql_stats
+    samples = []
+    for _ in range(repeat + 1):
+        stats.reset()
+        renders.take()
+        start = time.perf_counter()
+        response = client.get(url)
+        response.get_data()
+        total = time.perf_counter() - start
+        if response.status_code != 200:
+            raise SystemExit(f"{url} answered {response.status_code}")
+        totals = stats.endpoints.get(endpoint, {'seconds': 0.0, 'queries': 0})
+        samples.append((total, totals['seconds'], totals['queries'], renders.take()))
+    return summarize(url, 'route', samples)
+
+
+def bench_helper(app_module, name, setup, call, repeat):
+    """Time call(state) repeat + 1 times, each in its own request context; setup() runs first, untimed."""
+    samples = []
+    for _ in range(repeat + 1):
+        with app_module.app.test_request_context():
+            state = setup() if setup else None
+            app_module.sql_stats.start()
+            start = time.perf_counter()
+            call(state)
+            total = time.perf_counter() - start
+            request_stats = g.pop('sql_request')
+        samples.append((total, request_stats.seconds, request_stats.queries, 0.0))
+    return summarize(name, 'helper', samples)
+
+
+def pick(conn, seed):
+    """A program with its current semester, a faculty member, a session and a sample of schedule rows."""
+    cur = conn.cursor(MySQLdb.cursors.DictCursor)
+    cur.execute("SELECT ProgramID, SemesterID FROM current_semester ORDER BY ProgramID LIMIT 1")
+    current = cur.fetchone()
+    cur.execute("SELECT FacultyID FROM schedule GROUP BY FacultyID ORDER BY COUNT(*) DESC LIMIT 1")
+    faculty = cur.fetchone()
+    cur.execute("SELECT SessionID FROM offered_programs WHERE ProgramID = %s", (current['ProgramID'],))
+    session_id = cur.fetchone()['SessionID']
+    cur.execute("SELECT ScheduleID, CourseID, FacultyID, RoomID, SlotID, DayOfWeek, SemesterID, ProgramID "
+                "FROM schedule ORDER BY ScheduleID")
+    rows = list(cur.fetchall())
+    cur.close()
+    rows = random.Random(seed).sample(rows, min(500, len(rows)))
+    return current['ProgramID'], current['SemesterID'], faculty['FacultyID'], session_id, rows
+
+
+def routes(program_id, semester_id, faculty_id, session_id):
+    """(endpoint, url) for every timetable view, with the filters a user would pick."""
+    return [
+        ('room_timetable', '/timetable/room?day=Monday'),
+        ('room_timetable', f"/timetable/room?day=Monday&program_id={program_id}&semester_id={semester_id}"),
+        ('faculty_timetable', f"/timetable/faculty?faculty={faculty_id}"),
+        ('faculty_timetable', '/timetable/faculty?day=Monday'),
+        ('faculty_timetable_report', f"/faculty_timetable_report?faculty={faculty_id}"),
+        ('student_timetable', f"/timetable/student?program_id={program_id}&semester_id={semester_id}"),
+        ('student_timetable_report', f"/timetable/student_report?program={program_id}&semester={semester_id}"),
+        ('weekly_timetable', f"/weekly_timetable?session_id={session_id}&program_id={program_id}"),
+        ('weekly_timetable', f"/weekly_timetable?session_id={session_id}"),
+        ('dashboard', '/dashboard'),
+        ('api_dashboard_metrics', '/api/dashboard_metrics'),
+        ('room_heatmap_page', '/timetable/heatmap'),
+    ]
+
+
+def helpers(app_module, rows):
+    """(name, setup, call) for the helpers behind the routes."""
+    mysql = app_module.mysql
+
+    def rebuild_index(state):
+        app_module.schedule_index.invalidate()
+        app_module.get_schedule_index()
+
+    def conflicts(state):
+        for row in rows:
+            app_module.has_conflict(row['RoomID'], row['FacultyID'], row['SlotID'], row['DayOfWeek'],
+                                    row['SemesterID'], row['ProgramID'])
+
+    def faculty_grid_setup():
+        cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        cur.execute("SELECT ScheduleID, DayOfWeek, SlotID, StartTime, EndTime, RoomNumber, CourseName, FacultyID, "
+                    "ProgramName, SemesterName FROM schedule_view ORDER BY FacultyID, DayNo, StartTime")
+        schedules = cur.fetchall()
+        cur.execute("SELECT FacultyID, FirstName, LastName FROM faculty ORDER BY FirstName, LastName")
+        faculties = cur.fetchall()
+        cur.execute("SELECT * FROM time_slots ORDER BY StartTime")
+        slots = cur.fetchall()
+        cur.close()
+        return schedules, faculties, slots
+
+    def faculty_grid(state):
+        schedules, faculties, slots = state
+        timetable_grid.group_by_faculty(schedules, faculties, list(synthetic_data.DAYS), slots)
+
+    def validate_setup():
+        index = app_module.get_schedule_index()
+        known = {field: {row[field] for row in rows} for field in schedule_validation.FIELDS}
+        # Half the draft repeats booked cells, half moves them to another day
+        draft = [dict(row, DayOfWeek=synthetic_data.DAYS[(synthetic_data.DAYS.index(row['DayOfWeek']) + i % 2) % 6])
+                 for i, row in enumerate(rows)]
+        return index, known, draft
+
+    def validate(state):
+        index, known, draft = state
+        with index.lock:
+            schedule_validation.validate(draft, index, known)
+
+    def heatmap_load(state):
+        app_module.room_tensor.version = None
+        app_module.get_room_tensor()
+
+    def heatmap_analyze_setup():
+        return app_module.get_room_tensor()
+
+    return [
+        ('get_schedule_index (rebuild)', None, rebuild_index),
+        (f"has_conflict x{len(rows)}", lambda: app_module.get_schedule_index(), conflicts),
+        ('timetable_grid.group_by_faculty', faculty_grid_setup, faculty_grid),
+        (f"schedule_validation.validate x{len(rows)}", validate_setup, validate),
+        ('dashboard_metrics.compute', None, lambda state: dashboard_metrics.compute(mysql.connection)),
+        ('room heatmap load', None, heatmap_load),
+        ('room_heatmap.analyze', heatmap_analyze_setup, lambda tensor: room_heatmap.analyze(tensor)),
+        ('refresh_for_schedule', None, lambda state: student_reports.refresh_for_schedule(mysql.connection, rows[0])),
+    ]
+
+
+def print_results(results, previous=None):
+    print(f"{'':<44} {'cold':>9} {'median':>9} {'p95':>9} {'sql':>9} {'render':>9} {'other':>9} {'queries':>7}")
+    old = {(r['kind'], r['name']): r for r in (previous or [])}
+    for r in results:
+        line = (f"{r['name'][:44]:<44} {r['cold_ms']:9.1f} {r['median_ms']:9.1f} {r['p95_ms']:9.1f} "
+                f"{r['sql_ms']:9.1f} {r['render_ms']:9.1f} {r['other_ms']:9.1f} {r['queries']:7.1f}")
+        before = old.get((r['kind'], r['name']))
+        if before and before['median_ms']:
+            line += f"   {(r['median_ms'] - before['median_ms']) / before['median_ms'] * 100:+6.1f}% median"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', default='timetable_bench_routes')
+    parser.add_argument('--reuse', action='store_true', help='time the data already in --database')
+    parser.add_argument('--keep', action='store_true', help='keep the scratch database')
+    parser.add_argument('--repeat', type=int, default=10, help='warm runs per route and helper')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON file from an earlier --output to compare medians with')
+    synthetic_data.add_size_arguments(parser)
+    args = parser.parse_args()
+
+    import app as app_module
+
+    app = app_module.app
+    if args.database == app.config['MYSQL_DB']:
+        parser.error(f"{args.database} is the app's own database; choose another name")
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)['results']
+
+    sizes = synthetic_data.sizes_from(args)
+    if not args.reuse:
+        start = time.perf_counter()
+        tables, summary = synthetic_data.generate(sizes, args.seed)
+        conn = synthetic_data.create_database(app.config, args.database, app_module.AppConnection)
+        synthetic_data.load(conn, tables)
+        print(f"Loaded {summary['schedule']} classes, {sizes['students']} students ({summary['unplaced']} unplaced) "
+              f"in {time.perf_counter() - start:.1f} s\n")
+    else:
+        conn = synthetic_data.connect(app.config, args.database, app_module.AppConnection)
+    program_id, semester_id, faculty_id, session_id, rows = pick(conn, args.seed)
+    conn.close()
+
+    # Before the pool opens its first connection
+    app.config['MYSQL_DB'] = args.database
+    app.config['TESTING'] = True
+    renders = RenderTimer(app)
+    results = []
+    try:
+        # Not `with client:`, which would hold back each request's teardown (and its SQL totals)
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session.update({'loggedin': True, 'role': 'admin', 'username': 'admin'})
+        for endpoint, url in routes(program_id, semester_id, faculty_id, session_id):
+            results.append(bench_route(client, app_module, renders, endpoint, url, args.repeat))
+        for name, setup, call in helpers(app_module, rows):
+            results.append(bench_helper(app_module, name, setup, call, args.repeat))
+    finally:
+        app_module.mysql.get_pool().close_all()
+        if not args.keep and not args.reuse:
+            conn = synthetic_data.connect(app.config, connection_class=app_module.AppConnection)
+            conn.cursor().execute(f"DROP DATABASE IF EXISTS `{args.database}`")
+            conn.close()
+
+    print_results(results, previous)
+    if args.output:
+        meta = {'seed': args.seed, 'sizes': sizes, 'database': args.database, 'repeat': args.repeat,
+                'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version()}
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,362 @@
+"""Bulk import of students, faculty, courses and course assignments.
+
+Spreadsheets (CSV, or XLSX when openpyxl is installed) are read one row at
+a time. Each row is checked against lookup maps loaded once per import,
+such as department names and IDs, faculty e-mails, enrollment numbers,
+programs and existing course assignments, so foreign keys and duplicates
+are validated without a query per row. Valid
+rows are written with multi-row INSERTs in chunks of CHUNK_SIZE, one
+commit per chunk. If a chunk fails as a whole, it is retried row by row so
+the offending rows can be reported. Memory is bounded by the chunk size,
+the lookup maps and the first MAX_ERRORS error messages; it does not
+depend on the size of the file.
+
+Columns (header names are case-insensitive; a reference can be given by
+ID or by the name/e-mail column next to it):
+
+    students     FirstName, LastName, EnrollmentNo, Email, [password],
+                 DepartmentID | DepartmentName
+    faculty      FirstName, LastName, Email, [password],
+                 DepartmentID | DepartmentName
+    courses      CourseName, DepartmentID | DepartmentName,
+                 [FacultyID | FacultyEmail]
+    assignments  StudentID | EnrollmentNo, ProgramID | ProgramName,
+                 CurrentSemesterID | SemesterName, CourseID | CourseName,
+                 [Allowed], [Is_Repeater]
+
+A blank password gets a random 8-character one, like the add forms.
+Imported course assignments refresh student_timetable_reports chunk by
+chunk (student_reports.py).
+
+Usage:
+
+    python bulk_import.py students new_cohort.csv
+    python bulk_import.py assignments fall.xlsx --dry-run
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import string
+import time
+
+import MySQLdb
+import MySQLdb.cursors
+
+import student_reports
+
+CHUNK_SIZE = 1000
+MAX_ERRORS = 200
+
+KINDS = ('students', 'faculty', 'courses', 'assignments')
+
+INSERTS = {
+    'students': "INSERT INTO students (FirstName, LastName, EnrollmentNo, Email, password, DepartmentID) "
+                "VALUES (%s, %s, %s, %s, %s, %s)",
+    'faculty': "INSERT INTO faculty (FirstName, LastName, Email, password, DepartmentID) VALUES (%s, %s, %s, %s, %s)",
+    'courses': "INSERT INTO courses (CourseName, DepartmentID, FacultyID) VALUES (%s, %s, %s)",
+    'assignments': "INSERT INTO assign_courses_to_student "
+                   "(StudentID, ProgramID, SessionID, CurrentSemesterID, CourseID, Allowed, Is_Repeater) "
+                   "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+}
+
+COLUMNS = {
+    'students': ('FirstName', 'LastName', 'EnrollmentNo', 'Email', 'password', 'DepartmentID', 'DepartmentName'),
+    'faculty': ('FirstName', 'LastName', 'Email', 'password', 'DepartmentID', 'DepartmentName'),
+    'courses': ('CourseName', 'DepartmentID', 'DepartmentName', 'FacultyID', 'FacultyEmail'),
+    'assignments': ('StudentID', 'EnrollmentNo', 'ProgramID', 'ProgramName', 'CurrentSemesterID', 'SemesterName',
+                    'CourseID', 'CourseName', 'Allowed', 'Is_Repeater'),
+}
+
+
+class RowError(Exception):
+    """A spreadsheet row that cannot be imported; the message is shown to the user."""
+
+
+# -------------------- Reading --------------------
+
+def _cell(value):
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    value = str(value).strip()
+    return value or None
+
+
+def _header_map(header, kind):
+    canonical = {name.lower(): name for name in COLUMNS[kind]}
+    return [canonical.get(str(h or '').strip().lower()) for h in header]
+
+
+def read_rows(fileobj, filename, kind):
+    """Yield (row number, {column: value}) for each data row of a CSV or XLSX file."""
+    if filename.lower().endswith(('.xlsx', '.xlsm')):
+        try:
+            import openpyxl
+        except ImportError:
+            raise RowError("XLSX import needs the openpyxl package; save the sheet as CSV or pip install openpyxl.")
+        workbook = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+        rows = workbook.active.iter_rows(values_only=True)
+    else:
+        if isinstance(fileobj, (io.TextIOBase,)):
+            text = fileobj
+        else:
+            text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+        rows = csv.reader(text)
+
+    header = next(rows, None)
+    if header is None:
+        return
+    names = _header_map(header, kind)
+    if not any(names):
+        raise RowError(f"No known columns in the header. Expected some of: {', '.join(COLUMNS[kind])}.")
+    for number, values in enumerate(rows, start=2):
+        row = {name: _cell(value) for name, value in zip(names, values) if name}
+        if any(row.values()):
+            yield number, row
+
+
+# -------------------- Lookups --------------------
+
+class Lookups:
+    """ID sets and name -> ID maps for the tables a kind of import references."""
+
+    def __init__(self, cur, kind):
+        self.cur = cur
+        if kind in ('students', 'faculty', 'courses'):
+            self.department_ids, self.department_names = self._ids_and_names(
+                "SELECT DepartmentID AS id, DepartmentName AS name FROM departments")
+        if kind == 'students':
+            cur.execute("SELECT EnrollmentNo FROM students WHERE EnrollmentNo IS NOT NULL")
+            self.enrollments = {row['EnrollmentNo'].strip().lower() for row in cur.fetchall()}
+        if kind in ('faculty', 'courses'):
+            self.faculty_ids, self.faculty_emails = self._ids_and_names(
+                "SELECT FacultyID AS id, Email AS name FROM faculty")
+        if kind == 'assignments':
+            self.student_ids, self.student_enrollments = self._ids_and_names(
+                "SELECT StudentID AS id, EnrollmentNo AS name FROM students")
+            self.course_ids, self.course_names = self._ids_and_names(
+                "SELECT CourseID AS id, CourseName AS name FROM courses")
+            cur.execute("SELECT ProgramID, ProgramName, SessionID FROM offered_programs")
+            self.program_sessions = {}
+            self.program_names = {}
+            for row in cur.fetchall():
+                self.program_sessions[row['ProgramID']] = row['SessionID']
+                self._add_name(self.program_names, row['ProgramName'], row['ProgramID'])
+            cur.execute("""
+                SELECT cs.CurrentSemesterID, cs.ProgramID, cs.SemesterID, s.SemesterName
+                FROM current_semester cs LEFT JOIN semesters s ON cs.SemesterID = s.SemesterID
+            """)
+            self.current_semesters = {}
+            self.current_by_name = {}
+            for row in cur.fetchall():
+                self.current_semesters[row['CurrentSemesterID']] = (row['ProgramID'], row['SemesterID'])
+                self._add_name(self.current_by_name, (row['ProgramID'], (row['SemesterName'] or '').strip().lower()),
+                               row['CurrentSemesterID'], lower=False)
+            # assign_courses_to_student has no unique key; re-importing a file must not assign twice
+            cur.execute("SELECT StudentID, CurrentSemesterID, CourseID FROM assign_courses_to_student")
+            self.assignments = {(row['StudentID'], row['CurrentSemesterID'], row['CourseID']) for row in cur.fetchall()}
+
+    @staticmethod
+    def _add_name(names, name, value, lower=True):
+        if name is None:
+            return
+        key = name.strip().lower() if lower else name
+        # Names shared by two rows cannot be used as a reference
+        names[key] = None if key in names and names[key] != value else value
+
+    def _ids_and_names(self, query):
+        self.cur.execute(query)
+        ids, names = set(), {}
+        for row in self.cur.fetchall():
+            ids.add(row['id'])
+            self._add_name(names, row['name'], row['id'])
+        return ids, names
+
+
+def _required(row, column):
+    value = row.get(column)
+    if value is None:
+        raise RowError(f"{column} is required.")
+    return value
+
+
+def _reference(row, id_column, name_column, ids, names, label, required=True):
+    """Resolve a foreign key given either as an ID or as a unique name."""
+    if row.get(id_column) is not None:
+        try:
+            value = int(row[id_column])
+        except ValueError:
+            raise RowError(f"{id_column} '{row[id_column]}' is not a number.")
+        if value not in ids:
+            raise RowError(f"{label} {value} does not exist.")
+        return value
+    if row.get(name_column) is not None:
+        key = row[name_column].lower()
+        if key not in names:
+            raise RowError(f"{label} '{row[name_column]}' does not exist.")
+        if names[key] is None:
+            raise RowError(f"{label} '{row[name_column]}' is ambiguous; give {id_column} instead.")
+        return names[key]
+    if required:
+        raise RowError(f"{id_column} or {name_column} is required.")
+    return None
+
+
+def _password(row):
+    return row.get('password') or ''.join(random.choices(string.ascii_letters + string.digits, k=8))
+
+
+# -------------------- Row preparation --------------------
+
+def prepare_student(row, lookups, seen):
+    enrollment = _required(row, 'EnrollmentNo')
+    key = enrollment.lower()
+    if key in lookups.enrollments or key in seen:
+        raise RowError(f"EnrollmentNo {enrollment} already exists.")
+    department = _reference(row, 'DepartmentID', 'DepartmentName', lookups.department_ids,
+                            lookups.department_names, 'Department')
+    seen.add(key)
+    return (_required(row, 'FirstName'), row.get('LastName'), enrollment, row.get('Email'), _password(row), department)
+
+
+def prepare_faculty(row, lookups, seen):
+    email = _required(row, 'Email')
+    key = email.lower()
+    if key in lookups.faculty_emails or key in seen:
+        raise RowError(f"Faculty e-mail {email} already exists.")
+    department = _reference(row, 'DepartmentID', 'DepartmentName', lookups.department_ids,
+                            lookups.department_names, 'Department')
+    seen.add(key)
+    return (_required(row, 'FirstName'), row.get('LastName'), email, _password(row), department)
+
+
+def prepare_course(row, lookups, seen):
+    department = _reference(row, 'DepartmentID', 'DepartmentName', lookups.department_ids,
+                            lookups.department_names, 'Department')
+    faculty = _reference(row, 'FacultyID', 'FacultyEmail', lookups.faculty_ids, lookups.faculty_emails,
+                         'Faculty', required=False)
+    return (_required(row, 'CourseName'), department, faculty)
+
+
+def prepare_assignment(row, lookups, seen):
+    student = _reference(row, 'StudentID', 'EnrollmentNo', lookups.student_ids, lookups.student_enrollments, 'Student')
+    program = _reference(row, 'ProgramID', 'ProgramName', lookups.program_sessions.keys(), lookups.program_names,
+                         'Program')
+    if row.get('CurrentSemesterID') is not None:
+        current = _reference(row, 'CurrentSemesterID', None, lookups.current_semesters.keys(), {}, 'Current semester')
+        if lookups.current_semesters[current][0] != program:
+            raise RowError(f"Current semester {current} belongs to another program.")
+    else:
+        key = (program, _required(row, 'SemesterName').lower())
+        current = lookups.current_by_name.get(key)
+        if current is None:
+            raise RowError(f"'{row['SemesterName']}' is not a current semester of this program.")
+    course = _reference(row, 'CourseID', 'CourseName', lookups.course_ids, lookups.course_names, 'Course')
+    if (student, current, course) in lookups.assignments:
+        raise RowError(f"Student {student} is already assigned course {course} in current semester {current}.")
+    if (student, current, course) in seen:
+        raise RowError("Duplicate of an earlier row.")
+    seen.add((student, current, course))
+    return (student, program, lookups.program_sessions[program], current, course,
+            row.get('Allowed') or 'Yes', row.get('Is_Repeater') or 'No')
+
+
+PREPARE = {
+    'students': prepare_student,
+    'faculty': prepare_faculty,
+    'courses': prepare_course,
+    'assignments': prepare_assignment,
+}
+
+
+# -------------------- Import --------------------
+
+def run_import(connection, kind, fileobj, filename, dry_run=False, chunk_size=CHUNK_SIZE):
+    """Validate and insert every row; return a summary dict."""
+    if kind not in KINDS:
+        raise ValueError(f"unknown import kind {kind!r}")
+    started = time.perf_counter()
+    cur = connection.cursor(MySQLdb.cursors.DictCursor)
+    lookups = Lookups(cur, kind)
+    prepare = PREPARE[kind]
+    seen = set()
+    result = {'kind': kind, 'rows': 0, 'inserted': 0, 'failed': 0, 'errors': [], 'dry_run': dry_run}
+
+    def error(number, message):
+        result['failed'] += 1
+        if len(result['errors']) < MAX_ERRORS:
+            result['errors'].append({'row': number, 'error': message})
+
+    def flush(batch):
+        if dry_run:
+            result['inserted'] += len(batch)
+            return
+        if not batch:
+            return
+        try:
+            cur.executemany(INSERTS[kind], [values for _, values in batch])
+            connection.commit()
+            written = batch
+        except MySQLdb.Error:
+            # Find the rows MySQL rejects; keep the others
+            connection.rollback()
+            written = []
+            for number, values in batch:
+                try:
+                    cur.execute(INSERTS[kind], values)
+                    written.append((number, values))
+                except MySQLdb.Error as e:
+                    error(number, str(e.args[-1]) if e.args else str(e))
+            connection.commit()
+        result['inserted'] += len(written)
+        if kind == 'assignments' and written:
+            student_reports.refresh_pairs(connection, [(values[0], lookups.current_semesters[values[3]][1])
+                                                       for _, values in written
+                                                       if lookups.current_semesters[values[3]][1] is not None])
+
+    try:
+        batch = []
+        for number, row in read_rows(fileobj, filename, kind):
+            result['rows'] += 1
+            try:
+                batch.append((number, prepare(row, lookups, seen)))
+            except RowError as e:
+                error(number, str(e))
+            if len(batch) >= chunk_size:
+                flush(batch)
+                batch = []
+        flush(batch)
+    except RowError as e:
+        error(0, str(e))
+    finally:
+        cur.close()
+    result['seconds'] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('kind', choices=KINDS)
+    parser.add_argument('file', help='CSV or XLSX file')
+    parser.add_argument('--dry-run', action='store_true', help='validate only, insert nothing')
+    parser.add_argument('--chunk', type=int, default=CHUNK_SIZE, help='rows per INSERT/commit')
+    args = parser.parse_args()
+
+    from app import app, mysql
+
+    with app.app_context(), open(args.file, 'rb') as f:
+        result = run_import(mysql.connection, args.kind, f, os.path.basename(args.file), dry_run=args.dry_run,
+                            chunk_size=args.chunk)
+    for e in result['errors']:
+        print(f"row {e['row']}: {e['error']}")
+    if result['failed'] > len(result['errors']):
+        print(f"... and {result['failed'] - len(result['errors'])} more errors")
+    print(f"{result['rows']} rows read, {result['inserted']} {'valid' if args.dry_run else 'inserted'}, "
+          f"{result['failed']} failed in {result['seconds']} s")
+
+
+if __name__ == '__main__':
+    main()
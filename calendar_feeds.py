@@ -0,0 +1,193 @@
+"""Subscribable iCalendar feeds for faculty members and students.
+
+Each faculty member or student can get a secret token (calendar_tokens,
+migration 0005); /calendar/<kind>/<token>.ics then serves their week as
+recurring events, one per weekly schedule row, bounded by the
+current_semester StartDate/EndDate (see timetable_export.ics_event).
+
+Calendar clients poll feeds every few minutes, so a poll must not cost a
+schedule query. A feed's ETag is derived from the data_versions of the
+tables it is built from, which the app reads once per request anyway:
+
+- the token -> owner map is held in memory and reloaded only when
+  calendar_tokens changes;
+- a client sending the current ETag gets 304 without the feed being
+  built or even looked up;
+- otherwise the feed body comes from FeedCache, built at most once per
+  owner and version.
+"""
+import datetime
+import hashlib
+import secrets
+import threading
+from collections import OrderedDict
+
+import MySQLdb.cursors
+
+from timetable_export import ICS_FOOTER, ics_event, ics_header
+
+KINDS = ('faculty', 'student')
+
+# Tables a feed is built from; a change to any of them gives every feed of that kind a new ETag
+FEED_TABLES = {
+    'faculty': ('schedule', 'courses', 'faculty', 'rooms', 'time_slots', 'offered_programs', 'semesters',
+                'current_semester'),
+    'student': ('schedule', 'courses', 'faculty', 'rooms', 'time_slots', 'offered_programs', 'semesters',
+                'current_semester', 'assign_courses_to_student', 'students'),
+}
+
+_EVENT_COLUMNS = """
+    sch.ScheduleID, sch.DayNo, c.CourseName, CONCAT_WS(' ', f.FirstName, f.LastName) AS FacultyName,
+    r.RoomNumber, op.ProgramName, sem.SemesterName, ts.StartTime, ts.EndTime, cs.StartDate, cs.EndDate
+"""
+
+FEED_QUERIES = {
+    # Term dates grouped per (ProgramID, SemesterID): current_semester may hold a pair twice
+    'faculty': f"""
+        SELECT {_EVENT_COLUMNS}
+        FROM schedule sch
+        JOIN courses c ON sch.CourseID = c.CourseID
+        JOIN faculty f ON sch.FacultyID = f.FacultyID
+        JOIN rooms r ON sch.RoomID = r.RoomID
+        JOIN time_slots ts ON sch.SlotID = ts.SlotID
+        LEFT JOIN offered_programs op ON sch.ProgramID = op.ProgramID
+        LEFT JOIN semesters sem ON sch.SemesterID = sem.SemesterID
+        LEFT JOIN (
+            SELECT ProgramID, SemesterID, MIN(StartDate) AS StartDate, MAX(EndDate) AS EndDate
+            FROM current_semester
+            GROUP BY ProgramID, SemesterID
+        ) cs ON cs.ProgramID = sch.ProgramID AND cs.SemesterID = sch.SemesterID
+        WHERE sch.FacultyID = %s
+        ORDER BY sch.DayNo, sch.SlotID
+    """,
+    # The courses assigned to the student in their current semesters, as in student_reports.SOURCE_QUERY
+    'student': f"""
+        SELECT DISTINCT {_EVENT_COLUMNS}
+        FROM assign_courses_to_student acs
+        JOIN current_semester cs ON acs.CurrentSemesterID = cs.CurrentSemesterID
+        JOIN schedule sch ON sch.ProgramID = acs.ProgramID AND sch.SemesterID = cs.SemesterID AND sch.CourseID = acs.CourseID
+        JOIN courses c ON sch.CourseID = c.CourseID
+        JOIN faculty f ON sch.FacultyID = f.FacultyID
+        JOIN rooms r ON sch.RoomID = r.RoomID
+        JOIN time_slots ts ON sch.SlotID = ts.SlotID
+        LEFT JOIN offered_programs op ON sch.ProgramID = op.ProgramID
+        LEFT JOIN semesters sem ON sch.SemesterID = sem.SemesterID
+        WHERE acs.StudentID = %s
+        ORDER BY sch.DayNo, sch.SlotID
+    """,
+}
+
+OWNER_QUERIES = {
+    'faculty': "SELECT CONCAT_WS(' ', FirstName, LastName) AS Name FROM faculty WHERE FacultyID = %s",
+    'student': "SELECT CONCAT_WS(' ', FirstName, LastName) AS Name FROM students WHERE StudentID = %s",
+}
+
+
+def feed_etag(kind, owner_id, versions):
+    """ETag of a feed for the given {table: version}."""
+    key = (kind, owner_id, tuple(versions.get(table) for table in FEED_TABLES[kind]))
+    return hashlib.sha1(repr(key).encode()).hexdigest()[:32]
+
+
+def build_feed(connection, kind, owner_id):
+    """The VCALENDAR document of one owner, as bytes."""
+    cur = connection.cursor(MySQLdb.cursors.DictCursor)
+    cur.execute(OWNER_QUERIES[kind], (owner_id,))
+    owner = cur.fetchone()
+    cur.execute(FEED_QUERIES[kind], (owner_id,))
+    rows = cur.fetchall()
+    cur.close()
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    name = f"Timetable - {owner['Name']}" if owner and owner['Name'] else 'Timetable'
+    return (ics_header(name) + ''.join(ics_event(row, stamp) for row in rows) + ICS_FOOTER).encode('utf-8')
+
+
+class FeedCache:
+    """LRU-bounded cache of built feeds, keyed on (kind, owner) and checked against the ETag."""
+
+    def __init__(self, max_entries=5000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._entries = OrderedDict()  # (kind, owner_id) -> (etag, body)
+        self._lock = threading.Lock()
+
+    def get(self, kind, owner_id, etag, build):
+        """Return the body for etag, calling build() when the cached one is missing or older."""
+        key = (kind, owner_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == etag:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        body = build()
+        with self._lock:
+            self._entries[key] = (etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'max_entries': self.max_entries, 'hits': self.hits,
+                    'misses': self.misses, 'not_modified': self.not_modified}
+
+
+class TokenMap:
+    """In-memory token -> (kind, owner) map, reloaded when calendar_tokens changes."""
+
+    def __init__(self):
+        self.version = None
+        self.loaded = False
+        self._owners = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, connection, token, version):
+        with self._lock:
+            if not self.loaded or version != self.version:
+                cur = connection.cursor(MySQLdb.cursors.DictCursor)
+                cur.execute("SELECT Token, OwnerType, OwnerID FROM calendar_tokens")
+                self._owners = {row['Token']: (row['OwnerType'], row['OwnerID']) for row in cur.fetchall()}
+                cur.close()
+                self.version = version
+                self.loaded = True
+            return self._owners.get(token)
+
+
+def get_token(connection, kind, owner_id):
+    """The owner's feed token, created on first use.
+
+    Two first requests for the same owner can both miss the SELECT; the
+    INSERT IGNORE of the second then leaves the first one's token in place
+    (ux_calendar_owner), and the SELECT after the commit returns it.
+    """
+    query = "SELECT Token FROM calendar_tokens WHERE OwnerType = %s AND OwnerID = %s"
+    cur = connection.cursor(MySQLdb.cursors.DictCursor)
+    cur.execute(query, (kind, owner_id))
+    row = cur.fetchone()
+    if row is None:
+        cur.execute("INSERT IGNORE INTO calendar_tokens (Token, OwnerType, OwnerID) VALUES (%s, %s, %s)",
+                    (secrets.token_urlsafe(32), kind, owner_id))
+        # A new transaction, so the SELECT sees a token another request committed meanwhile
+        connection.commit()
+        cur.execute(query, (kind, owner_id))
+        row = cur.fetchone()
+    cur.close()
+    return row['Token']
+
+
+def reset_token(connection, kind, owner_id):
+    """Replace the owner's token, so the old feed URL stops working."""
+    cur = connection.cursor()
+    cur.execute("DELETE FROM calendar_tokens WHERE OwnerType = %s AND OwnerID = %s", (kind, owner_id))
+    connection.commit()
+    cur.close()
+    return get_token(connection, kind, owner_id)
@@ -0,0 +1,250 @@
+"""Delete a row and everything that references it, in one transaction.
+
+delete_department used to run twelve hand-ordered DELETE ... JOIN
+statements, each committed work if a later one failed, and the list went
+stale whenever a table was added (student_timetable_reports, the
+attendance rollups). The other delete routes failed on the first foreign
+key that still pointed at the row.
+
+The order now comes from the schema itself: the foreign keys of the
+current database are read from information_schema once per process.
+Deleting (table, id) plans top-down over the tables that reference it,
+parents before children, collecting the primary keys of the rows to go
+(a table reached by several paths, like attendance through students and
+through courses, is collected once), then deletes children before
+parents, by primary key, CHUNK_SIZE keys per statement, and commits once:
+a failure rolls the whole cascade back.
+
+Each statement touches at most CHUNK_SIZE rows by primary key, so it
+holds only the record locks of the rows it removes; the old multi-table
+DELETE ... JOIN statements scanned and locked index ranges through every
+joined table for their whole run. The planning SELECTs lock the rows
+they find (FOR UPDATE), so a class or an enrollment added for a student
+being deleted waits for the commit instead of failing it, while requests
+about other departments, students or courses never wait on the delete.
+
+Links that are references rather than ownership are cleared instead of
+followed (SET_NULL): deleting a faculty member leaves their courses
+without a teacher rather than deleting them with their enrollments and
+attendance. schedule_view follows through its triggers, and the
+connection bumps data_versions for the written tables at commit.
+
+plan() without lock is the dry run: the same walk as consistent reads,
+returning the rows per table that a delete would remove.
+
+Usage (from the project root):
+
+    python cascade_delete.py departments 3             # dry run: rows per table
+    python cascade_delete.py departments 3 --execute   # delete them
+"""
+import argparse
+import threading
+
+import MySQLdb.cursors
+
+CHUNK_SIZE = 1000
+
+# (table, column) foreign keys cleared instead of cascaded
+SET_NULL = frozenset({('courses', 'FacultyID')})
+
+
+def chunks(keys, size=CHUNK_SIZE):
+    keys = sorted(keys)
+    for i in range(0, len(keys), size):
+        yield keys[i:i + size]
+
+
+def _in(keys):
+    return ', '.join(['%s'] * len(keys))
+
+
+class ForeignKeys:
+    """The foreign key graph of the current database."""
+
+    def __init__(self, primary_keys, references):
+        self.primary_keys = primary_keys  # table -> its single-column primary key
+        self.referenced_by = {}           # parent table -> [(child table, child column)]
+        for child, column, parent, parent_column in references:
+            if primary_keys.get(parent) != parent_column:
+                raise ValueError(f"{child}.{column} references {parent}.{parent_column}, "
+                                 f"not the primary key of {parent}")
+            self.referenced_by.setdefault(parent, []).append((child, column))
+
+    @classmethod
+    def load(cls, cur):
+        cur.execute("""
+            SELECT TABLE_NAME, COLUMN_NAME FROM information_schema.KEY_COLUMN_USAGE
+            WHERE TABLE_SCHEMA = DATABASE() AND CONSTRAINT_NAME = 'PRIMARY'
+        """)
+        columns = {}
+        for row in cur.fetchall():
+            columns.setdefault(row['TABLE_NAME'], []).append(row['COLUMN_NAME'])
+        primary_keys = {table: names[0] for table, names in columns.items() if len(names) == 1}
+        cur.execute("""
+            SELECT TABLE_NAME, COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME
+            FROM information_schema.KEY_COLUMN_USAGE
+            WHERE TABLE_SCHEMA = DATABASE() AND REFERENCED_TABLE_NAME IS NOT NULL
+            ORDER BY TABLE_NAME, COLUMN_NAME
+        """)
+        references = [(row['TABLE_NAME'], row['COLUMN_NAME'], row['REFERENCED_TABLE_NAME'],
+                       row['REFERENCED_COLUMN_NAME']) for row in cur.fetchall()]
+        return cls(primary_keys, references)
+
+    def delete_order(self, table, set_null=SET_NULL):
+        """The tables a delete from table cascades to, parents first, with their incoming (parent, column) links."""
+        reachable = {table: []}
+        stack = [table]
+        while stack:
+            parent = stack.pop()
+            for child, column in self.referenced_by.get(parent, ()):
+                if (child, column) in set_null:
+                    continue
+                if child not in reachable:
+                    reachable[child] = []
+                    stack.append(child)
+                reachable[child].append((parent, column))
+
+        # Kahn's algorithm over the links inside the cascade; a self-reference or a cycle never drains
+        waiting = {child: len({parent for parent, _ in links}) for child, links in reachable.items()}
+        ready = [table] if not waiting[table] else []
+        order = []
+        while ready:
+            parent = ready.pop()
+            order.append(parent)
+            for child in sorted({child for child, column in self.referenced_by.get(parent, ())
+                                 if (child, column) not in set_null}):
+                waiting[child] -= 1
+                if not waiting[child]:
+                    ready.append(child)
+        if len(order) < len(reachable):
+            stuck = sorted(set(reachable) - set(order))
+            raise ValueError(f"foreign keys between {', '.join(stuck)} form a cycle; delete them by hand")
+        return [(name, reachable[name]) for name in order]
+
+
+class Plan:
+    """The rows one cascade removes (table -> primary keys) and the links it clears."""
+
+    def __init__(self, table, key):
+        self.table = table
+        self.key = key
+        self.rows = {}   # table -> sorted primary keys, parents first
+        self.nulls = {}  # (table, column) -> sorted primary keys of the rows whose column is cleared
+
+    def counts(self):
+        """[(table, rows)] in the order they are deleted, children first."""
+        return [(table, len(keys)) for table, keys in reversed(list(self.rows.items()))]
+
+    def cleared(self):
+        return [(f"{table}.{column}", len(keys)) for (table, column), keys in self.nulls.items()]
+
+    def tables(self):
+        return list(self.rows) + [table for table, _ in self.nulls]
+
+
+class CascadeDelete:
+    """Plans and runs cascading deletes over the foreign keys, loaded on first use."""
+
+    def __init__(self, set_null=SET_NULL, chunk_size=CHUNK_SIZE):
+        self.set_null = set_null
+        self.chunk_size = chunk_size
+        self._graph = None
+        self._lock = threading.Lock()
+
+    def graph(self, connection):
+        with self._lock:
+            if self._graph is None:
+                cur = connection.cursor(MySQLdb.cursors.DictCursor)
+                self._graph = ForeignKeys.load(cur)
+                cur.close()
+            return self._graph
+
+    def plan(self, connection, table, key, lock=False):
+        """The Plan for deleting table's row key; lock=True takes the row locks a delete needs."""
+        graph = self.graph(connection)
+        if table not in graph.primary_keys:
+            raise ValueError(f"{table} has no single-column primary key")
+        suffix = " FOR UPDATE" if lock else ""
+        cur = connection.cursor()
+        plan = Plan(table, key)
+        for name, links in graph.delete_order(table, self.set_null):
+            pk = graph.primary_keys.get(name)
+            if pk is None:
+                raise ValueError(f"{name} has no single-column primary key")
+            found = set()
+            if name == table:
+                cur.execute(f"SELECT {pk} FROM {name} WHERE {pk} = %s{suffix}", (key,))
+                found.update(row[0] for row in cur.fetchall())
+            for parent, column in links:
+                for chunk in chunks(plan.rows.get(parent, ()), self.chunk_size):
+                    cur.execute(f"SELECT {pk} FROM {name} WHERE {column} IN ({_in(chunk)}){suffix}", chunk)
+                    found.update(row[0] for row in cur.fetchall())
+            if found:
+                plan.rows[name] = sorted(found)
+
+        for parent, keys in plan.rows.items():
+            for child, column in graph.referenced_by.get(parent, ()):
+                if (child, column) not in self.set_null:
+                    continue
+                pk = graph.primary_keys[child]
+                found = set()
+                for chunk in chunks(keys, self.chunk_size):
+                    cur.execute(f"SELECT {pk} FROM {child} WHERE {column} IN ({_in(chunk)}){suffix}", chunk)
+                    found.update(row[0] for row in cur.fetchall())
+                found.difference_update(plan.rows.get(child, ()))
+                if found:
+                    plan.nulls[(child, column)] = sorted(found)
+        cur.close()
+        return plan
+
+    def delete(self, connection, table, key):
+        """Delete table's row key and its dependents in one transaction; return the Plan that ran."""
+        graph = self.graph(connection)
+        cur = connection.cursor()
+        try:
+            plan = self.plan(connection, table, key, lock=True)
+            for (name, column), keys in plan.nulls.items():
+                pk = graph.primary_keys[name]
+                for chunk in chunks(keys, self.chunk_size):
+                    cur.execute(f"UPDATE {name} SET {column} = NULL WHERE {pk} IN ({_in(chunk)})", chunk)
+            for name, keys in reversed(list(plan.rows.items())):
+                pk = graph.primary_keys[name]
+                for chunk in chunks(keys, self.chunk_size):
+                    cur.execute(f"DELETE FROM {name} WHERE {pk} IN ({_in(chunk)})", chunk)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cur.close()
+        return plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('table', help='table of the row to delete, e.g. departments')
+    parser.add_argument('id', type=int, help='primary key of the row')
+    parser.add_argument('--execute', action='store_true', help='delete the rows instead of counting them')
+    parser.add_argument('--chunk', type=int, default=CHUNK_SIZE, help='primary keys per statement')
+    args = parser.parse_args()
+
+    from app import app, mysql
+
+    cascade = CascadeDelete(chunk_size=args.chunk)
+    with app.app_context():
+        if args.execute:
+            plan = cascade.delete(mysql.connection, args.table, args.id)
+        else:
+            plan = cascade.plan(mysql.connection, args.table, args.id)
+    if not plan.rows:
+        print(f"{args.table} {args.id} not found.")
+        return
+    for table, rows in plan.counts():
+        print(f"{table:<28} {rows:>8} row(s)")
+    for link, rows in plan.cleared():
+        print(f"{link:<28} {rows:>8} row(s) set to NULL")
+    print("Deleted." if args.execute else "Dry run; nothing was deleted (use --execute).")
+
+
+if __name__ == '__main__':
+    main()
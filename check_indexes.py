@@ -0,0 +1,157 @@
+"""EXPLAIN every schedule query the timetable pages run and check it uses an index.
+
+Run from the project root after `python migrate.py`:
+
+    python check_indexes.py                 # check against the current data
+    python check_indexes.py --fill 100000   # top schedule up to 100k rows first
+
+The script opens each timetable page with a logged-in admin session,
+records the SELECTs that touch `schedule` or its read model
+`schedule_view`, and runs EXPLAIN on each one. A filtered query fails the
+check if MySQL reads either with a full table scan (type ALL).
+Unfiltered "show everything" queries are listed but not judged, since
+they have to read every row anyway.
+
+--fill inserts synthetic rows built from the existing rooms, faculty,
+courses, time slots, semesters and programs, and deletes them again at
+the end. Use it against a development database.
+"""
+import argparse
+import contextlib
+import random
+import re
+import sys
+
+import MySQLdb.cursors
+
+from app import app, mysql
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+
+
+@contextlib.contextmanager
+def recording():
+    """Collect the SELECTs on schedule or schedule_view run inside the block.
+
+    BaseCursor.execute is wrapped only for the block and restored on exit,
+    even when the block raises.
+    """
+    queries = []
+    original = MySQLdb.cursors.BaseCursor.execute
+
+    def execute(self, query, args=None):
+        if re.search(r'\bschedule(_view)?\b', query) and query.lstrip().upper().startswith('SELECT'):
+            queries.append((query, args))
+        return original(self, query, args)
+
+    MySQLdb.cursors.BaseCursor.execute = execute
+    try:
+        yield queries
+    finally:
+        MySQLdb.cursors.BaseCursor.execute = original
+
+
+def fill_schedule(cur, target, seed=1):
+    """Insert synthetic rows until schedule has `target` rows; return the first new ScheduleID."""
+    cur.execute("SELECT COUNT(*) AS n, COALESCE(MAX(ScheduleID), 0) AS max_id FROM schedule")
+    row = cur.fetchone()
+    missing = target - row['n']
+    if missing <= 0:
+        return None
+
+    ids = {}
+    for table, column in (('courses', 'CourseID'), ('faculty', 'FacultyID'), ('rooms', 'RoomID'),
+                          ('time_slots', 'SlotID'), ('semesters', 'SemesterID'), ('offered_programs', 'ProgramID')):
+        cur.execute(f"SELECT {column} FROM {table}")
+        ids[column] = [r[column] for r in cur.fetchall()]
+        if not ids[column]:
+            sys.exit(f"Cannot fill schedule: table {table} is empty.")
+
+    rng = random.Random(seed)
+    print(f"Inserting {missing} synthetic schedule rows ...")
+    for start in range(0, missing, 5000):
+        batch = [(rng.choice(ids['CourseID']), rng.choice(ids['FacultyID']), rng.choice(ids['RoomID']),
+                  rng.choice(ids['SlotID']), rng.choice(DAYS), rng.choice(ids['SemesterID']),
+                  rng.choice(ids['ProgramID']))
+                 for _ in range(min(5000, missing - start))]
+        cur.executemany(
+            "INSERT INTO schedule (CourseID, FacultyID, RoomID, SlotID, DayOfWeek, SemesterID, ProgramID) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s)", batch)
+    mysql.connection.commit()
+    cur.execute("ANALYZE TABLE schedule, schedule_view")
+    cur.fetchall()
+    return row['max_id'] + 1
+
+
+def sample_urls(cur):
+    cur.execute("SELECT FacultyID, ProgramID, SemesterID FROM schedule LIMIT 1")
+    row = cur.fetchone()
+    if not row:
+        sys.exit("schedule is empty; run with --fill.")
+    f, p, s = row['FacultyID'], row['ProgramID'], row['SemesterID']
+    return [
+        "/timetable?day=Monday",
+        "/timetable/room?day=Tuesday",
+        f"/timetable/room?day=Tuesday&program_id={p}",
+        f"/timetable/room?day=Tuesday&semester_id={s}",
+        f"/timetable/room?day=Tuesday&program_id={p}&semester_id={s}",
+        f"/timetable/faculty?faculty={f}&day=All",
+        f"/timetable/faculty?faculty={f}&day=Wednesday",
+        "/timetable/faculty?faculty=All&day=Wednesday",
+        f"/timetable/student?program_id={p}&semester_id={s}&day=All",
+        f"/timetable/student?program_id={p}&semester_id={s}&day=Thursday",
+        f"/faculty_timetable_report?faculty={f}&day=All",
+        f"/timetable/student_report?program={p}&semester={s}&day=All",
+        f"/timetable/student_report?program={p}&semester=All&day=Friday",
+        f"/weekly_timetable?program_id={p}&semester_id={s}",
+        f"/weekly_timetable?semester_id={s}",
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fill', type=int, metavar='ROWS', help='top schedule up to ROWS synthetic rows first')
+    args = parser.parse_args()
+
+    app.config['PROPAGATE_EXCEPTIONS'] = False
+    failures = 0
+    with app.app_context():
+        cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        first_synthetic = fill_schedule(cur, args.fill) if args.fill else None
+        try:
+            urls = sample_urls(cur)
+            client = app.test_client()
+            with client.session_transaction() as sess:
+                sess['loggedin'] = True
+                sess['role'] = 'admin'
+
+            for url in urls:
+                with recording() as queries:
+                    client.get(url)
+                for query, params in queries:
+                    filtered = re.search(r'\bWHERE\b', query, re.I) is not None
+                    cur.execute("EXPLAIN " + query, params)
+                    plan = [r for r in cur.fetchall() if r['table'] in ('s', 'schedule', 'schedule_view')]
+                    for step in plan:
+                        full_scan = step['type'] == 'ALL'
+                        if not filtered:
+                            status = 'SKIP'
+                        elif full_scan:
+                            status = 'FAIL'
+                            failures += 1
+                        else:
+                            status = 'ok'
+                        print(f"{status:<5} {url:<60} type={step['type']:<6} key={step['key']} rows={step['rows']}")
+        finally:
+            if first_synthetic:
+                print("Removing synthetic rows ...")
+                cur.execute("DELETE FROM schedule WHERE ScheduleID >= %s", (first_synthetic,))
+                mysql.connection.commit()
+            cur.close()
+
+    print(f"\n{failures} quer{'y' if failures == 1 else 'ies'} reading schedule with a full scan.")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
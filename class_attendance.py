@@ -0,0 +1,121 @@
+"""Attendance for a whole scheduled class in one request.
+
+A class is one schedule row (course, program, semester, weekday, slot)
+on one date. Its roster is every student assigned the course in that
+program's current semester (assign_courses_to_student joined with
+current_semester), read with the statuses already recorded for the date.
+
+save() writes the whole class with one multi-row
+INSERT ... ON DUPLICATE KEY UPDATE on ux_attendance (migration 0007)
+instead of one INSERT and commit per student. At the start of a period
+hundreds of teachers save at once, so the transaction is kept short and
+contention-friendly:
+
+- rows are written in StudentID order, so two saves touching the same
+  students lock them in the same order and cannot deadlock each other;
+- READ COMMITTED avoids gap locks on the neighbouring attendance rows;
+- rows whose status did not change keep their data and count as 0 in the
+  rowcount, but the upsert still takes their record locks (exclusive, to
+  the commit) like any other row it touches;
+- a deadlock or lock wait timeout is retried a few times before giving up.
+
+The isolation level can only be set between transactions, and with
+autocommit off the roster SELECTs of the same request have already begun
+one, so save() rolls back whatever transaction is open on the connection
+before it starts its own.
+
+The attendance_rollups counters of the class are updated in the same
+transaction.
+"""
+import datetime
+import time
+
+import MySQLdb
+
+import attendance_rollups
+
+STATUSES = ('Present', 'Absent')
+
+# MySQL error codes worth retrying: lock wait timeout, deadlock
+RETRY_ERRORS = (1205, 1213)
+RETRIES = 3
+
+SCHEDULE_QUERY = """
+    SELECT s.ScheduleID, s.CourseID, s.FacultyID, s.ProgramID, s.SemesterID, s.DayOfWeek, s.DayNo,
+           c.CourseName, CONCAT_WS(' ', f.FirstName, f.LastName) AS FacultyName, r.RoomNumber,
+           op.ProgramName, sem.SemesterName, ts.StartTime, ts.EndTime
+    FROM schedule s
+    JOIN courses c ON s.CourseID = c.CourseID
+    JOIN faculty f ON s.FacultyID = f.FacultyID
+    JOIN rooms r ON s.RoomID = r.RoomID
+    JOIN time_slots ts ON s.SlotID = ts.SlotID
+    LEFT JOIN offered_programs op ON s.ProgramID = op.ProgramID
+    LEFT JOIN semesters sem ON s.SemesterID = sem.SemesterID
+    WHERE s.ScheduleID = %s
+"""
+
+# Students taking the class (ix_acs_program_course) with their status on the date (ux_attendance)
+ROSTER_QUERY = """
+    SELECT DISTINCT st.StudentID, st.FirstName, st.LastName, st.EnrollmentNo, a.AttendanceStatus
+    FROM assign_courses_to_student acs
+    JOIN current_semester cs ON acs.CurrentSemesterID = cs.CurrentSemesterID
+    JOIN students st ON acs.StudentID = st.StudentID
+    LEFT JOIN attendance a ON a.StudentID = acs.StudentID AND a.CourseID = acs.CourseID AND a.AttendanceDate = %s
+    WHERE acs.ProgramID = %s AND acs.CourseID = %s AND cs.SemesterID = %s
+    ORDER BY st.LastName, st.FirstName, st.StudentID
+"""
+
+UPSERT = ("INSERT INTO attendance (StudentID, CourseID, AttendanceDate, AttendanceStatus) VALUES {values} "
+          "ON DUPLICATE KEY UPDATE AttendanceStatus = VALUES(AttendanceStatus)")
+
+
+def load_class(cur, schedule_id):
+    """The schedule row with its course, faculty, room and time (DictCursor), or None."""
+    cur.execute(SCHEDULE_QUERY, (schedule_id,))
+    return cur.fetchone()
+
+
+def default_date(schedule, today=None):
+    """The most recent date, today included, on which the class meets."""
+    today = today or datetime.date.today()
+    return today - datetime.timedelta(days=(today.isoweekday() - (schedule['DayNo'] or today.isoweekday())) % 7)
+
+
+def roster(cur, schedule, date):
+    """Students of the class with their AttendanceStatus on date (None if not marked yet)."""
+    cur.execute(ROSTER_QUERY, (date, schedule['ProgramID'], schedule['CourseID'], schedule['SemesterID']))
+    return cur.fetchall()
+
+
+def save(connection, course_id, date, statuses):
+    """Upsert {StudentID: status} for one course and date in one statement; return the rows written.
+
+    Rows whose status did not change count as 0, as MySQL reports them.
+    Any transaction open on connection is rolled back first.
+    """
+    rows = sorted((int(student_id), course_id, date, status) for student_id, status in statuses.items())
+    if not rows:
+        return 0
+    sql = UPSERT.format(values=', '.join(['(%s, %s, %s, %s)'] * len(rows)))
+    params = [value for row in rows for value in row]
+    keys = [row[:3] for row in rows]
+    cur = connection.cursor()
+    try:
+        for attempt in range(RETRIES):
+            try:
+                # SET TRANSACTION fails (1568) inside the transaction the roster reads began
+                connection.rollback()
+                cur.execute("SET TRANSACTION ISOLATION LEVEL READ COMMITTED")
+                rollups = attendance_rollups.RollupUpdate(connection, keys)
+                cur.execute(sql, params)
+                written = cur.rowcount
+                rollups.apply({row[:3]: row[3] for row in rows})
+                connection.commit()
+                return written
+            except MySQLdb.OperationalError as e:
+                connection.rollback()
+                if e.args[0] not in RETRY_ERRORS or attempt == RETRIES - 1:
+                    raise
+                time.sleep(0.05 * (attempt + 1))
+    finally:
+        cur.close()
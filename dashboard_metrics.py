@@ -0,0 +1,164 @@
+"""Dashboard metrics, computed together and cached.
+
+The dashboard shows, next to the table totals:
+
+- room utilization: the share of (day, slot) cells of the week that have
+  a class, overall and per room;
+- faculty weekly load: classes and teaching hours per faculty member;
+- offered courses with no schedule row in their semester;
+- students with no timetable (no student_timetable_reports row, which
+  student_reports.py keeps current).
+
+compute() gathers all of it in four queries. MetricsCache keeps the
+payload for a short TTL and drops it as soon as the data_versions of the
+tables it reads move, so a schedule write by any worker shows on the
+next load, while dashboards left open by many admins cost one
+data_versions read per refresh. Only one request rebuilds an expired
+payload; the others wait for it instead of running the same queries.
+"""
+import threading
+import time
+
+import MySQLdb.cursors
+
+DAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday')
+TTL = 30            # seconds
+LIST_LIMIT = 20     # unscheduled courses listed by name
+
+# Tables the payload is computed from; offered_courses is not in data_versions and relies on the TTL
+METRICS_TABLES = ('schedule', 'rooms', 'time_slots', 'faculty', 'courses', 'semesters', 'departments',
+                  'offered_programs', 'sessions', 'students', 'assign_courses_to_student', 'current_semester')
+
+TOTALS_QUERY = """
+    SELECT (SELECT COUNT(*) FROM offered_programs) AS offered_programs,
+           (SELECT COUNT(*) FROM rooms) AS rooms,
+           (SELECT COUNT(*) FROM sessions) AS sessions,
+           (SELECT COUNT(*) FROM faculty) AS faculty,
+           (SELECT COUNT(*) FROM students) AS students,
+           (SELECT COUNT(*) FROM schedule) AS scheduled_classes,
+           (SELECT COUNT(*) FROM time_slots) AS time_slots,
+           (SELECT COUNT(*) FROM students s
+            WHERE NOT EXISTS (SELECT 1 FROM student_timetable_reports r WHERE r.StudentID = s.StudentID)
+           ) AS students_without_timetable,
+           (SELECT COUNT(*) FROM offered_courses oc
+            WHERE NOT EXISTS (SELECT 1 FROM schedule s WHERE s.CourseID = oc.CourseID AND s.SemesterID = oc.SemesterID)
+           ) AS unscheduled_courses
+"""
+
+ROOMS_QUERY = f"""
+    SELECT r.RoomID, r.RoomNumber, COUNT(DISTINCT s.DayOfWeek, s.SlotID) AS UsedSlots
+    FROM rooms r
+    LEFT JOIN schedule s ON s.RoomID = r.RoomID AND s.DayOfWeek IN ({', '.join(['%s'] * len(DAYS))})
+    GROUP BY r.RoomID, r.RoomNumber
+    ORDER BY UsedSlots DESC, r.RoomNumber
+"""
+
+FACULTY_QUERY = """
+    SELECT f.FacultyID, CONCAT_WS(' ', f.FirstName, f.LastName) AS FacultyName, COUNT(s.ScheduleID) AS Classes,
+           COALESCE(SUM(TIME_TO_SEC(TIMEDIFF(ts.EndTime, ts.StartTime))), 0) AS Seconds
+    FROM faculty f
+    LEFT JOIN schedule s ON s.FacultyID = f.FacultyID
+    LEFT JOIN time_slots ts ON s.SlotID = ts.SlotID
+    GROUP BY f.FacultyID, f.FirstName, f.LastName
+    ORDER BY Seconds DESC, FacultyName
+"""
+
+UNSCHEDULED_QUERY = f"""
+    SELECT oc.OfferedCourseID, c.CourseName, sem.SemesterName, d.DepartmentName
+    FROM offered_courses oc
+    JOIN courses c ON oc.CourseID = c.CourseID
+    LEFT JOIN semesters sem ON oc.SemesterID = sem.SemesterID
+    LEFT JOIN departments d ON oc.DepartmentID = d.DepartmentID
+    WHERE NOT EXISTS (SELECT 1 FROM schedule s WHERE s.CourseID = oc.CourseID AND s.SemesterID = oc.SemesterID)
+    ORDER BY c.CourseName
+    LIMIT {LIST_LIMIT}
+"""
+
+
+def _percent(part, whole):
+    return round(100.0 * part / whole, 1) if whole else 0.0
+
+
+def compute(connection):
+    """The dashboard payload: totals, room utilization, faculty load and what is left unscheduled."""
+    cur = connection.cursor(MySQLdb.cursors.DictCursor)
+    cur.execute(TOTALS_QUERY)
+    totals = {name: int(value or 0) for name, value in cur.fetchone().items()}
+    cur.execute(ROOMS_QUERY, DAYS)
+    rooms = cur.fetchall()
+    cur.execute(FACULTY_QUERY)
+    faculty = cur.fetchall()
+    cur.execute(UNSCHEDULED_QUERY)
+    unscheduled = cur.fetchall()
+    cur.close()
+
+    week = len(DAYS) * totals['time_slots']
+    used = sum(int(room['UsedSlots']) for room in rooms)
+    hours = [round(int(row['Seconds']) / 3600, 1) for row in faculty]
+    return {
+        'generated_at': time.time(),
+        'totals': totals,
+        'room_utilization': {
+            'percent': _percent(used, week * len(rooms)),
+            'used_slots': used,
+            'available_slots': week * len(rooms),
+            'rooms': [{'RoomID': room['RoomID'], 'RoomNumber': room['RoomNumber'], 'UsedSlots': int(room['UsedSlots']),
+                       'Percent': _percent(int(room['UsedSlots']), week)} for room in rooms],
+        },
+        'faculty_load': {
+            'average_hours': round(sum(hours) / len(hours), 1) if hours else 0.0,
+            'max_hours': max(hours, default=0.0),
+            'without_classes': sum(1 for row in faculty if not row['Classes']),
+            'faculty': [{'FacultyID': row['FacultyID'], 'FacultyName': row['FacultyName'],
+                         'Classes': int(row['Classes']), 'Hours': h} for row, h in zip(faculty, hours)],
+        },
+        'unscheduled_courses': [dict(row) for row in unscheduled],
+    }
+
+
+class MetricsCache:
+    """The last payload, reused while younger than ttl and built from the same table versions."""
+
+    def __init__(self, ttl=TTL):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entry = None  # (versions, built at, payload)
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def _fresh(self, versions):
+        entry = self._entry
+        if entry is not None and entry[0] == versions and time.monotonic() - entry[1] < self.ttl:
+            return entry[2]
+        return None
+
+    def get(self, versions, build):
+        """The payload for {table: version}, calling build() when it is missing, stale or expired."""
+        versions = tuple(versions.get(table) for table in METRICS_TABLES)
+        with self._lock:
+            payload = self._fresh(versions)
+            if payload is not None:
+                self.hits += 1
+                return payload
+        with self._build_lock:
+            # Another request may have rebuilt it while this one waited
+            with self._lock:
+                payload = self._fresh(versions)
+                if payload is not None:
+                    self.hits += 1
+                    return payload
+                self.misses += 1
+            payload = build()
+            with self._lock:
+                self._entry = (versions, time.monotonic(), payload)
+            return payload
+
+    def invalidate(self):
+        with self._lock:
+            self._entry = None
+
+    def stats(self):
+        with self._lock:
+            age = round(time.monotonic() - self._entry[1], 1) if self._entry else None
+            return {'ttl': self.ttl, 'hits': self.hits, 'misses': self.misses, 'age': age}
@@ -0,0 +1,177 @@
+"""Per-table data versions kept in MySQL.
+
+migrations/0004_data_versions.sql creates the data_versions table, one
+counter per tracked table. Because the counters live in the database
+they are shared by every worker process and the CLI scripts, which an
+in-process counter cannot see.
+
+The app uses them for the timetable page and calendar feed ETags
+(http_cache.py, calendar_feeds.py) and to notice when its in-memory
+schedule index and reference cache were built from data another process
+has since changed.
+
+A counter moves once per transaction that wrote its table, not once per
+row. VersionedConnection, the connection class of the app's pool, notes
+the tracked tables every statement it runs may write, and commit() adds
+one to their counters just before committing. Writers of a table then
+hold its counter row only for that last statement, and a 50k-row import
+costs one counter update per chunk. (Migration 0004 first did this with
+per-row triggers, which made every writer of a table wait on one counter
+row until commit; 0010 drops them.) The connection must not be in
+autocommit mode.
+
+written_tables() fails closed: only plain reads (SELECT, SHOW, SET, ...)
+and single-table INSERT, REPLACE, UPDATE and DELETE statements are taken
+at their word. Anything else, such as a multi-table UPDATE, WITH ...,
+TRUNCATE, LOAD DATA or DDL, counts as writing every tracked table it
+names, and a statement that names no table (CALL, EXECUTE) as writing
+them all. A needless bump only costs a cache rebuild; a missed one serves
+stale pages.
+
+The app, the CLI scripts, synthetic_data.py and the benchmarks all write
+through VersionedConnection. Writes made outside it, such as a mysql
+shell, do not move the counters; run `python data_versions.py --bump`
+after them.
+"""
+import argparse
+import hashlib
+import os
+import re
+
+import MySQLdb
+import MySQLdb.connections
+import MySQLdb.cursors
+
+TRACKED_TABLES = ('schedule', 'departments', 'faculty', 'courses', 'semesters', 'sessions', 'rooms', 'time_slots',
+                  'offered_programs', 'students', 'enrolledstudents', 'current_semester', 'assign_courses_to_student',
+                  'calendar_tokens')
+
+# MySQL error code of a missing table: data_versions before migration 0004
+NO_SUCH_TABLE = 1146
+
+# Whitespace, comments and opening parentheses before a statement's first keyword
+_LEADING = re.compile(rb'(?:\s+|/\*.*?\*/|(?:--|\#)[^\n]*(?:\n|$)|\()*', re.S)
+_READ = re.compile(rb'(?:SELECT|SHOW|SET|EXPLAIN|DESCRIBE|DESC|USE|BEGIN|START|COMMIT|ROLLBACK|SAVEPOINT|RELEASE|'
+                   rb'LOCK|UNLOCK|ANALYZE|CHECK|CHECKSUM|OPTIMIZE|FLUSH|KILL|HELP|TABLE|VALUES)\b', re.I)
+# Verbs whose statements name every table they write
+_NAMED = re.compile(rb'(?:INSERT|REPLACE|UPDATE|DELETE|TRUNCATE|LOAD|WITH|CREATE|ALTER|DROP|RENAME)\b', re.I)
+_TABLE = rb'(?:`?\w+`?\.)?`?(\w+)`?'
+_SINGLE = re.compile(
+    rb'(?:INSERT\s+(?:(?:LOW_PRIORITY|DELAYED|HIGH_PRIORITY|IGNORE)\s+)*(?:INTO\s+)?' + _TABLE +
+    rb'|REPLACE\s+(?:(?:LOW_PRIORITY|DELAYED)\s+)*(?:INTO\s+)?' + _TABLE +
+    rb'|UPDATE\s+(?:(?:LOW_PRIORITY|IGNORE)\s+)*' + _TABLE + rb'(?:\s+(?:AS\s+)?(?!SET\b)\w+)?\s+SET\b'
+    rb'|DELETE\s+(?:(?:LOW_PRIORITY|QUICK|IGNORE)\s+)*FROM\s+' + _TABLE + rb'(?!\s*,|\s+USING\b|\s*\.))',
+    re.I)
+_TRACKED = re.compile(rb'\b(' + b'|'.join(name.encode() for name in TRACKED_TABLES) + rb')\b', re.I)
+
+
+def written_tables(query):
+    """The tracked tables a statement may write; see the module docstring for the rules."""
+    if isinstance(query, str):
+        query = query.encode('utf-8')
+    start = _LEADING.match(query).end()
+    if _READ.match(query, start):
+        return ()
+    match = _SINGLE.match(query, start)
+    if match:
+        table = next(name for name in match.groups() if name is not None).decode('ascii').lower()
+        return (table,) if table in TRACKED_TABLES else ()
+    named = {name.decode('ascii').lower() for name in _TRACKED.findall(query)}
+    if named or _NAMED.match(query, start):
+        return tuple(sorted(named))
+    return TRACKED_TABLES
+
+
+def bump_versions(cur, tables):
+    """Add one to the counter of each table, in name order so concurrent bumps cannot deadlock."""
+    tables = sorted(tables)
+    cur.execute(f"UPDATE data_versions SET Version = Version + 1 WHERE Name IN ({', '.join(['%s'] * len(tables))})",
+                tables)
+
+
+class VersionedConnection(MySQLdb.connections.Connection):
+    """MySQLdb connection that bumps the versions of the tracked tables it wrote, once per commit.
+
+    committed_versions holds the versions the last commit set, read inside
+    its transaction: a caller that knows what it wrote can tell whether
+    another writer got in before it (each commit moves a counter by one).
+    """
+
+    _written = None
+    committed_versions = {}
+
+    def query(self, query):
+        # Every cursor statement ends up here, executemany's multi-row INSERTs included
+        tables = written_tables(query)
+        if tables:
+            if self._written is None:
+                self._written = set()
+            self._written.update(tables)
+        return super().query(query)
+
+    def commit(self):
+        written, self._written = self._written, None
+        versions = {}
+        if written:
+            cur = self.cursor(MySQLdb.cursors.DictCursor)
+            try:
+                bump_versions(cur, written)
+                versions = read_versions(cur, sorted(written))
+            except MySQLdb.ProgrammingError as e:
+                # Schema and migrations loading before 0004: no counters to move yet
+                if e.args[0] != NO_SUCH_TABLE:
+                    raise
+            finally:
+                cur.close()
+        super().commit()
+        self.committed_versions = versions
+
+    def rollback(self):
+        self._written = None
+        super().rollback()
+
+
+def read_versions(cur, tables=TRACKED_TABLES):
+    """Return {table: version} for the given tables (DictCursor)."""
+    cur.execute(f"SELECT Name, Version FROM data_versions WHERE Name IN ({', '.join(['%s'] * len(tables))})",
+                tuple(tables))
+    return {row['Name']: int(row['Version']) for row in cur.fetchall()}
+
+
+def code_version(root, folders=('templates',), files=('app.py',)):
+    """Fingerprint of the templates and app code, so a deploy changes every ETag."""
+    digest = hashlib.sha1()
+    paths = [os.path.join(root, name) for name in files]
+    for folder in folders:
+        for dirpath, _, filenames in os.walk(os.path.join(root, folder)):
+            paths.extend(os.path.join(dirpath, name) for name in filenames)
+    for path in sorted(paths):
+        if os.path.isfile(path):
+            digest.update(os.path.relpath(path, root).encode())
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bump', nargs='*', metavar='TABLE', help='move the counters of these tables (default: all)')
+    args = parser.parse_args()
+    if args.bump is None:
+        parser.error("give --bump")
+    unknown = sorted(set(args.bump) - set(TRACKED_TABLES))
+    if unknown:
+        parser.error(f"not tracked: {', '.join(unknown)}")
+
+    from app import app, mysql
+
+    with app.app_context():
+        cur = mysql.connection.cursor()
+        bump_versions(cur, args.bump or TRACKED_TABLES)
+        mysql.connection.commit()
+        cur.close()
+    print("Versions bumped; caches and page ETags built from the old data are now stale.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,389 @@
+"""Pooled MySQL connections for the Flask app.
+
+flask_mysqldb opens a new MySQL connection for every app context and
+closes it at teardown, so every request pays the TCP connect and the
+authentication handshake, and a burst of requests (semester-start logins)
+opens as many connections as there are requests in flight.
+
+PooledMySQL is a drop-in replacement for flask_mysqldb.MySQL: routes keep
+using mysql.connection.cursor() and mysql.connection.commit(). The first
+access in an app context borrows a connection from a ConnectionPool and
+teardown hands it back, rolled back so the next borrower starts clean.
+
+Configuration (app.config, defaults in brackets):
+
+    MYSQL_POOL_SIZE          connections kept open [10]
+    MYSQL_POOL_MAX_OVERFLOW  extra connections opened under load and
+                             closed again when returned [10]
+    MYSQL_POOL_TIMEOUT       seconds to wait for a free connection [30]
+    MYSQL_POOL_RECYCLE       close connections older than this many
+                             seconds, 0 to keep them forever [3600]
+    MYSQL_POOL_PRE_PING      ping a connection before lending it [True]
+
+The connection settings are the flask_mysqldb ones (MYSQL_HOST,
+MYSQL_USER, MYSQL_PASSWORD, MYSQL_DB, MYSQL_PORT, MYSQL_UNIX_SOCKET,
+MYSQL_CONNECT_TIMEOUT, MYSQL_CHARSET, MYSQL_AUTOCOMMIT). connection_class
+opens the connections, MySQLdb.connect unless a Connection subclass is
+given (sql_metrics.InstrumentedConnection times every statement).
+
+Read replica. With MYSQL_REPLICA_HOST set, views decorated with
+@mysql.replica_reads get their mysql.connection from a second pool on the
+replica; everything else, and every write, stays on the primary. A view
+reads from the primary instead when
+
+- the browser wrote (any request other than GET, HEAD or OPTIONS that
+  used the primary) less than MYSQL_PRIMARY_AFTER_WRITE seconds ago, so
+  an admin sees their own edit at once (remembered in the session);
+- the replica is more than MYSQL_REPLICA_MAX_LAG seconds behind, its
+  replication is stopped (Seconds_Behind_Source is NULL) or it cannot be
+  reached. ReplicaMonitor checks SHOW REPLICA STATUS at most every
+  MYSQL_REPLICA_CHECK_INTERVAL seconds, so the fallback and the return
+  to the replica follow within that interval.
+
+    MYSQL_REPLICA_HOST            replica host, None for no replica [None]
+    MYSQL_REPLICA_PORT            replica port [MYSQL_PORT]
+    MYSQL_REPLICA_USER/PASSWORD   replica login [MYSQL_USER/MYSQL_PASSWORD]
+    MYSQL_REPLICA_MAX_LAG         seconds behind the primary still read [5]
+    MYSQL_REPLICA_CHECK_INTERVAL  seconds between lag checks [2]
+    MYSQL_PRIMARY_AFTER_WRITE     read-your-writes window in seconds [10]
+
+The replica pool uses the MYSQL_POOL_* settings too. stats() reports it
+under 'replica', with the last lag seen and how many views were routed
+where ('replica', 'after_write', 'lagging').
+"""
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+import MySQLdb
+import MySQLdb.cursors
+from flask import g, request, session
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the pool timeout."""
+
+
+class ConnectionPool:
+    """Thread-safe pool of DB-API connections created by connect()."""
+
+    def __init__(self, connect, size=10, max_overflow=10, timeout=30.0, recycle=3600, pre_ping=True):
+        self.connect = connect
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self._idle = deque()       # (connection, created_at), most recently returned last
+        self._created_at = {}      # id(connection) -> created_at for connections lent out
+        self._open = 0
+        self._cond = threading.Condition()
+        # Counters for stats()
+        self.borrows = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+        self.created = 0
+        self.discarded = 0
+
+    def acquire(self):
+        """Borrow a live connection, waiting up to timeout seconds for one to free up."""
+        started = time.perf_counter()
+        deadline = started + self.timeout
+        waited = False
+        while True:
+            with self._cond:
+                while not self._idle and self._open >= self.size + self.max_overflow:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeout(f"no connection free after {self.timeout}s "
+                                          f"({self._open} open, pool size {self.size} + {self.max_overflow} overflow)")
+                    waited = True
+                    self._cond.wait(remaining)
+                if self._idle:
+                    conn, created_at = self._idle.pop()
+                else:
+                    conn, created_at = None, None
+                    self._open += 1
+
+            fresh = conn is None
+            if fresh:
+                try:
+                    conn, created_at = self.connect(), time.time()
+                except Exception:
+                    self._forget()
+                    raise
+            elif not self._healthy(conn, created_at):
+                self._close(conn)
+                continue
+
+            waited_for = time.perf_counter() - started
+            with self._cond:
+                self._created_at[id(conn)] = created_at
+                self.borrows += 1
+                if fresh:
+                    self.created += 1
+                if waited:
+                    self.waits += 1
+                    self.wait_time += waited_for
+                    self.max_wait = max(self.max_wait, waited_for)
+            return conn
+
+    def release(self, conn):
+        """Return a borrowed connection, ending any open transaction first."""
+        with self._cond:
+            created_at = self._created_at.pop(id(conn), time.time())
+        try:
+            conn.rollback()
+        except Exception:
+            self._close(conn)
+            return
+        with self._cond:
+            if len(self._idle) < self.size:
+                self._idle.append((conn, created_at))
+                self._cond.notify()
+                return
+        # Overflow connection: the pool is full again
+        self._close(conn)
+
+    def _healthy(self, conn, created_at):
+        if self.recycle and time.time() - created_at > self.recycle:
+            return False
+        if self.pre_ping:
+            try:
+                conn.ping()
+            except Exception:
+                return False
+        return True
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._forget(discarded=True)
+
+    def _forget(self, discarded=False):
+        with self._cond:
+            self._open -= 1
+            if discarded:
+                self.discarded += 1
+            self._cond.notify()
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+        for conn, _ in idle:
+            self._close(conn)
+
+    def stats(self):
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                'size': self.size,
+                'max_overflow': self.max_overflow,
+                'open': self._open,
+                'in_use': self._open - idle,
+                'idle': idle,
+                'borrows': self.borrows,
+                'waits': self.waits,
+                'wait_time_total_ms': round(self.wait_time * 1000, 3),
+                'wait_time_avg_ms': round(self.wait_time / self.waits * 1000, 3) if self.waits else 0.0,
+                'wait_time_max_ms': round(self.max_wait * 1000, 3),
+                'timeouts': self.timeouts,
+                'created': self.created,
+                'discarded': self.discarded,
+            }
+
+
+class ReplicaMonitor:
+    """Whether the replica is fit to read from, rechecked at most every interval seconds."""
+
+    def __init__(self, max_lag=5.0, interval=2.0):
+        self.max_lag = max_lag
+        self.interval = interval
+        self.healthy = False
+        self.lag = None         # Seconds_Behind_Source at the last check, None when unknown
+        self.error = None       # why the last check found the replica unfit
+        self.checked_at = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def usable(self, pool):
+        """The cached answer, refreshed through a connection from pool once it is interval seconds old."""
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_check:
+                return self.healthy
+            # Other requests keep the previous answer (unfit before the first check) while this one checks
+            self._next_check = now + self.interval
+        healthy, lag, error = self.check(pool)
+        with self._lock:
+            self.healthy, self.lag, self.error, self.checked_at = healthy, lag, error, time.time()
+        return healthy
+
+    def check(self, pool):
+        """(healthy, lag, error) from SHOW REPLICA STATUS (SHOW SLAVE STATUS before MySQL 8.0.22)."""
+        try:
+            conn = pool.acquire()
+        except Exception as e:
+            return False, None, f"replica unreachable: {e}"
+        try:
+            cur = conn.cursor(MySQLdb.cursors.DictCursor)
+            try:
+                cur.execute("SHOW REPLICA STATUS")
+            except MySQLdb.ProgrammingError:
+                cur.execute("SHOW SLAVE STATUS")
+            row = cur.fetchone()
+            cur.close()
+        except MySQLdb.Error as e:
+            return False, None, f"replica status unavailable: {e}"
+        finally:
+            pool.release(conn)
+        if row is None:
+            return False, None, "server is not replicating"
+        lag = row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master'))
+        if lag is None:
+            return False, None, "replication is stopped"
+        if lag > self.max_lag:
+            return False, lag, f"replica is {lag}s behind"
+        return True, lag, None
+
+
+class PooledMySQL:
+    """flask_mysqldb.MySQL look-alike whose connections come from a ConnectionPool."""
+
+    def __init__(self, app=None, connection_class=None):
+        self.app = None
+        self.connection_class = connection_class or MySQLdb.connect
+        self.pool = None
+        self.replica_pool = None
+        self.replica = None
+        self.routed = {'replica': 0, 'after_write': 0, 'lagging': 0}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        for key, value in (('MYSQL_HOST', 'localhost'), ('MYSQL_USER', None), ('MYSQL_PASSWORD', None),
+                           ('MYSQL_DB', None), ('MYSQL_PORT', 3306), ('MYSQL_UNIX_SOCKET', None),
+                           ('MYSQL_CONNECT_TIMEOUT', 10), ('MYSQL_CHARSET', 'utf8'), ('MYSQL_AUTOCOMMIT', False),
+                           ('MYSQL_POOL_SIZE', 10), ('MYSQL_POOL_MAX_OVERFLOW', 10), ('MYSQL_POOL_TIMEOUT', 30),
+                           ('MYSQL_POOL_RECYCLE', 3600), ('MYSQL_POOL_PRE_PING', True),
+                           ('MYSQL_REPLICA_HOST', None), ('MYSQL_REPLICA_PORT', None), ('MYSQL_REPLICA_USER', None),
+                           ('MYSQL_REPLICA_PASSWORD', None), ('MYSQL_REPLICA_MAX_LAG', 5),
+                           ('MYSQL_REPLICA_CHECK_INTERVAL', 2), ('MYSQL_PRIMARY_AFTER_WRITE', 10)):
+            app.config.setdefault(key, value)
+        app.after_request(self._remember_write)
+        app.teardown_appcontext(self.teardown)
+
+    def _connect(self, replica=False):
+        config = self.app.config
+        kwargs = {'host': config['MYSQL_HOST'], 'port': config['MYSQL_PORT'],
+                  'connect_timeout': config['MYSQL_CONNECT_TIMEOUT'], 'charset': config['MYSQL_CHARSET'],
+                  'autocommit': config['MYSQL_AUTOCOMMIT']}
+        for key, arg in (('MYSQL_USER', 'user'), ('MYSQL_PASSWORD', 'passwd'), ('MYSQL_DB', 'db'),
+                         ('MYSQL_UNIX_SOCKET', 'unix_socket')):
+            if config[key] is not None:
+                kwargs[arg] = config[key]
+        if replica:
+            kwargs['host'] = config['MYSQL_REPLICA_HOST']
+            kwargs['port'] = config['MYSQL_REPLICA_PORT'] or config['MYSQL_PORT']
+            kwargs.pop('unix_socket', None)
+            for key, arg in (('MYSQL_REPLICA_USER', 'user'), ('MYSQL_REPLICA_PASSWORD', 'passwd')):
+                if config[key] is not None:
+                    kwargs[arg] = config[key]
+        return self.connection_class(**kwargs)
+
+    def _new_pool(self, connect):
+        config = self.app.config
+        return ConnectionPool(connect, size=config['MYSQL_POOL_SIZE'], max_overflow=config['MYSQL_POOL_MAX_OVERFLOW'],
+                              timeout=config['MYSQL_POOL_TIMEOUT'], recycle=config['MYSQL_POOL_RECYCLE'],
+                              pre_ping=config['MYSQL_POOL_PRE_PING'])
+
+    def get_pool(self):
+        # Created lazily so settings changed after init_app still apply
+        with self._lock:
+            if self.pool is None:
+                self.pool = self._new_pool(self._connect)
+        return self.pool
+
+    def get_replica_pool(self):
+        """The replica pool, or None when MYSQL_REPLICA_HOST is not set."""
+        config = self.app.config
+        if not config['MYSQL_REPLICA_HOST']:
+            return None
+        with self._lock:
+            if self.replica_pool is None:
+                self.replica_pool = self._new_pool(lambda: self._connect(replica=True))
+                self.replica = ReplicaMonitor(config['MYSQL_REPLICA_MAX_LAG'], config['MYSQL_REPLICA_CHECK_INTERVAL'])
+        return self.replica_pool
+
+    def replica_reads(self, f):
+        """Decorator for read-only views: their mysql.connection may come from the replica."""
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            g.mysql_replica_reads = True
+            return f(*args, **kwargs)
+        return decorated_function
+
+    def _use_replica(self):
+        # Where a replica_reads view reads from; counted in routed
+        pool = self.get_replica_pool()
+        if pool is None:
+            return False
+        if session.get('mysql_primary_until', 0) > time.time():
+            route = 'after_write'
+        elif self.replica.usable(pool):
+            route = 'replica'
+        else:
+            route = 'lagging'
+        with self._lock:
+            self.routed[route] += 1
+        return route == 'replica'
+
+    @property
+    def connection(self):
+        """The connection lent to the current app context (borrowed on first use).
+
+        In a replica_reads view that is a replica connection when the
+        replica is usable, unless the context already holds a primary one.
+        """
+        if 'mysql_replica_db' in g:
+            return g.mysql_replica_db
+        if 'mysql_db' not in g:
+            if g.get('mysql_replica_reads') and self._use_replica():
+                g.mysql_replica_db = self.replica_pool.acquire()
+                return g.mysql_replica_db
+            g.mysql_db = self.get_pool().acquire()
+        return g.mysql_db
+
+    def _remember_write(self, response):
+        # A request that may have written through the primary keeps this browser's reads on it for a while
+        if self.app.config['MYSQL_REPLICA_HOST'] and 'mysql_db' in g and request.method not in SAFE_METHODS:
+            session['mysql_primary_until'] = time.time() + self.app.config['MYSQL_PRIMARY_AFTER_WRITE']
+        return response
+
+    def teardown(self, exception):
+        conn = g.pop('mysql_db', None)
+        if conn is not None:
+            self.pool.release(conn)
+        conn = g.pop('mysql_replica_db', None)
+        if conn is not None:
+            self.replica_pool.release(conn)
+
+    def stats(self):
+        stats = self.get_pool().stats()
+        replica_pool = self.get_replica_pool()
+        if replica_pool is not None:
+            with self._lock:
+                routed = dict(self.routed)
+            stats['replica'] = dict(replica_pool.stats(), healthy=self.replica.healthy, lag_seconds=self.replica.lag,
+                                    error=self.replica.error, checked_at=self.replica.checked_at, routed=routed)
+        return stats
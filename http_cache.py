@@ -0,0 +1,58 @@
+"""Conditional GET for the read-only timetable pages.
+
+Every response used to carry Cache-Control: no-store, so browsers had to
+download full timetable pages again even though they only change when
+someone edits the schedule or the reference data shown on them.
+
+conditional_page() gives a view an ETag built from the data versions
+(data_versions.py), the request's filters, the viewer's identity and the
+code version. A browser revalidating with If-None-Match gets
+304 Not Modified when none of those moved, before the view runs any
+query. Pages are marked private, no-cache, so they are always
+revalidated and never stored by shared caches.
+
+Admin sessions are left out: their pages keep no-store so the back
+button cannot bring them back after logout. For the same reason the
+per-user pages (a teacher's or a student's own timetable) do not use
+it. Requests with pending
+flash messages are also left out, because the page has to be rendered
+to show them.
+"""
+import hashlib
+from functools import wraps
+
+from flask import g, make_response, request, session
+
+# Session keys that change what a timetable page shows
+IDENTITY_KEYS = ('loggedin', 'role', 'username', 'faculty_id', 'student_id')
+
+
+def page_etag(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:32]
+
+
+def conditional_page(get_versions, code_version):
+    """Decorator factory; get_versions() returns the current {table: version}."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or session.get('role') == 'admin' or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            versions = get_versions()
+            etag = page_etag(code_version, request.endpoint, sorted(request.args.items(multi=True)),
+                             sorted(kwargs.items()), [session.get(key) for key in IDENTITY_KEYS],
+                             sorted(versions.items()))
+            if etag in request.if_none_match:
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.vary.add('Cookie')
+            g.conditional_response = True
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,130 @@
+"""Versioned schema migrations.
+
+Migrations are plain SQL files in migrations/ named NNNN_description.sql.
+They are applied in order and recorded in the schema_migrations table, so
+each one runs exactly once per database.
+
+Usage (from the project root, after database_schema.sql):
+
+    python migrate.py             # apply pending migrations
+    python migrate.py --status    # list applied and pending migrations
+"""
+import argparse
+import os
+import re
+import sys
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+_FILENAME = re.compile(r'^(\d{4})_[\w-]+\.sql$')
+
+
+def available_migrations():
+    """Return (version, path) for every migration file, oldest first."""
+    found = []
+    for name in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = _FILENAME.match(name)
+        if match:
+            found.append((name[:-4], os.path.join(MIGRATIONS_DIR, name)))
+    return found
+
+
+def split_statements(sql):
+    """Split a migration file into statements, dropping -- comment lines."""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith('--')]
+    statements = []
+    current = []
+    for line in lines:
+        current.append(line)
+        if line.rstrip().endswith(';'):
+            statement = '\n'.join(current).strip().rstrip(';').strip()
+            if statement:
+                statements.append(statement)
+            current = []
+    leftover = '\n'.join(current).strip()
+    if leftover:
+        statements.append(leftover)
+    return statements
+
+
+def ensure_migrations_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            Version VARCHAR(255) PRIMARY KEY,
+            AppliedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def applied_versions(cur):
+    ensure_migrations_table(cur)
+    cur.execute("SELECT Version FROM schema_migrations")
+    return {row[0] for row in cur.fetchall()}
+
+
+def pending_migrations(cur):
+    done = applied_versions(cur)
+    return [(version, path) for version, path in available_migrations() if version not in done]
+
+
+def require_current(connection):
+    """Exit with a message if any migration is pending.
+
+    For scripts that rely on the migrated schema: they check it instead
+    of migrating as a side effect, and create nothing while checking.
+    """
+    cur = connection.cursor()
+    cur.execute("SELECT COUNT(*) FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'schema_migrations'")
+    done = set()
+    if cur.fetchone()[0]:
+        cur.execute("SELECT Version FROM schema_migrations")
+        done = {row[0] for row in cur.fetchall()}
+    cur.close()
+    pending = [version for version, _ in available_migrations() if version not in done]
+    if pending:
+        sys.exit(f"{len(pending)} migration(s) pending ({', '.join(pending)}); run python migrate.py first.")
+
+
+def apply_migrations(connection, log=print):
+    """Apply every pending migration and return the versions applied.
+
+    MySQL commits DDL implicitly, so a failing migration stops the run and
+    is left unrecorded; fix it and run again.
+    """
+    cur = connection.cursor()
+    applied = []
+    for version, path in pending_migrations(cur):
+        log(f"Applying {version} ...")
+        with open(path, encoding='utf-8') as f:
+            for statement in split_statements(f.read()):
+                cur.execute(statement)
+        cur.execute("INSERT INTO schema_migrations (Version) VALUES (%s)", (version,))
+        connection.commit()
+        applied.append(version)
+    cur.close()
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply schema migrations from migrations/.")
+    parser.add_argument('--status', action='store_true', help='show applied and pending migrations')
+    args = parser.parse_args()
+
+    from app import app, mysql
+
+    with app.app_context():
+        connection = mysql.connection
+        if args.status:
+            cur = connection.cursor()
+            done = applied_versions(cur)
+            cur.close()
+            for version, _ in available_migrations():
+                print(f"[{'x' if version in done else ' '}] {version}")
+            return
+        applied = apply_migrations(connection)
+        print(f"{len(applied)} migration(s) applied." if applied else "Database is up to date.")
+
+
+if __name__ == '__main__':
+    main()
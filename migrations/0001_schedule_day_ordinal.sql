@@ -0,0 +1,12 @@
+-- Integer day ordinal for schedule (Monday = 1 ... Sunday = 7).
+--
+-- DayOfWeek stays the column the routes write, and DayNo is a stored
+-- generated column derived from it. Old code that reads DayOfWeek and new
+-- code that filters and sorts on DayNo both keep working, and the two can
+-- never disagree. Ordering by DayNo gives Monday..Saturday instead of the
+-- alphabetical order DayOfWeek sorts in.
+
+ALTER TABLE schedule
+    ADD COLUMN DayNo TINYINT UNSIGNED
+        AS (FIELD(DayOfWeek, 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')) STORED
+        AFTER DayOfWeek;
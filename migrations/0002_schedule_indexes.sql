@@ -0,0 +1,22 @@
+-- Composite indexes for the schedule access paths used in app.py.
+--
+-- Each index leads with the columns a timetable view filters on and then
+-- carries the rest of the schedule columns the joins need, so the
+-- schedule side of every view is read from the index alone.
+--
+--   ix_schedule_day      view_timetable, room_timetable (by day)
+--   ix_schedule_program  student_timetable, student_timetable_report,
+--                        weekly_timetable, room_timetable (by program)
+--   ix_schedule_semester room_timetable / reports filtered by semester only
+--   ix_schedule_faculty  faculty_timetable, faculty_timetable_report
+--   ix_schedule_room     room bookings per day and slot
+--
+-- The single-column indexes MySQL created for the FacultyID, RoomID,
+-- SemesterID and ProgramID foreign keys are dropped automatically once a
+-- composite index can serve them.
+
+CREATE INDEX ix_schedule_day ON schedule (DayNo, SlotID, RoomID, SemesterID, ProgramID, FacultyID, CourseID);
+CREATE INDEX ix_schedule_program ON schedule (ProgramID, SemesterID, DayNo, SlotID, CourseID, FacultyID, RoomID);
+CREATE INDEX ix_schedule_semester ON schedule (SemesterID, DayNo, SlotID, ProgramID, CourseID, FacultyID, RoomID);
+CREATE INDEX ix_schedule_faculty ON schedule (FacultyID, DayNo, SlotID, SemesterID, ProgramID, CourseID, RoomID);
+CREATE INDEX ix_schedule_room ON schedule (RoomID, DayNo, SlotID, SemesterID, ProgramID, FacultyID, CourseID);
@@ -0,0 +1,48 @@
+-- Keys for incremental maintenance of student_timetable_reports
+-- (see student_reports.py).
+--
+-- The table was created by create_student_timetable_reports_table.sql or
+-- the populate scripts; create it here too so every database has it.
+-- ux_student_report is the natural key the refresh upserts on, one row
+-- per student, semester, course, day and slot. Duplicates left by the
+-- old DELETE + INSERT ... SELECT rebuilds are removed first, keeping the
+-- oldest row.
+--
+-- ix_acs_program_course finds the students of one program/course when a
+-- schedule row changes.
+
+CREATE TABLE IF NOT EXISTS student_timetable_reports (
+    ReportID INT AUTO_INCREMENT PRIMARY KEY,
+    StudentID INT NOT NULL,
+    SemesterID INT NOT NULL,
+    ProgramID INT NOT NULL,
+    CourseID INT NOT NULL,
+    FacultyID INT NOT NULL,
+    DayOfWeek VARCHAR(20) NOT NULL,
+    SlotID INT NOT NULL,
+    RoomID INT NOT NULL,
+    CourseName VARCHAR(255) NOT NULL,
+    FacultyName VARCHAR(255) NOT NULL,
+    RoomNumber VARCHAR(50) NOT NULL,
+    StartTime TIME NOT NULL,
+    EndTime TIME NOT NULL,
+    CreatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (StudentID) REFERENCES students(StudentID),
+    FOREIGN KEY (SemesterID) REFERENCES semesters(SemesterID),
+    FOREIGN KEY (ProgramID) REFERENCES offered_programs(ProgramID),
+    FOREIGN KEY (CourseID) REFERENCES courses(CourseID),
+    FOREIGN KEY (FacultyID) REFERENCES faculty(FacultyID),
+    FOREIGN KEY (SlotID) REFERENCES time_slots(SlotID),
+    FOREIGN KEY (RoomID) REFERENCES rooms(RoomID)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+DELETE newer FROM student_timetable_reports newer
+JOIN student_timetable_reports older
+  ON older.StudentID = newer.StudentID AND older.SemesterID = newer.SemesterID
+ AND older.CourseID = newer.CourseID AND older.DayOfWeek = newer.DayOfWeek
+ AND older.SlotID = newer.SlotID AND older.ReportID < newer.ReportID;
+
+ALTER TABLE student_timetable_reports
+    ADD UNIQUE KEY ux_student_report (StudentID, SemesterID, CourseID, DayOfWeek, SlotID);
+
+CREATE INDEX ix_acs_program_course ON assign_courses_to_student (ProgramID, CourseID, CurrentSemesterID, StudentID);
@@ -0,0 +1,78 @@
+-- Per-table data versions (see data_versions.py).
+--
+-- data_versions holds one counter per tracked table, so readers can tell
+-- cheaply whether anything derived from the table -- a timetable page
+-- ETag, an in-memory cache -- is still current. The AFTER INSERT, UPDATE
+-- and DELETE triggers below bumped a table's counter for every row
+-- written. Migration 0010 drops them: the app's connections, which the
+-- CLI scripts and synthetic_data.py use too, now bump the counters once
+-- per transaction at commit (data_versions.VersionedConnection). Writes
+-- made in a mysql shell do not move them; run
+-- `python data_versions.py --bump` after such edits.
+
+CREATE TABLE IF NOT EXISTS data_versions (
+    Name VARCHAR(64) PRIMARY KEY,
+    Version BIGINT UNSIGNED NOT NULL DEFAULT 0
+) ENGINE=InnoDB;
+
+INSERT IGNORE INTO data_versions (Name) VALUES
+    ('schedule'),
+    ('departments'),
+    ('faculty'),
+    ('courses'),
+    ('semesters'),
+    ('sessions'),
+    ('rooms'),
+    ('time_slots'),
+    ('offered_programs'),
+    ('students'),
+    ('enrolledstudents'),
+    ('current_semester');
+
+CREATE TRIGGER trg_schedule_ai AFTER INSERT ON schedule FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'schedule';
+CREATE TRIGGER trg_schedule_au AFTER UPDATE ON schedule FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'schedule';
+CREATE TRIGGER trg_schedule_ad AFTER DELETE ON schedule FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'schedule';
+
+CREATE TRIGGER trg_departments_ai AFTER INSERT ON departments FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'departments';
+CREATE TRIGGER trg_departments_au AFTER UPDATE ON departments FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'departments';
+CREATE TRIGGER trg_departments_ad AFTER DELETE ON departments FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'departments';
+
+CREATE TRIGGER trg_faculty_ai AFTER INSERT ON faculty FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'faculty';
+CREATE TRIGGER trg_faculty_au AFTER UPDATE ON faculty FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'faculty';
+CREATE TRIGGER trg_faculty_ad AFTER DELETE ON faculty FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'faculty';
+
+CREATE TRIGGER trg_courses_ai AFTER INSERT ON courses FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'courses';
+CREATE TRIGGER trg_courses_au AFTER UPDATE ON courses FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'courses';
+CREATE TRIGGER trg_courses_ad AFTER DELETE ON courses FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'courses';
+
+CREATE TRIGGER trg_semesters_ai AFTER INSERT ON semesters FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'semesters';
+CREATE TRIGGER trg_semesters_au AFTER UPDATE ON semesters FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'semesters';
+CREATE TRIGGER trg_semesters_ad AFTER DELETE ON semesters FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'semesters';
+
+CREATE TRIGGER trg_sessions_ai AFTER INSERT ON sessions FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'sessions';
+CREATE TRIGGER trg_sessions_au AFTER UPDATE ON sessions FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'sessions';
+CREATE TRIGGER trg_sessions_ad AFTER DELETE ON sessions FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'sessions';
+
+CREATE TRIGGER trg_rooms_ai AFTER INSERT ON rooms FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'rooms';
+CREATE TRIGGER trg_rooms_au AFTER UPDATE ON rooms FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'rooms';
+CREATE TRIGGER trg_rooms_ad AFTER DELETE ON rooms FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'rooms';
+
+CREATE TRIGGER trg_time_slots_ai AFTER INSERT ON time_slots FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'time_slots';
+CREATE TRIGGER trg_time_slots_au AFTER UPDATE ON time_slots FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'time_slots';
+CREATE TRIGGER trg_time_slots_ad AFTER DELETE ON time_slots FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'time_slots';
+
+CREATE TRIGGER trg_offered_programs_ai AFTER INSERT ON offered_programs FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'offered_programs';
+CREATE TRIGGER trg_offered_programs_au AFTER UPDATE ON offered_programs FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'offered_programs';
+CREATE TRIGGER trg_offered_programs_ad AFTER DELETE ON offered_programs FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'offered_programs';
+
+CREATE TRIGGER trg_students_ai AFTER INSERT ON students FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'students';
+CREATE TRIGGER trg_students_au AFTER UPDATE ON students FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'students';
+CREATE TRIGGER trg_students_ad AFTER DELETE ON students FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'students';
+
+CREATE TRIGGER trg_enrolledstudents_ai AFTER INSERT ON enrolledstudents FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'enrolledstudents';
+CREATE TRIGGER trg_enrolledstudents_au AFTER UPDATE ON enrolledstudents FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'enrolledstudents';
+CREATE TRIGGER trg_enrolledstudents_ad AFTER DELETE ON enrolledstudents FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'enrolledstudents';
+
+CREATE TRIGGER trg_current_semester_ai AFTER INSERT ON current_semester FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'current_semester';
+CREATE TRIGGER trg_current_semester_au AFTER UPDATE ON current_semester FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'current_semester';
+CREATE TRIGGER trg_current_semester_ad AFTER DELETE ON current_semester FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'current_semester';
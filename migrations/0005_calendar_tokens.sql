@@ -0,0 +1,26 @@
+-- Secret tokens for the iCalendar feeds (calendar_feeds.py).
+--
+-- One token per faculty member or student; the feed URL carries it in
+-- place of a login. Resetting a token replaces the row, which revokes the
+-- old URL. Tokens and course assignments are added to data_versions so the
+-- feed cache notices changes made by other processes.
+
+CREATE TABLE IF NOT EXISTS calendar_tokens (
+    Token VARCHAR(64) NOT NULL PRIMARY KEY,
+    OwnerType VARCHAR(16) NOT NULL,
+    OwnerID INT NOT NULL,
+    CreatedAt TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY ux_calendar_owner (OwnerType, OwnerID)
+) ENGINE=InnoDB;
+
+INSERT IGNORE INTO data_versions (Name) VALUES
+    ('assign_courses_to_student'),
+    ('calendar_tokens');
+
+CREATE TRIGGER trg_assign_courses_to_student_ai AFTER INSERT ON assign_courses_to_student FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'assign_courses_to_student';
+CREATE TRIGGER trg_assign_courses_to_student_au AFTER UPDATE ON assign_courses_to_student FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'assign_courses_to_student';
+CREATE TRIGGER trg_assign_courses_to_student_ad AFTER DELETE ON assign_courses_to_student FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'assign_courses_to_student';
+
+CREATE TRIGGER trg_calendar_tokens_ai AFTER INSERT ON calendar_tokens FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'calendar_tokens';
+CREATE TRIGGER trg_calendar_tokens_au AFTER UPDATE ON calendar_tokens FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'calendar_tokens';
+CREATE TRIGGER trg_calendar_tokens_ad AFTER DELETE ON calendar_tokens FOR EACH ROW UPDATE data_versions SET Version = Version + 1 WHERE Name = 'calendar_tokens';
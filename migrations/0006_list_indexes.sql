@@ -0,0 +1,25 @@
+-- Indexes for the paginated admin lists (pagination.py).
+--
+-- Each list page seeks to "sort value, primary key" and reads one page in
+-- index order. A secondary InnoDB index already ends with the primary
+-- key, so an index on the sort column alone serves ORDER BY col, id.
+--
+--   students          last name, first name, enrollment number
+--   faculty           last name, first name
+--   courses           course name
+--   offered_programs  program name
+--   attendance        date, and date within a student or a course
+--
+-- ix_attendance_student_date and ix_attendance_course_date also replace
+-- the single-column indexes MySQL created for the attendance foreign keys.
+
+CREATE INDEX ix_students_last_name ON students (LastName);
+CREATE INDEX ix_students_first_name ON students (FirstName);
+CREATE INDEX ix_students_enrollment ON students (EnrollmentNo);
+CREATE INDEX ix_faculty_last_name ON faculty (LastName);
+CREATE INDEX ix_faculty_first_name ON faculty (FirstName);
+CREATE INDEX ix_courses_name ON courses (CourseName);
+CREATE INDEX ix_offered_programs_name ON offered_programs (ProgramName);
+CREATE INDEX ix_attendance_date ON attendance (AttendanceDate);
+CREATE INDEX ix_attendance_student_date ON attendance (StudentID, AttendanceDate);
+CREATE INDEX ix_attendance_course_date ON attendance (CourseID, AttendanceDate);
@@ -0,0 +1,16 @@
+-- One attendance row per student, course and date (class_attendance.py).
+--
+-- Marking a whole class writes every status with one multi-row
+-- INSERT ... ON DUPLICATE KEY UPDATE on ux_attendance, so saving the
+-- same class twice updates the rows instead of adding a second set.
+-- Duplicates recorded by repeated single-row inserts are removed first,
+-- keeping the newest row, which holds the status last entered.
+
+DELETE older FROM attendance older
+JOIN attendance newer
+  ON newer.StudentID = older.StudentID
+ AND newer.CourseID = older.CourseID
+ AND newer.AttendanceDate = older.AttendanceDate
+ AND newer.AttendanceID > older.AttendanceID;
+
+ALTER TABLE attendance ADD UNIQUE KEY ux_attendance (StudentID, CourseID, AttendanceDate);
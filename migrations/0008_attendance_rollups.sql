@@ -0,0 +1,26 @@
+-- Attendance counters per student, course and semester
+-- (see attendance_rollups.py).
+--
+-- Present, Absent and Total are kept current by the attendance write
+-- routes; Percentage is derived from them and indexed per semester for
+-- the shortfall report. SemesterID 0 holds attendance for courses the
+-- student is not assigned, so it has no foreign key.
+--
+-- The table starts empty: run `python attendance_rollups.py --backfill`
+-- after migrating.
+
+CREATE TABLE IF NOT EXISTS attendance_rollups (
+    RollupID INT AUTO_INCREMENT PRIMARY KEY,
+    StudentID INT NOT NULL,
+    CourseID INT NOT NULL,
+    SemesterID INT NOT NULL,
+    Present INT NOT NULL DEFAULT 0,
+    Absent INT NOT NULL DEFAULT 0,
+    Total INT NOT NULL DEFAULT 0,
+    Percentage DECIMAL(5,2) AS (IF(Total = 0, NULL, Present * 100 / Total)) STORED,
+    UNIQUE KEY ux_attendance_rollup (StudentID, CourseID, SemesterID),
+    KEY ix_attendance_rollup_semester (SemesterID, Percentage),
+    KEY ix_attendance_rollup_course (CourseID, SemesterID, Percentage),
+    FOREIGN KEY (StudentID) REFERENCES students(StudentID),
+    FOREIGN KEY (CourseID) REFERENCES courses(CourseID)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,133 @@
+-- Denormalized read model of the schedule (see schedule_view.py).
+--
+-- schedule_view holds one row per schedule row with the course, faculty,
+-- room, time slot, program, department and semester columns the timetable
+-- pages show copied in, so every timetable view is a single-table lookup
+-- on one of the indexes below instead of a five- to eight-table join.
+--
+-- The triggers keep it current for every writer (the app, the CLI scripts
+-- or a mysql shell): schedule inserts, updates and deletes write the
+-- matching row, and renaming a course, faculty member, room, time slot,
+-- program, department or semester updates the copied names. Deleting any
+-- of those is refused by the schedule foreign keys while rows use it.
+--
+--   ix_schedule_view_day      room_timetable (by day, program, semester)
+--   ix_schedule_view_program  student_timetable, student_timetable_report
+--   ix_schedule_view_semester student_timetable_report by semester only
+--   ix_schedule_view_faculty  faculty_timetable, faculty_timetable_report
+--   ix_schedule_view_session  weekly_timetable
+--
+-- `python schedule_view.py --check` compares it with the source tables.
+
+CREATE TABLE IF NOT EXISTS schedule_view (
+    ScheduleID INT NOT NULL PRIMARY KEY,
+    CourseID INT,
+    FacultyID INT,
+    RoomID INT,
+    SlotID INT,
+    DayOfWeek VARCHAR(255),
+    DayNo TINYINT UNSIGNED
+        AS (FIELD(DayOfWeek, 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')) STORED,
+    SemesterID INT,
+    ProgramID INT,
+    SessionID INT,
+    DepartmentID INT,
+    CourseName VARCHAR(255),
+    FirstName VARCHAR(255),
+    LastName VARCHAR(255),
+    RoomNumber VARCHAR(255),
+    StartTime TIME,
+    EndTime TIME,
+    ProgramName VARCHAR(255),
+    DepartmentName VARCHAR(255),
+    SemesterName VARCHAR(255),
+    KEY ix_schedule_view_day (DayNo, ProgramID, SemesterID),
+    KEY ix_schedule_view_program (ProgramID, SemesterID, DayNo, StartTime),
+    KEY ix_schedule_view_semester (SemesterID, DayNo, StartTime),
+    KEY ix_schedule_view_faculty (FacultyID, DayNo, StartTime),
+    KEY ix_schedule_view_session (SessionID, SemesterID, DayNo, StartTime),
+    KEY ix_schedule_view_course (CourseID),
+    KEY ix_schedule_view_room (RoomID),
+    KEY ix_schedule_view_slot (SlotID),
+    KEY ix_schedule_view_department (DepartmentID)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TRIGGER trg_schedule_view_ai AFTER INSERT ON schedule FOR EACH ROW
+    REPLACE INTO schedule_view (ScheduleID, CourseID, FacultyID, RoomID, SlotID, DayOfWeek, SemesterID, ProgramID,
+                                SessionID, DepartmentID, CourseName, FirstName, LastName, RoomNumber, StartTime, EndTime,
+                                ProgramName, DepartmentName, SemesterName)
+    SELECT NEW.ScheduleID, NEW.CourseID, NEW.FacultyID, NEW.RoomID, NEW.SlotID, NEW.DayOfWeek, NEW.SemesterID,
+           NEW.ProgramID, op.SessionID, op.DepartmentID, c.CourseName, f.FirstName, f.LastName, r.RoomNumber,
+           ts.StartTime, ts.EndTime, op.ProgramName, d.DepartmentName, sem.SemesterName
+    FROM (SELECT 1) AS one
+    LEFT JOIN courses c ON c.CourseID = NEW.CourseID
+    LEFT JOIN faculty f ON f.FacultyID = NEW.FacultyID
+    LEFT JOIN rooms r ON r.RoomID = NEW.RoomID
+    LEFT JOIN time_slots ts ON ts.SlotID = NEW.SlotID
+    LEFT JOIN offered_programs op ON op.ProgramID = NEW.ProgramID
+    LEFT JOIN departments d ON d.DepartmentID = op.DepartmentID
+    LEFT JOIN semesters sem ON sem.SemesterID = NEW.SemesterID;
+
+CREATE TRIGGER trg_schedule_view_au AFTER UPDATE ON schedule FOR EACH ROW
+    REPLACE INTO schedule_view (ScheduleID, CourseID, FacultyID, RoomID, SlotID, DayOfWeek, SemesterID, ProgramID,
+                                SessionID, DepartmentID, CourseName, FirstName, LastName, RoomNumber, StartTime, EndTime,
+                                ProgramName, DepartmentName, SemesterName)
+    SELECT NEW.ScheduleID, NEW.CourseID, NEW.FacultyID, NEW.RoomID, NEW.SlotID, NEW.DayOfWeek, NEW.SemesterID,
+           NEW.ProgramID, op.SessionID, op.DepartmentID, c.CourseName, f.FirstName, f.LastName, r.RoomNumber,
+           ts.StartTime, ts.EndTime, op.ProgramName, d.DepartmentName, sem.SemesterName
+    FROM (SELECT 1) AS one
+    LEFT JOIN courses c ON c.CourseID = NEW.CourseID
+    LEFT JOIN faculty f ON f.FacultyID = NEW.FacultyID
+    LEFT JOIN rooms r ON r.RoomID = NEW.RoomID
+    LEFT JOIN time_slots ts ON ts.SlotID = NEW.SlotID
+    LEFT JOIN offered_programs op ON op.ProgramID = NEW.ProgramID
+    LEFT JOIN departments d ON d.DepartmentID = op.DepartmentID
+    LEFT JOIN semesters sem ON sem.SemesterID = NEW.SemesterID;
+
+-- A changed ScheduleID leaves the old row behind in the REPLACE above
+CREATE TRIGGER trg_schedule_view_au_id AFTER UPDATE ON schedule FOR EACH ROW
+    DELETE FROM schedule_view WHERE ScheduleID = OLD.ScheduleID AND OLD.ScheduleID <> NEW.ScheduleID;
+
+CREATE TRIGGER trg_schedule_view_ad AFTER DELETE ON schedule FOR EACH ROW
+    DELETE FROM schedule_view WHERE ScheduleID = OLD.ScheduleID;
+
+CREATE TRIGGER trg_schedule_view_courses_au AFTER UPDATE ON courses FOR EACH ROW
+    UPDATE schedule_view SET CourseName = NEW.CourseName WHERE CourseID = NEW.CourseID;
+
+CREATE TRIGGER trg_schedule_view_faculty_au AFTER UPDATE ON faculty FOR EACH ROW
+    UPDATE schedule_view SET FirstName = NEW.FirstName, LastName = NEW.LastName WHERE FacultyID = NEW.FacultyID;
+
+CREATE TRIGGER trg_schedule_view_rooms_au AFTER UPDATE ON rooms FOR EACH ROW
+    UPDATE schedule_view SET RoomNumber = NEW.RoomNumber WHERE RoomID = NEW.RoomID;
+
+CREATE TRIGGER trg_schedule_view_time_slots_au AFTER UPDATE ON time_slots FOR EACH ROW
+    UPDATE schedule_view SET StartTime = NEW.StartTime, EndTime = NEW.EndTime WHERE SlotID = NEW.SlotID;
+
+CREATE TRIGGER trg_schedule_view_semesters_au AFTER UPDATE ON semesters FOR EACH ROW
+    UPDATE schedule_view SET SemesterName = NEW.SemesterName WHERE SemesterID = NEW.SemesterID;
+
+CREATE TRIGGER trg_schedule_view_offered_programs_au AFTER UPDATE ON offered_programs FOR EACH ROW
+    UPDATE schedule_view v
+    LEFT JOIN departments d ON d.DepartmentID = NEW.DepartmentID
+    SET v.ProgramName = NEW.ProgramName, v.SessionID = NEW.SessionID, v.DepartmentID = NEW.DepartmentID,
+        v.DepartmentName = d.DepartmentName
+    WHERE v.ProgramID = NEW.ProgramID;
+
+CREATE TRIGGER trg_schedule_view_departments_au AFTER UPDATE ON departments FOR EACH ROW
+    UPDATE schedule_view SET DepartmentName = NEW.DepartmentName WHERE DepartmentID = NEW.DepartmentID;
+
+-- Fill it from the rows already scheduled; the triggers above already cover writes made meanwhile
+REPLACE INTO schedule_view (ScheduleID, CourseID, FacultyID, RoomID, SlotID, DayOfWeek, SemesterID, ProgramID,
+                            SessionID, DepartmentID, CourseName, FirstName, LastName, RoomNumber, StartTime, EndTime,
+                            ProgramName, DepartmentName, SemesterName)
+SELECT s.ScheduleID, s.CourseID, s.FacultyID, s.RoomID, s.SlotID, s.DayOfWeek, s.SemesterID, s.ProgramID,
+       op.SessionID, op.DepartmentID, c.CourseName, f.FirstName, f.LastName, r.RoomNumber, ts.StartTime, ts.EndTime,
+       op.ProgramName, d.DepartmentName, sem.SemesterName
+FROM schedule s
+LEFT JOIN courses c ON c.CourseID = s.CourseID
+LEFT JOIN faculty f ON f.FacultyID = s.FacultyID
+LEFT JOIN rooms r ON r.RoomID = s.RoomID
+LEFT JOIN time_slots ts ON ts.SlotID = s.SlotID
+LEFT JOIN offered_programs op ON op.ProgramID = s.ProgramID
+LEFT JOIN departments d ON d.DepartmentID = op.DepartmentID
+LEFT JOIN semesters sem ON sem.SemesterID = s.SemesterID;
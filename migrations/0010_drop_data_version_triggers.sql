@@ -0,0 +1,66 @@
+-- Stop bumping data_versions from per-row triggers (see data_versions.py).
+--
+-- The triggers from 0004 and 0005 updated one shared counter row for every
+-- row written, so all writers of a table queued on that row until they
+-- committed, and a multi-row import or cascade delete paid one extra UPDATE
+-- per row. The app's connections now bump the counter of every table a
+-- transaction may have written (unrecognised statements count as writes),
+-- once per transaction, just before commit. Writes made by hand in a mysql
+-- shell no longer move the counters; run `python data_versions.py --bump`
+-- after them.
+
+DROP TRIGGER IF EXISTS trg_schedule_ai;
+DROP TRIGGER IF EXISTS trg_schedule_au;
+DROP TRIGGER IF EXISTS trg_schedule_ad;
+
+DROP TRIGGER IF EXISTS trg_departments_ai;
+DROP TRIGGER IF EXISTS trg_departments_au;
+DROP TRIGGER IF EXISTS trg_departments_ad;
+
+DROP TRIGGER IF EXISTS trg_faculty_ai;
+DROP TRIGGER IF EXISTS trg_faculty_au;
+DROP TRIGGER IF EXISTS trg_faculty_ad;
+
+DROP TRIGGER IF EXISTS trg_courses_ai;
+DROP TRIGGER IF EXISTS trg_courses_au;
+DROP TRIGGER IF EXISTS trg_courses_ad;
+
+DROP TRIGGER IF EXISTS trg_semesters_ai;
+DROP TRIGGER IF EXISTS trg_semesters_au;
+DROP TRIGGER IF EXISTS trg_semesters_ad;
+
+DROP TRIGGER IF EXISTS trg_sessions_ai;
+DROP TRIGGER IF EXISTS trg_sessions_au;
+DROP TRIGGER IF EXISTS trg_sessions_ad;
+
+DROP TRIGGER IF EXISTS trg_rooms_ai;
+DROP TRIGGER IF EXISTS trg_rooms_au;
+DROP TRIGGER IF EXISTS trg_rooms_ad;
+
+DROP TRIGGER IF EXISTS trg_time_slots_ai;
+DROP TRIGGER IF EXISTS trg_time_slots_au;
+DROP TRIGGER IF EXISTS trg_time_slots_ad;
+
+DROP TRIGGER IF EXISTS trg_offered_programs_ai;
+DROP TRIGGER IF EXISTS trg_offered_programs_au;
+DROP TRIGGER IF EXISTS trg_offered_programs_ad;
+
+DROP TRIGGER IF EXISTS trg_students_ai;
+DROP TRIGGER IF EXISTS trg_students_au;
+DROP TRIGGER IF EXISTS trg_students_ad;
+
+DROP TRIGGER IF EXISTS trg_enrolledstudents_ai;
+DROP TRIGGER IF EXISTS trg_enrolledstudents_au;
+DROP TRIGGER IF EXISTS trg_enrolledstudents_ad;
+
+DROP TRIGGER IF EXISTS trg_current_semester_ai;
+DROP TRIGGER IF EXISTS trg_current_semester_au;
+DROP TRIGGER IF EXISTS trg_current_semester_ad;
+
+DROP TRIGGER IF EXISTS trg_assign_courses_to_student_ai;
+DROP TRIGGER IF EXISTS trg_assign_courses_to_student_au;
+DROP TRIGGER IF EXISTS trg_assign_courses_to_student_ad;
+
+DROP TRIGGER IF EXISTS trg_calendar_tokens_ai;
+DROP TRIGGER IF EXISTS trg_calendar_tokens_au;
+DROP TRIGGER IF EXISTS trg_calendar_tokens_ad;
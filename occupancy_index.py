@@ -0,0 +1,156 @@
+"""In-memory occupancy index for the schedule table.
+
+The index mirrors the columns of `schedule` that the conflict checks in
+app.py look at (room, faculty and program/course per day and slot), so
+add_class, has_conflict and edit_schedule can answer "is this taken?"
+with a couple of dict lookups instead of a round-trip to MySQL.
+
+It is rebuilt from MySQL on startup (see get_schedule_index in app.py)
+and kept up to date by the routes that insert, update or delete
+schedule rows.
+"""
+import threading
+
+# Key used for "any semester" lookups. add_class checks rooms and faculty
+# across all semesters, so every row is also recorded under this key.
+ANY = '*'
+
+
+def _int(value):
+    # Form values arrive as strings, DB rows as ints; store everything as int
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+class OccupancyIndex:
+    """Room, faculty and program occupancy keyed by (semester, day, slot)."""
+
+    def __init__(self):
+        # Held by the write routes around check + insert so two requests in
+        # the same process cannot book the same room/faculty at once.
+        self.lock = threading.RLock()
+        self.loaded = False
+        # schedule data version the index was built at (see data_versions.py)
+        self.version = None
+        self._reset()
+
+    def _reset(self):
+        # ScheduleID -> dict with the indexed columns
+        self._rows = {}
+        # (semester, day, slot) -> {RoomID: {ScheduleID, ...}}
+        self._rooms = {}
+        # (semester, day, slot) -> {FacultyID: {ScheduleID, ...}}
+        self._faculty = {}
+        # (semester, day, slot) -> {ProgramID: {ScheduleID, ...}}
+        self._programs = {}
+        # (semester, program, day) -> {CourseID: {ScheduleID, ...}}
+        self._courses = {}
+
+    def __len__(self):
+        return len(self._rows)
+
+    # -------------------- Maintenance --------------------
+
+    def load(self, rows, version=None):
+        """Rebuild the whole index from an iterable of schedule rows."""
+        with self.lock:
+            self._reset()
+            for row in rows:
+                self._add(row['ScheduleID'], row)
+            self.loaded = True
+            self.version = version
+
+    def invalidate(self):
+        """Force a rebuild from MySQL on next use (after bulk writes)."""
+        self.loaded = False
+        self.version = None
+
+    def add(self, schedule_id, row):
+        with self.lock:
+            self._add(schedule_id, row)
+
+    def update(self, schedule_id, row):
+        with self.lock:
+            self._remove(schedule_id)
+            self._add(schedule_id, row)
+
+    def remove(self, schedule_id):
+        with self.lock:
+            self._remove(schedule_id)
+
+    def _add(self, schedule_id, row):
+        schedule_id = _int(schedule_id)
+        entry = {
+            'CourseID': _int(row['CourseID']),
+            'FacultyID': _int(row['FacultyID']),
+            'RoomID': _int(row['RoomID']),
+            'SlotID': _int(row['SlotID']),
+            'DayOfWeek': row['DayOfWeek'],
+            'SemesterID': _int(row['SemesterID']),
+            'ProgramID': _int(row['ProgramID']),
+        }
+        self._rows[schedule_id] = entry
+        for key, bucket, value in self._keys(entry):
+            bucket.setdefault(key, {}).setdefault(value, set()).add(schedule_id)
+
+    def _remove(self, schedule_id):
+        schedule_id = _int(schedule_id)
+        entry = self._rows.pop(schedule_id, None)
+        if entry is None:
+            return
+        for key, bucket, value in self._keys(entry):
+            ids = bucket[key][value]
+            ids.discard(schedule_id)
+            if not ids:
+                del bucket[key][value]
+                if not bucket[key]:
+                    del bucket[key]
+
+    def _keys(self, entry):
+        day, slot = entry['DayOfWeek'], entry['SlotID']
+        for semester in (entry['SemesterID'], ANY):
+            yield (semester, day, slot), self._rooms, entry['RoomID']
+            yield (semester, day, slot), self._faculty, entry['FacultyID']
+            yield (semester, day, slot), self._programs, entry['ProgramID']
+            yield (semester, entry['ProgramID'], day), self._courses, entry['CourseID']
+
+    # -------------------- Conflict checks --------------------
+
+    def _find(self, bucket, key, value, ignore=None, **match):
+        ids = bucket.get(key, {}).get(_int(value))
+        if not ids:
+            return None
+        ignore = _int(ignore)
+        for schedule_id in ids:
+            if schedule_id == ignore:
+                continue
+            entry = self._rows[schedule_id]
+            if all(entry[col] == _int(val) for col, val in match.items()):
+                return schedule_id
+        return None
+
+    def room_conflict(self, room_id, slot_id, day, semester_id=ANY, ignore=None):
+        """Return the ScheduleID already holding the room, or None."""
+        return self._find(self._rooms, (_int(semester_id), day, _int(slot_id)), room_id, ignore)
+
+    def faculty_conflict(self, faculty_id, slot_id, day, semester_id=ANY, program_id=None, ignore=None):
+        """Return the ScheduleID already holding the faculty member, or None.
+
+        When program_id is given only bookings in that program count, which
+        is what has_conflict has always checked.
+        """
+        match = {'ProgramID': program_id} if program_id is not None else {}
+        return self._find(self._faculty, (_int(semester_id), day, _int(slot_id)), faculty_id, ignore, **match)
+
+    def program_conflict(self, program_id, slot_id, day, semester_id=ANY, ignore=None):
+        """Return the ScheduleID of another class the program already has in that slot, or None."""
+        return self._find(self._programs, (_int(semester_id), day, _int(slot_id)), program_id, ignore)
+
+    def course_conflict(self, program_id, day, course_id, semester_id=ANY, ignore=None):
+        """Return the ScheduleID of the same course for the program on that day, or None."""
+        return self._find(self._courses, (_int(semester_id), _int(program_id), day), course_id, ignore)
+
+    def get(self, schedule_id):
+        return self._rows.get(_int(schedule_id))
@@ -0,0 +1,205 @@
+"""Keyset pagination, sorting and filtering for the admin list pages.
+
+The list pages used to fetchall() the whole joined table, which for
+attendance means hundreds of thousands of rows per page view. A ListQuery
+describes one list: the SELECT and its joins, the unique key used as a
+tie-breaker, the columns it may be sorted by and the filters it accepts.
+paginate() turns the request arguments into one bounded query:
+
+    ... WHERE <filters> AND <seek> ORDER BY <sort>, <key> LIMIT per_page + 1
+
+The seek condition continues after (or before) the sort value and key of
+the last row shown, carried in the opaque after/before cursor, so page
+1000 costs the same as page 1 as long as the sort column is indexed
+(migration 0006). There are no page numbers; the total is an estimate
+from information_schema for large unfiltered tables and an exact count
+capped at COUNT_LIMIT otherwise.
+
+Request arguments: sort, dir (asc/desc), per_page, q (prefix search),
+after/before (cursors) and the filters the ListQuery declares.
+"""
+import base64
+import json
+
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 200
+COUNT_LIMIT = 10000
+
+
+class ListQuery:
+    """A paginated list.
+
+    select, joins  the SELECT column list and FROM clause
+    key            unique column expression used as the tie-breaker, e.g. 's.StudentID'
+    sorts          {sort name: (expression, name of that column in the result row)}
+    default_sort   a key of sorts; default_dir 'asc' or 'desc'
+    filters        {argument: (condition with one %s, type)}
+    search         expressions matched by the q argument with LIKE 'q%'
+    table          base table whose row estimate stands in for an unfiltered count
+    where          condition always applied
+    """
+
+    def __init__(self, select, joins, key, sorts, default_sort, default_dir='asc', filters=None, search=(),
+                 table=None, where=None):
+        self.select = select
+        self.joins = joins
+        self.key = key
+        self.key_column = key.split('.')[-1]
+        self.sorts = sorts
+        self.default_sort = default_sort
+        self.default_dir = default_dir
+        self.filters = filters or {}
+        self.search = search
+        self.table = table
+        self.where = where
+
+    def conditions(self, args):
+        """(conditions, params, values of the filters that were given) for the request arguments."""
+        where, params, used = [], [], {}
+        if self.where:
+            where.append(self.where)
+        for name, (condition, kind) in self.filters.items():
+            raw = args.get(name)
+            if raw in (None, ''):
+                continue
+            try:
+                value = kind(raw)
+            except (TypeError, ValueError):
+                continue
+            where.append(condition)
+            params.append(value)
+            used[name] = raw
+        q = (args.get('q') or '').strip()
+        if q and self.search:
+            pattern = q.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            where.append('(' + ' OR '.join(f"{expr} LIKE %s" for expr in self.search) + ')')
+            params.extend([pattern] * len(self.search))
+            used['q'] = q
+        return where, params, used
+
+
+class Page:
+    """One page of rows plus what the templates need to link to the neighbouring pages."""
+
+    def __init__(self, rows, sort, direction, per_page, args, next_cursor, prev_cursor, total, total_kind):
+        self.rows = rows
+        self.sort = sort
+        self.direction = direction
+        self.per_page = per_page
+        self.args = args
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+        self.total_kind = total_kind
+
+    def link(self, **changes):
+        """Query arguments for a link from this page; sort/filter changes restart at the first page."""
+        args = dict(self.args, sort=self.sort, dir=self.direction)
+        if self.per_page != DEFAULT_PER_PAGE:
+            args['per_page'] = self.per_page
+        args.update(changes)
+        return {name: value for name, value in args.items() if value not in (None, '')}
+
+    def sort_link(self, sort):
+        direction = 'desc' if sort == self.sort and self.direction == 'asc' else 'asc'
+        return self.link(sort=sort, dir=direction)
+
+    @property
+    def total_label(self):
+        if self.total_kind == 'estimate':
+            return f"about {self.total:,}"
+        if self.total_kind == 'at_least':
+            return f"{self.total:,}+"
+        return f"{self.total:,}"
+
+
+def encode_cursor(value, key):
+    data = json.dumps([value, key], default=str, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        value, key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        return None
+    if not all(v is None or isinstance(v, (str, int, float)) for v in (value, key)):
+        return None
+    return value, key
+
+
+def seek_condition(expr, key, cursor, forward):
+    """Rows after cursor in ORDER BY expr, key ASC (forward) or before it (not forward, i.e. DESC order).
+
+    MySQL sorts NULLs first ascending and last descending, which the NULL
+    branches follow.
+    """
+    value, key_value = cursor
+    op = '>' if forward else '<'
+    if expr == key:
+        return f"{key} {op} %s", [key_value]
+    if value is None:
+        if forward:
+            return f"({expr} IS NOT NULL OR ({expr} IS NULL AND {key} > %s))", [key_value]
+        return f"({expr} IS NULL AND {key} < %s)", [key_value]
+    condition = f"({expr} {op} %s OR ({expr} = %s AND {key} {op} %s)"
+    condition += ')' if forward else f" OR {expr} IS NULL)"
+    return condition, [value, value, key_value]
+
+
+def approximate_count(cur, query, where, params, filtered):
+    """(total, kind) for the list, kind being 'exact', 'estimate' or 'at_least'; cheap whatever the table size."""
+    if not filtered and query.table and not query.where:
+        cur.execute("SELECT TABLE_ROWS AS n FROM information_schema.TABLES "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (query.table,))
+        row = cur.fetchone()
+        estimate = int(row['n'] or 0) if row else 0
+        if estimate > COUNT_LIMIT:
+            return estimate, 'estimate'
+    cur.execute(f"SELECT COUNT(*) AS n FROM (SELECT 1 FROM {query.joins} WHERE {' AND '.join(where) or '1 = 1'} "
+                f"LIMIT {COUNT_LIMIT + 1}) t", params)
+    n = cur.fetchone()['n']
+    return min(n, COUNT_LIMIT), 'exact' if n <= COUNT_LIMIT else 'at_least'
+
+
+def paginate(cur, query, args, per_page=DEFAULT_PER_PAGE):
+    """Run one page of query for the request arguments (a DictCursor); return a Page."""
+    sort = args.get('sort') if args.get('sort') in query.sorts else query.default_sort
+    direction = args.get('dir') if args.get('dir') in ('asc', 'desc') else query.default_dir
+    try:
+        per_page = max(1, min(int(args.get('per_page') or per_page), MAX_PER_PAGE))
+    except ValueError:
+        pass
+    expr, column = query.sorts[sort]
+
+    where, params, used = query.conditions(args)
+    total, total_kind = approximate_count(cur, query, where, params, bool(used))
+
+    after, before = decode_cursor(args.get('after')), decode_cursor(args.get('before'))
+    backwards = after is None and before is not None
+    cursor = after or before
+    ascending = (direction == 'asc') != backwards
+    seek_where, seek_params = list(where), list(params)
+    if cursor is not None:
+        condition, values = seek_condition(expr, query.key, cursor, ascending)
+        seek_where.append(condition)
+        seek_params.extend(values)
+    order = 'ASC' if ascending else 'DESC'
+    cur.execute(f"SELECT {query.select} FROM {query.joins} WHERE {' AND '.join(seek_where) or '1 = 1'} "
+                f"ORDER BY {expr} {order}, {query.key} {order} LIMIT {per_page + 1}", seek_params)
+    rows = list(cur.fetchall())
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    next_cursor = prev_cursor = None
+    if rows:
+        first, last = rows[0], rows[-1]
+        if more or backwards:
+            next_cursor = encode_cursor(last[column], last[query.key_column])
+        if (cursor is not None and not backwards) or (backwards and more):
+            prev_cursor = encode_cursor(first[column], first[query.key_column])
+    return Page(rows, sort, direction, per_page, used, next_cursor, prev_cursor, total, total_kind)
@@ -0,0 +1,99 @@
+"""Versioned in-memory cache for small reference tables.
+
+Rooms, faculty, courses, time slots, semesters, sessions, departments and
+programs change rarely but are read on almost every form and timetable
+page just to fill dropdowns and grid headers. ReferenceCache keeps the
+result of each reference query in memory and tags it with a version
+counter for every table it reads. The CRUD routes call invalidate() for
+the tables they write, which bumps those counters; any cached query that
+read one of them is then reloaded on next use.
+"""
+import threading
+from collections import OrderedDict
+
+
+class ReferenceCache:
+    """LRU-bounded query cache with per-table version counters."""
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._versions = {}
+        self._observed = {}
+        self._entries = OrderedDict()  # (tables, query) -> (versions, rows)
+        self._lock = threading.Lock()
+
+    def version(self, table):
+        return self._versions.get(table, 0)
+
+    def invalidate(self, *tables):
+        """Bump the version of every table written by the caller."""
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def observe(self, versions):
+        """Invalidate every table whose external version is newer than any seen before.
+
+        versions maps table -> a version kept outside this process (the
+        data_versions table), so writes by other workers and scripts are
+        noticed too. Versions read from a lagging replica can be older than
+        ones already seen from the primary; those invalidate nothing.
+        Returns False when any of them is older, meaning rows read from the
+        same connection may predate what is cached and should not be stored.
+        """
+        current = True
+        with self._lock:
+            for table, version in versions.items():
+                seen = self._observed.get(table)
+                if seen is None or version > seen:
+                    self._observed[table] = version
+                    self._versions[table] = self._versions.get(table, 0) + 1
+                elif version < seen:
+                    current = False
+        return current
+
+    def get(self, tables, query, loader, store=True):
+        """Return rows for query, calling loader(query) on a miss.
+
+        tables is the table name (or tuple of names) the query reads.
+        With store=False (the loader reads older data, see observe()) a
+        miss is loaded but not cached.
+        Callers get their own copies of the rows, so routes that reformat
+        values in place (add_class turns time slots into strings) cannot
+        change what is cached.
+        """
+        if isinstance(tables, str):
+            tables = (tables,)
+        key = (tables, query)
+        with self._lock:
+            versions = tuple(self._versions.get(t, 0) for t in tables)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == versions:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return [dict(row) for row in entry[1]]
+            self.misses += 1
+
+        rows = [dict(row) for row in loader(query)]
+
+        with self._lock:
+            # Only store the result if nothing was invalidated while loading
+            if store and versions == tuple(self._versions.get(t, 0) for t in tables):
+                self._entries[key] = (versions, rows)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return [dict(row) for row in rows]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 4) if total else None,
+            'versions': dict(self._versions),
+        }
@@ -0,0 +1,118 @@
+"""Room utilization analytics over a dense occupancy tensor.
+
+OccupancyTensor holds the whole schedule as a NumPy array of class counts
+indexed [semester, room, day, slot]: one cell per room, weekday
+(Monday-Saturday) and time slot of every semester. It is built from one
+narrow schedule query and rebuilt only when the schedule, rooms, time
+slots or semesters change (data_versions), so analyze() is a handful of
+vectorized reductions over a few hundred thousand cells:
+
+- utilization: the share of room-slots with a class, overall, per room,
+  per day and per slot;
+- heatmap: for every day and slot, the share of rooms in use;
+- peak saturation: the busiest cells and how many are at or above
+  SATURATION of the rooms;
+- idle rooms: rooms with no class all week, and rooms below UNDERUSED;
+- double bookings: cells holding more than one class.
+
+The room timetable pages answer "what is in this room now"; this module
+answers "how full is the campus", for the heatmap page and its JSON.
+"""
+import threading
+
+import numpy as np
+
+DAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday')
+SATURATION = 0.9    # share of rooms in use at which a day/slot counts as saturated
+UNDERUSED = 0.1     # rooms used below this share of the week are listed as underused
+PEAK_CELLS = 5
+
+SCHEDULE_QUERY = "SELECT SemesterID, RoomID, DayNo, SlotID FROM schedule WHERE DayNo BETWEEN 1 AND %s"
+
+
+class OccupancyTensor:
+    """Class counts per [semester, room, day, slot], with the ids of each axis."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.load([], [], [], [])
+
+    def load(self, rows, rooms, slots, semesters, version=None):
+        """Rebuild from schedule rows (SemesterID, RoomID, DayNo, SlotID) and the ordered axis rows.
+
+        rooms need RoomID and RoomNumber, slots SlotID, StartTime and EndTime
+        (in display order), semesters SemesterID and SemesterName. Rows whose
+        room, slot or semester is not on an axis are ignored.
+        """
+        self.rooms = [(room['RoomID'], room['RoomNumber']) for room in rooms]
+        self.slots = [(slot['SlotID'], slot['StartTime'], slot['EndTime']) for slot in slots]
+        self.semesters = [(semester['SemesterID'], semester['SemesterName']) for semester in semesters]
+        room_index = {room_id: i for i, (room_id, _) in enumerate(self.rooms)}
+        slot_index = {slot_id: i for i, (slot_id, _, _) in enumerate(self.slots)}
+        semester_index = {semester_id: i for i, (semester_id, _) in enumerate(self.semesters)}
+
+        cells = [(semester_index.get(row['SemesterID']), room_index.get(row['RoomID']), row['DayNo'] - 1,
+                  slot_index.get(row['SlotID'])) for row in rows]
+        cells = np.array([cell for cell in cells if None not in cell], dtype=np.intp).reshape(-1, 4)
+        self.counts = np.zeros((len(self.semesters), len(self.rooms), len(DAYS), len(self.slots)), dtype=np.uint16)
+        # add.at counts repeated cells (double bookings), which fancy-index assignment would collapse
+        np.add.at(self.counts, tuple(cells.T), 1)
+        self.version = version
+        self.loaded = True
+
+    def semester_counts(self, semester_id=None):
+        """Counts [room, day, slot] of one semester, or summed over all of them."""
+        if semester_id is None:
+            return self.counts.sum(axis=0, dtype=np.uint32)
+        for i, (candidate, _) in enumerate(self.semesters):
+            if candidate == semester_id:
+                return self.counts[i]
+        return np.zeros(self.counts.shape[1:], dtype=np.uint16)
+
+
+def _percent(values):
+    return np.round(values * 100, 1).tolist()
+
+
+def analyze(tensor, semester_id=None):
+    """Utilization, heatmap, peaks, idle rooms and double bookings as a JSON-ready dict."""
+    counts = tensor.semester_counts(semester_id)
+    occupied = counts > 0
+    rooms, days, slots = occupied.shape
+    if not occupied.size:
+        return {'semester_id': semester_id, 'rooms': rooms, 'days': list(DAYS), 'slots': [], 'utilization': 0.0,
+                'by_room': [], 'by_day': [], 'by_slot': [], 'heatmap': [], 'peaks': [], 'saturated_cells': 0,
+                'idle_rooms': [], 'underused_rooms': [], 'double_bookings': 0}
+
+    by_room = occupied.mean(axis=(1, 2))
+    heat = occupied.mean(axis=0)  # [day, slot]: share of rooms in use
+
+    flat = heat.ravel()
+    top = np.argsort(-flat, kind='stable')[:PEAK_CELLS]
+    peaks = [{'day': DAYS[i // slots], 'slot_id': tensor.slots[i % slots][0],
+              'percent': round(float(flat[i]) * 100, 1), 'rooms_in_use': int(occupied[:, i // slots, i % slots].sum())}
+             for i in top if flat[i] > 0]
+
+    order = np.argsort(by_room, kind='stable')
+    idle = np.flatnonzero(by_room == 0)
+    underused = [i for i in order if 0 < by_room[i] < UNDERUSED]
+    return {
+        'semester_id': semester_id,
+        'rooms': rooms,
+        'days': list(DAYS),
+        'slots': [{'SlotID': slot_id, 'StartTime': str(start), 'EndTime': str(end)}
+                  for slot_id, start, end in tensor.slots],
+        'utilization': round(float(occupied.mean()) * 100, 1),
+        'by_room': [{'RoomID': tensor.rooms[i][0], 'RoomNumber': tensor.rooms[i][1],
+                     'percent': round(float(by_room[i]) * 100, 1)} for i in np.argsort(-by_room, kind='stable')],
+        'by_day': _percent(occupied.mean(axis=(0, 2))),
+        'by_slot': _percent(occupied.mean(axis=(0, 1))),
+        'heatmap': _percent(heat),
+        'peaks': peaks,
+        'saturated_cells': int((heat >= SATURATION).sum()),
+        'idle_rooms': [{'RoomID': tensor.rooms[i][0], 'RoomNumber': tensor.rooms[i][1]} for i in idle],
+        'underused_rooms': [{'RoomID': tensor.rooms[i][0], 'RoomNumber': tensor.rooms[i][1],
+                             'percent': round(float(by_room[i]) * 100, 1)} for i in underused],
+        'double_bookings': int((counts > 1).sum()),
+    }
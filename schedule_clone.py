@@ -0,0 +1,270 @@
+"""Copy a semester's (or a whole session's) timetable into another semester, program or session.
+
+The rows to copy are selected and remapped in MySQL, not fetched and
+re-inserted one by one:
+
+1. the program, room and faculty mappings go into temporary tables
+   (clone_program_map, clone_room_map, clone_faculty_map);
+2. one INSERT ... SELECT fills clone_rows with the source rows as they
+   will look in the target: target program (and semester), rooms and
+   faculty remapped where a mapping is given, everything else unchanged;
+3. one joined query finds every clone row that collides with the target
+   schedule (room, faculty, program slot or the same course twice a day),
+   and GROUP BY queries find clone rows colliding with each other (two
+   rooms mapped onto one, for instance);
+4. if nothing collides and this is not a dry run, one
+   INSERT INTO schedule ... SELECT FROM clone_rows copies them, in the
+   same transaction.
+
+Sources: a program, optionally limited to one semester, or every program
+of a session. Targets: another program and/or semester for a program
+source; another session for a session source, where each program is
+matched to the offered program of the same name and department (programs
+without one are skipped and reported).
+
+Usage (from the project root):
+
+    python schedule_clone.py --program 3 --semester 1 --to-semester 2 --dry-run
+    python schedule_clone.py --session 4 --to-session 5 --room 12=14 --faculty 7=9
+"""
+import argparse
+
+import MySQLdb.cursors
+
+PREVIEW_LIMIT = 500
+
+TEMP_TABLES = ('clone_rows', 'clone_program_map', 'clone_room_map', 'clone_faculty_map')
+
+CLONE_COLUMNS = ('CourseID', 'FacultyID', 'RoomID', 'SlotID', 'DayOfWeek', 'SemesterID', 'ProgramID')
+
+FILL_ROWS = """
+    INSERT INTO clone_rows (SourceID, CourseID, FacultyID, RoomID, SlotID, DayOfWeek, DayNo, SemesterID, ProgramID)
+    SELECT s.ScheduleID, s.CourseID, COALESCE(fm.ToID, s.FacultyID), COALESCE(rm.ToID, s.RoomID), s.SlotID,
+           s.DayOfWeek, s.DayNo, {semester}, pm.ToID
+    FROM schedule s
+    JOIN clone_program_map pm ON pm.FromID = s.ProgramID
+    LEFT JOIN clone_room_map rm ON rm.FromID = s.RoomID
+    LEFT JOIN clone_faculty_map fm ON fm.FromID = s.FacultyID
+    WHERE {where}
+    ORDER BY s.ScheduleID
+"""
+
+# Every existing target row a clone row collides with, labelled with the first rule it breaks
+CONFLICT_QUERY = """
+    SELECT c.CloneID, c.SourceID, s.ScheduleID,
+           CASE WHEN s.SlotID = c.SlotID AND s.RoomID = c.RoomID THEN 'room'
+                WHEN s.SlotID = c.SlotID AND s.FacultyID = c.FacultyID THEN 'faculty'
+                WHEN s.SlotID = c.SlotID THEN 'program'
+                ELSE 'course' END AS Rule
+    FROM clone_rows c
+    JOIN schedule s ON s.DayNo = c.DayNo AND (
+         (s.SlotID = c.SlotID AND (s.RoomID = c.RoomID OR s.FacultyID = c.FacultyID
+                                   OR (s.ProgramID = c.ProgramID AND s.SemesterID = c.SemesterID)))
+         OR (s.ProgramID = c.ProgramID AND s.SemesterID = c.SemesterID AND s.CourseID = c.CourseID))
+    ORDER BY c.CloneID, s.ScheduleID
+"""
+
+# Clone rows that collide with each other: rule -> key columns
+INTERNAL_RULES = {
+    'room': ('DayNo', 'SlotID', 'RoomID'),
+    'faculty': ('DayNo', 'SlotID', 'FacultyID'),
+    'program': ('DayNo', 'SlotID', 'ProgramID', 'SemesterID'),
+}
+
+PREVIEW_QUERY = f"""
+    SELECT c.CloneID, c.SourceID, c.DayOfWeek, c.SlotID, c.SemesterID, c.ProgramID, c.CourseID, c.FacultyID, c.RoomID,
+           crs.CourseName, CONCAT_WS(' ', f.FirstName, f.LastName) AS FacultyName, r.RoomNumber, op.ProgramName,
+           sem.SemesterName
+    FROM clone_rows c
+    LEFT JOIN courses crs ON c.CourseID = crs.CourseID
+    LEFT JOIN faculty f ON c.FacultyID = f.FacultyID
+    LEFT JOIN rooms r ON c.RoomID = r.RoomID
+    LEFT JOIN offered_programs op ON c.ProgramID = op.ProgramID
+    LEFT JOIN semesters sem ON c.SemesterID = sem.SemesterID
+    ORDER BY c.CloneID
+    LIMIT {PREVIEW_LIMIT}
+"""
+
+REASONS = {
+    'room': "Room is already booked in the target at this day and slot.",
+    'faculty': "Faculty member already teaches in the target at this day and slot.",
+    'program': "Target program already has a class in this semester at this day and slot.",
+    'course': "Course is already scheduled for the target program and semester on this day.",
+}
+
+
+class CloneError(Exception):
+    """The clone request is incomplete or contradictory."""
+
+
+def parse_map(text):
+    """{from id: to id} from 'from=to' pairs separated by newlines or commas."""
+    mapping = {}
+    for part in (text or '').replace(',', '\n').splitlines():
+        part = part.strip()
+        if not part:
+            continue
+        source, sep, target = part.partition('=')
+        try:
+            mapping[int(source)] = int(target)
+        except ValueError:
+            raise CloneError(f"Mapping '{part}' is not of the form from_id=to_id.")
+        if not sep:
+            raise CloneError(f"Mapping '{part}' is not of the form from_id=to_id.")
+    return mapping
+
+
+def _create_temp_tables(cur):
+    _drop_temp_tables(cur)
+    for name in ('clone_program_map', 'clone_room_map', 'clone_faculty_map'):
+        cur.execute(f"CREATE TEMPORARY TABLE {name} (FromID INT PRIMARY KEY, ToID INT NOT NULL)")
+    cur.execute("""
+        CREATE TEMPORARY TABLE clone_rows (
+            CloneID INT AUTO_INCREMENT PRIMARY KEY,
+            SourceID INT NOT NULL,
+            CourseID INT, FacultyID INT, RoomID INT, SlotID INT,
+            DayOfWeek VARCHAR(10), DayNo TINYINT UNSIGNED, SemesterID INT, ProgramID INT,
+            KEY ix_clone_day (DayNo, SlotID)
+        )
+    """)
+
+
+def _drop_temp_tables(cur):
+    cur.execute(f"DROP TEMPORARY TABLE IF EXISTS {', '.join(TEMP_TABLES)}")
+
+
+def _fill_map(cur, table, mapping):
+    if mapping:
+        cur.executemany(f"INSERT INTO {table} (FromID, ToID) VALUES (%s, %s)", sorted(mapping.items()))
+
+
+def clone(connection, program_id=None, semester_id=None, session_id=None, to_program_id=None, to_semester_id=None,
+          to_session_id=None, room_map=None, faculty_map=None, dry_run=False):
+    """Clone the source timetable into the target; return a summary dict.
+
+    Nothing is written when dry_run is set or any conflict is found. The
+    summary has rows (clone rows built), inserted, skipped (rows of
+    session programs with no counterpart in the target session),
+    conflicts [{'source_id', 'type', 'reason', 'schedule_id' or
+    'other_source_ids'}], preview (up to PREVIEW_LIMIT clone rows with
+    names) and cloned (the inserted rows, for student_reports).
+    """
+    if session_id:
+        if program_id or semester_id or to_program_id or to_semester_id:
+            raise CloneError("Clone either a program (and semester) or a whole session, not both.")
+        if not to_session_id or int(to_session_id) == int(session_id):
+            raise CloneError("Choose a different target session.")
+    else:
+        if not program_id:
+            raise CloneError("Choose a source program or session.")
+        if to_session_id:
+            raise CloneError("A target session needs a source session.")
+        if not to_program_id and not to_semester_id:
+            raise CloneError("Choose a target program or semester.")
+
+    cur = connection.cursor(MySQLdb.cursors.DictCursor)
+    try:
+        _create_temp_tables(cur)
+        skipped = 0
+        if session_id:
+            cur.execute("""
+                INSERT INTO clone_program_map (FromID, ToID)
+                SELECT src.ProgramID, MIN(dst.ProgramID)
+                FROM offered_programs src
+                JOIN offered_programs dst ON dst.SessionID = %s AND dst.ProgramName = src.ProgramName
+                                         AND dst.DepartmentID <=> src.DepartmentID
+                WHERE src.SessionID = %s
+                GROUP BY src.ProgramID
+            """, (to_session_id, session_id))
+            cur.execute("""
+                SELECT COUNT(*) AS n FROM schedule s
+                JOIN offered_programs op ON s.ProgramID = op.ProgramID
+                WHERE op.SessionID = %s AND s.ProgramID NOT IN (SELECT FromID FROM clone_program_map)
+            """, (session_id,))
+            skipped = int(cur.fetchone()['n'])
+            where, params = "1 = 1", []
+        else:
+            _fill_map(cur, 'clone_program_map', {int(program_id): int(to_program_id or program_id)})
+            where, params = "s.ProgramID = %s", [program_id]
+            if semester_id:
+                where += " AND s.SemesterID = %s"
+                params.append(semester_id)
+        _fill_map(cur, 'clone_room_map', room_map)
+        _fill_map(cur, 'clone_faculty_map', faculty_map)
+
+        semester = "%s" if to_semester_id else "s.SemesterID"
+        cur.execute(FILL_ROWS.format(semester=semester, where=where),
+                    ([to_semester_id] if to_semester_id else []) + params)
+        rows = cur.rowcount
+
+        conflicts = []
+        cur.execute(CONFLICT_QUERY)
+        for row in cur.fetchall():
+            conflicts.append({'source_id': row['SourceID'], 'type': row['Rule'], 'reason': REASONS[row['Rule']],
+                              'schedule_id': row['ScheduleID']})
+        for rule, columns in INTERNAL_RULES.items():
+            cur.execute(f"SELECT GROUP_CONCAT(SourceID ORDER BY SourceID) AS Sources FROM clone_rows "
+                        f"GROUP BY {', '.join(columns)} HAVING COUNT(*) > 1")
+            for row in cur.fetchall():
+                sources = [int(value) for value in row['Sources'].split(',')]
+                conflicts.append({'source_id': sources[0], 'type': rule,
+                                  'reason': f"Cloned rows {', '.join(map(str, sources))} would collide ({rule}).",
+                                  'other_source_ids': sources[1:]})
+
+        cur.execute(PREVIEW_QUERY)
+        preview = cur.fetchall()
+
+        inserted = 0
+        cloned = []
+        if not dry_run and not conflicts and rows:
+            cur.execute(f"INSERT INTO schedule ({', '.join(CLONE_COLUMNS)}) "
+                        f"SELECT {', '.join(CLONE_COLUMNS)} FROM clone_rows ORDER BY CloneID")
+            inserted = cur.rowcount
+            cur.execute("SELECT DISTINCT ProgramID, SemesterID, CourseID FROM clone_rows")
+            cloned = cur.fetchall()
+            connection.commit()
+        else:
+            connection.rollback()
+        return {'rows': rows, 'inserted': inserted, 'skipped': skipped, 'dry_run': dry_run,
+                'conflicts': conflicts, 'preview': preview, 'cloned': cloned}
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        _drop_temp_tables(cur)
+        cur.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--program', type=int, help='source ProgramID')
+    parser.add_argument('--semester', type=int, help='source SemesterID (with --program)')
+    parser.add_argument('--session', type=int, help='source SessionID (all its programs)')
+    parser.add_argument('--to-program', type=int, help='target ProgramID')
+    parser.add_argument('--to-semester', type=int, help='target SemesterID')
+    parser.add_argument('--to-session', type=int, help='target SessionID (with --session)')
+    parser.add_argument('--room', action='append', default=[], help='room remapping from_id=to_id (repeatable)')
+    parser.add_argument('--faculty', action='append', default=[], help='faculty remapping from_id=to_id (repeatable)')
+    parser.add_argument('--dry-run', action='store_true', help='report what would be created without saving')
+    args = parser.parse_args()
+
+    import student_reports
+    from app import app, mysql
+
+    with app.app_context():
+        try:
+            result = clone(mysql.connection, args.program, args.semester, args.session, args.to_program,
+                           args.to_semester, args.to_session, parse_map('\n'.join(args.room)),
+                           parse_map('\n'.join(args.faculty)), dry_run=args.dry_run)
+        except CloneError as e:
+            parser.error(str(e))
+        for conflict in result['conflicts']:
+            print(f"schedule row {conflict['source_id']}: {conflict['reason']}")
+        if result['cloned']:
+            student_reports.refresh_for_schedule(mysql.connection, *result['cloned'])
+        print(f"{result['rows']} row(s) to clone, {result['inserted']} inserted, {result['skipped']} skipped, "
+              f"{len(result['conflicts'])} conflict(s){' (dry run)' if result['dry_run'] else ''}.")
+
+
+if __name__ == '__main__':
+    main()
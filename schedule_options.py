@@ -0,0 +1,117 @@
+"""The session -> department -> program -> course tree behind the schedule forms.
+
+The add class and edit schedule forms used to call /api/departments,
+/api/programs and /api/courses one after another, a request and a query
+each time a dropdown changed. /api/schedule_options sends the whole tree
+in one response and the forms cascade in the browser
+(static/js/schedule_options.js):
+
+    {"sessions": [[SessionID, "2024 - 2028",
+                   [[DepartmentID, DepartmentName, [[ProgramID, ProgramName], ...]], ...]], ...],
+     "courses": {"<DepartmentID>": [[CourseID, CourseName], ...]}}
+
+A department is listed under a session when one of its offered programs
+runs in that session, and courses are listed per department, as the old
+endpoints did.
+
+The tree is built once per version of the tables it reads (TABLES, from
+data_versions) and kept by OptionsCache as compact JSON and gzip-compressed
+JSON. Its ETag comes from the same versions, so a form opened with the tree
+already in the browser cache costs one data_versions read and a 304.
+"""
+import gzip
+import hashlib
+import json
+import threading
+
+import MySQLdb.cursors
+
+TABLES = ('sessions', 'departments', 'offered_programs', 'courses')
+
+
+def options_etag(versions):
+    """ETag of the tree for {table: version}."""
+    return hashlib.sha1(repr([versions.get(table) for table in TABLES]).encode()).hexdigest()[:32]
+
+
+def build(connection):
+    """The tree as compact JSON bytes."""
+    cur = connection.cursor(MySQLdb.cursors.DictCursor)
+    cur.execute("SELECT SessionID, StartYear, EndYear FROM sessions ORDER BY StartYear, SessionID")
+    sessions = {row['SessionID']: [row['SessionID'], f"{row['StartYear']} - {row['EndYear']}", []]
+                for row in cur.fetchall()}
+
+    cur.execute("""
+        SELECT op.SessionID, d.DepartmentID, d.DepartmentName, op.ProgramID, op.ProgramName
+        FROM offered_programs op
+        JOIN departments d ON d.DepartmentID = op.DepartmentID
+        ORDER BY op.SessionID, d.DepartmentName, d.DepartmentID, op.ProgramName, op.ProgramID
+    """)
+    departments = {}  # (SessionID, DepartmentID) -> the department's entry in its session
+    for row in cur.fetchall():
+        session = sessions.get(row['SessionID'])
+        if session is None:
+            continue
+        key = (row['SessionID'], row['DepartmentID'])
+        if key not in departments:
+            departments[key] = [row['DepartmentID'], row['DepartmentName'], []]
+            session[2].append(departments[key])
+        departments[key][2].append([row['ProgramID'], row['ProgramName']])
+
+    cur.execute("SELECT CourseID, CourseName, DepartmentID FROM courses WHERE DepartmentID IS NOT NULL "
+                "ORDER BY CourseName, CourseID")
+    courses = {}
+    for row in cur.fetchall():
+        courses.setdefault(str(row['DepartmentID']), []).append([row['CourseID'], row['CourseName']])
+    cur.close()
+    tree = {'sessions': list(sessions.values()), 'courses': courses}
+    return json.dumps(tree, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+class OptionsCache:
+    """The last built tree, plain and gzip-compressed, kept while its ETag is current."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._entry = None  # (etag, json, gzipped json)
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def _current(self, etag):
+        entry = self._entry
+        if entry is not None and entry[0] == etag:
+            return entry[1], entry[2]
+        return None
+
+    def get(self, etag, build):
+        """(json, gzipped json) for etag, calling build() when the cached tree is missing or older."""
+        with self._lock:
+            bodies = self._current(etag)
+            if bodies is not None:
+                self.hits += 1
+                return bodies
+        with self._build_lock:
+            # Another request may have built it while this one waited
+            with self._lock:
+                bodies = self._current(etag)
+                if bodies is not None:
+                    self.hits += 1
+                    return bodies
+                self.misses += 1
+            body = build()
+            bodies = body, gzip.compress(body, compresslevel=9, mtime=0)
+            with self._lock:
+                self._entry = (etag, *bodies)
+            return bodies
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self):
+        with self._lock:
+            entry = self._entry
+            return {'hits': self.hits, 'misses': self.misses, 'not_modified': self.not_modified,
+                    'bytes': len(entry[1]) if entry else None, 'gzip_bytes': len(entry[2]) if entry else None}
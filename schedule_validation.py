@@ -0,0 +1,104 @@
+"""Validation of a draft set of schedule entries before anything is saved.
+
+A draft is a list of proposed schedule rows (CourseID, FacultyID, RoomID,
+SlotID, DayOfWeek, SemesterID, ProgramID). validate() checks every entry
+
+- for missing or malformed fields and ids that do not exist;
+- against the existing schedule, through the in-memory OccupancyIndex
+  (one dict lookup per rule instead of the conflict queries add_class
+  runs per POST);
+- against the other entries of the draft, by bucketing the entries on
+  the same keys.
+
+Each entry is looked at once per rule, so the cost grows linearly with
+the size of the draft. Every problem is reported, not just the first:
+
+    {'entry': 3, 'type': 'room', 'reason': '...', 'schedule_id': 812}
+    {'entry': 7, 'type': 'faculty', 'reason': '...', 'other_entry': 2}
+
+The rules are the ones the add routes and the generator keep: a room and
+a faculty member hold one class per day and slot whatever the semester;
+a program's semester has one class per slot and each course at most once
+a day.
+"""
+DAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday')
+FIELDS = ('CourseID', 'FacultyID', 'RoomID', 'SlotID', 'SemesterID', 'ProgramID')
+MAX_ENTRIES = 5000
+
+# Reason reported for each rule, formatted with the entry
+REASONS = {
+    'room': "Room is already booked on {DayOfWeek} in slot {SlotID}.",
+    'faculty': "Faculty member already teaches on {DayOfWeek} in slot {SlotID}.",
+    'program': "Program already has a class in this semester on {DayOfWeek} in slot {SlotID}.",
+    'course': "Course is already scheduled for this program and semester on {DayOfWeek}.",
+}
+
+
+def _keys(entry):
+    """(rule, key) pairs an entry occupies; two entries sharing one conflict."""
+    day, slot = entry['DayOfWeek'], entry['SlotID']
+    yield 'room', (day, slot, entry['RoomID'])
+    yield 'faculty', (day, slot, entry['FacultyID'])
+    yield 'program', (entry['SemesterID'], entry['ProgramID'], day, slot)
+    yield 'course', (entry['SemesterID'], entry['ProgramID'], day, entry['CourseID'])
+
+
+def _existing(index, entry):
+    """(rule, ScheduleID) for each existing schedule row the entry collides with."""
+    day, slot = entry['DayOfWeek'], entry['SlotID']
+    yield 'room', index.room_conflict(entry['RoomID'], slot, day)
+    yield 'faculty', index.faculty_conflict(entry['FacultyID'], slot, day)
+    yield 'program', index.program_conflict(entry['ProgramID'], slot, day, entry['SemesterID'])
+    yield 'course', index.course_conflict(entry['ProgramID'], day, entry['CourseID'], entry['SemesterID'])
+
+
+def normalize(raw):
+    """(entry with int ids, None) or (None, reason) for one submitted entry."""
+    if not isinstance(raw, dict):
+        return None, "Entry must be an object."
+    entry = {}
+    for field in FIELDS:
+        try:
+            entry[field] = int(raw.get(field))
+        except (TypeError, ValueError):
+            return None, f"{field} is missing or not a number."
+    day = str(raw.get('DayOfWeek') or '').strip().capitalize()
+    if day not in DAYS:
+        return None, f"DayOfWeek must be one of {', '.join(DAYS)}."
+    entry['DayOfWeek'] = day
+    return entry, None
+
+
+def validate(entries, index, known):
+    """Check a draft; return {'valid', 'entries', 'conflicts'}.
+
+    index is the OccupancyIndex of the current schedule (the caller holds
+    its lock), known maps each id field to the set of ids that exist.
+    """
+    conflicts = []
+    valid = []
+    for i, raw in enumerate(entries):
+        entry, error = normalize(raw)
+        if error is None:
+            missing = [field for field in FIELDS if entry[field] not in known.get(field, ())]
+            if missing:
+                error = f"Unknown {', '.join(missing)}."
+        if error is not None:
+            conflicts.append({'entry': i, 'type': 'invalid', 'reason': error})
+            continue
+        valid.append((i, entry))
+
+    seen = {}  # (rule, key) -> index of the first entry holding it
+    for i, entry in valid:
+        for rule, schedule_id in _existing(index, entry):
+            if schedule_id is not None:
+                conflicts.append({'entry': i, 'type': rule, 'reason': REASONS[rule].format(**entry),
+                                  'schedule_id': schedule_id})
+        for rule, key in _keys(entry):
+            other = seen.setdefault((rule, key), i)
+            if other != i:
+                conflicts.append({'entry': i, 'type': rule, 'reason': REASONS[rule].format(**entry),
+                                  'other_entry': other})
+
+    conflicts.sort(key=lambda conflict: conflict['entry'])
+    return {'valid': not conflicts, 'entries': len(entries), 'conflicts': conflicts}
@@ -0,0 +1,138 @@
+"""The schedule_view read model and its consistency check.
+
+schedule_view (migration 0009) is the schedule with the names the
+timetable pages show copied in: one row per ScheduleID carrying the
+course, faculty, room, time slot, program, department and semester
+columns. The room, faculty and student timetables, both timetable reports
+and the weekly timetable read it with single-table lookups on its
+indexes instead of joining up to eight tables per request.
+
+Triggers on schedule and on the tables the names come from keep it
+current for every writer. check() compares it with the join it stands
+for, a chunk of ScheduleIDs at a time, and reports rows that are missing,
+left over or different; with repair it rewrites them from the join.
+Triggers cannot be skipped by the app, so differences mean the table was
+written by hand, or the migration ran against a database whose triggers
+were dropped.
+
+Usage (from the project root, after `python migrate.py`):
+
+    python schedule_view.py --check
+    python schedule_view.py --check --repair
+"""
+import argparse
+import sys
+
+import MySQLdb.cursors
+
+CHUNK_SIZE = 5000   # ScheduleIDs per check step
+SAMPLE_SIZE = 20    # ScheduleIDs listed per kind of difference
+
+COLUMNS = ('ScheduleID', 'CourseID', 'FacultyID', 'RoomID', 'SlotID', 'DayOfWeek', 'SemesterID', 'ProgramID',
+           'SessionID', 'DepartmentID', 'CourseName', 'FirstName', 'LastName', 'RoomNumber', 'StartTime', 'EndTime',
+           'ProgramName', 'DepartmentName', 'SemesterName')
+
+# What schedule_view should hold, limited by {where} on s.ScheduleID
+SOURCE_QUERY = """
+    SELECT s.ScheduleID, s.CourseID, s.FacultyID, s.RoomID, s.SlotID, s.DayOfWeek, s.SemesterID, s.ProgramID,
+           op.SessionID, op.DepartmentID, c.CourseName, f.FirstName, f.LastName, r.RoomNumber, ts.StartTime,
+           ts.EndTime, op.ProgramName, d.DepartmentName, sem.SemesterName
+    FROM schedule s
+    LEFT JOIN courses c ON c.CourseID = s.CourseID
+    LEFT JOIN faculty f ON f.FacultyID = s.FacultyID
+    LEFT JOIN rooms r ON r.RoomID = s.RoomID
+    LEFT JOIN time_slots ts ON ts.SlotID = s.SlotID
+    LEFT JOIN offered_programs op ON op.ProgramID = s.ProgramID
+    LEFT JOIN departments d ON d.DepartmentID = op.DepartmentID
+    LEFT JOIN semesters sem ON sem.SemesterID = s.SemesterID
+    WHERE {where}
+"""
+
+STORED_QUERY = f"SELECT {', '.join(COLUMNS)} FROM schedule_view WHERE {{where}}"
+
+REPLACE = (f"REPLACE INTO schedule_view ({', '.join(COLUMNS)}) "
+           f"VALUES ({', '.join(['%s'] * len(COLUMNS))})")
+
+
+def _compare(cur, low, high):
+    """(missing, stale, changed) for ScheduleIDs low..high: id lists and {id: [columns]}, plus the source rows."""
+    cur.execute(SOURCE_QUERY.format(where="s.ScheduleID BETWEEN %s AND %s"), (low, high))
+    wanted = {row['ScheduleID']: row for row in cur.fetchall()}
+    cur.execute(STORED_QUERY.format(where="ScheduleID BETWEEN %s AND %s"), (low, high))
+    stored = {row['ScheduleID']: row for row in cur.fetchall()}
+
+    missing = sorted(set(wanted) - set(stored))
+    stale = sorted(set(stored) - set(wanted))
+    changed = {}
+    for schedule_id in sorted(set(wanted) & set(stored)):
+        columns = [c for c in COLUMNS if wanted[schedule_id][c] != stored[schedule_id][c]]
+        if columns:
+            changed[schedule_id] = columns
+    return missing, stale, changed, wanted
+
+
+def check(connection, repair=False, chunk_size=CHUNK_SIZE, log=None):
+    """Compare schedule_view with the source tables; return a report dict.
+
+    The report has checked (source rows), missing, stale and changed
+    counts, a sample of ScheduleIDs for each (changed with the differing
+    columns), and repaired, the rows rewritten or deleted when repair is
+    set. Each chunk is repaired in its own transaction.
+    """
+    cur = connection.cursor(MySQLdb.cursors.DictCursor)
+    cur.execute("SELECT GREATEST(COALESCE((SELECT MAX(ScheduleID) FROM schedule), 0), "
+                "COALESCE((SELECT MAX(ScheduleID) FROM schedule_view), 0)) AS max_id")
+    max_id = int(cur.fetchone()['max_id'])
+    report = {'checked': 0, 'missing': 0, 'stale': 0, 'changed': 0, 'repaired': 0,
+              'samples': {'missing': [], 'stale': [], 'changed': {}}}
+    for low in range(1, max_id + 1, chunk_size):
+        high = low + chunk_size - 1
+        missing, stale, changed, wanted = _compare(cur, low, high)
+        report['checked'] += len(wanted)
+        report['missing'] += len(missing)
+        report['stale'] += len(stale)
+        report['changed'] += len(changed)
+        samples = report['samples']
+        samples['missing'].extend(missing[:SAMPLE_SIZE - len(samples['missing'])])
+        samples['stale'].extend(stale[:SAMPLE_SIZE - len(samples['stale'])])
+        for schedule_id in list(changed)[:SAMPLE_SIZE - len(samples['changed'])]:
+            samples['changed'][schedule_id] = changed[schedule_id]
+
+        if repair and (missing or stale or changed):
+            rows = [tuple(wanted[schedule_id][c] for c in COLUMNS) for schedule_id in missing + list(changed)]
+            if rows:
+                cur.executemany(REPLACE, rows)
+            if stale:
+                cur.execute(f"DELETE FROM schedule_view WHERE ScheduleID IN ({', '.join(['%s'] * len(stale))})",
+                            stale)
+            connection.commit()
+            report['repaired'] += len(rows) + len(stale)
+        if log and (missing or stale or changed):
+            log(f"ScheduleIDs {low}-{high}: {len(missing)} missing, {len(stale)} stale, {len(changed)} changed")
+    cur.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--check', action='store_true', help='compare schedule_view with the source tables')
+    parser.add_argument('--repair', action='store_true', help='rewrite the rows that differ')
+    parser.add_argument('--chunk', type=int, default=CHUNK_SIZE, help='ScheduleIDs per step')
+    args = parser.parse_args()
+    if not args.check and not args.repair:
+        parser.error("give --check or --repair")
+
+    from app import app, mysql
+
+    with app.app_context():
+        report = check(mysql.connection, repair=args.repair, chunk_size=args.chunk, log=print)
+    print(f"{report['checked']} schedule row(s) checked: {report['missing']} missing, {report['stale']} stale, "
+          f"{report['changed']} changed, {report['repaired']} repaired.")
+    for schedule_id, columns in report['samples']['changed'].items():
+        print(f"  ScheduleID {schedule_id}: {', '.join(columns)}")
+    if not args.repair and (report['missing'] or report['stale'] or report['changed']):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+"""Per-request SQL instrumentation, aggregated per endpoint.
+
+InstrumentedConnection is the MySQLdb connection class the pool opens
+(db_pool.PooledMySQL(connection_class=...)). Every cursor it hands out
+times execute() and executemany() and notes the rows affected or
+returned, so the routes need no changes. During a request the
+statements are collected in a RequestStats on flask.g; at the end of the
+request SQLMetrics.finish() folds them into per-endpoint totals:
+
+- queries per request and time spent in MySQL per request, as
+  histograms (what /metrics exposes in the Prometheus text format);
+- per statement: executions, total and slowest time, rows;
+- slow statements (over slow_seconds) are logged and kept in a short
+  recent list;
+- likely N+1 patterns: the same SELECT run n_plus_one or more times in
+  one request, usually a query inside a loop over the rows of another.
+
+Statements are grouped by fingerprint: the SQL with whitespace collapsed,
+literals replaced by ? and placeholder lists folded, so a query built
+with a variable number of IN (%s, ...) markers counts as one statement.
+Server-side cursors (the exports) are timed up to the first row; the
+streaming that follows is not counted.
+
+Queries outside a request (CLI scripts, the startup warm-up) are not
+recorded.
+"""
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import deque
+
+import MySQLdb.connections
+from flask import g, has_app_context
+
+SLOW_QUERY_SECONDS = 0.2
+N_PLUS_ONE_THRESHOLD = 5    # runs of one SELECT in a request
+SLOW_LOG_SIZE = 100         # recent slow statements kept for the admin page
+STATEMENT_LIMIT = 500       # (endpoint, statement) pairs kept; the cheapest is dropped beyond it
+
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100)                                  # queries per request
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)  # SQL seconds per request
+
+log = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r'\s+')
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_MARKER_LIST = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))+\s*\)')
+_ROW_LIST = re.compile(r'\((?:\.\.\.)\)(?:\s*,\s*\((?:\.\.\.)\))+')
+
+
+def fingerprint(query):
+    """The statement shape of a query: literals as ?, placeholder lists as (...)."""
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    query = _WHITESPACE.sub(' ', query).strip()
+    query = _STRING.sub('?', query)
+    query = _NUMBER.sub('?', query)
+    query = _MARKER_LIST.sub('(...)', query)
+    return _ROW_LIST.sub('(...)', query)
+
+
+def statement_id(text):
+    """Short stable label for a fingerprint, used in /metrics."""
+    return hashlib.sha1(text.encode()).hexdigest()[:10]
+
+
+class RequestStats:
+    """The statements of one request: fingerprint -> [runs, seconds, rows, max seconds]."""
+
+    def __init__(self, slow_seconds=SLOW_QUERY_SECONDS):
+        self.slow_seconds = slow_seconds
+        self.statements = {}
+        self.queries = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.slow = []      # (fingerprint, seconds, rows)
+
+    def record(self, query, seconds, rows):
+        text = fingerprint(query)
+        entry = self.statements.setdefault(text, [0, 0.0, 0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] += rows
+        entry[3] = max(entry[3], seconds)
+        self.queries += 1
+        self.seconds += seconds
+        self.rows += rows
+        if seconds >= self.slow_seconds:
+            self.slow.append((text, seconds, rows))
+
+
+class _TimedCursor:
+    """Mixin over a MySQLdb cursor class that reports each statement to the request's RequestStats."""
+
+    _in_many = False
+
+    def _record(self, query, started):
+        stats = g.get('sql_request') if has_app_context() else None
+        if stats is not None:
+            stats.record(query, time.perf_counter() - started, max(self.rowcount or 0, 0))
+
+    def execute(self, query, args=None):
+        if self._in_many:
+            return super().execute(query, args)
+        started = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        finally:
+            self._record(query, started)
+
+    def executemany(self, query, args):
+        # MySQLdb runs executemany of anything but INSERT ... VALUES as one execute() per row
+        started = time.perf_counter()
+        self._in_many = True
+        try:
+            return super().executemany(query, args)
+        finally:
+            self._in_many = False
+            self._record(query, started)
+
+
+_timed_classes = {}
+_timed_lock = threading.Lock()
+
+
+def timed_cursor_class(cls):
+    """The timed subclass of a cursor class, created once per class."""
+    with _timed_lock:
+        if cls not in _timed_classes:
+            _timed_classes[cls] = type(f"Timed{cls.__name__}", (_TimedCursor, cls), {})
+        return _timed_classes[cls]
+
+
+class InstrumentedConnection(MySQLdb.connections.Connection):
+    """MySQLdb connection whose cursors are timed."""
+
+    def cursor(self, cursorclass=None):
+        return super().cursor(timed_cursor_class(cursorclass or self.cursorclass))
+
+
+def _histogram(buckets):
+    return {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+
+
+def _observe(histogram, buckets, value):
+    for i, bound in enumerate(buckets):
+        if value <= bound:
+            histogram['buckets'][i] += 1
+    histogram['sum'] += value
+    histogram['count'] += 1
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class SQLMetrics:
+    """Per-endpoint SQL totals since start (or the last reset)."""
+
+    def __init__(self, slow_seconds=SLOW_QUERY_SECONDS, n_plus_one=N_PLUS_ONE_THRESHOLD):
+        self.slow_seconds = slow_seconds
+        self.n_plus_one = n_plus_one
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.endpoints = {}     # endpoint -> totals and histograms
+            self.statements = {}    # (endpoint, fingerprint) -> totals
+            self.suspects = {}      # (endpoint, fingerprint) -> N+1 totals
+            self.slow_log = deque(maxlen=SLOW_LOG_SIZE)
+
+    def start(self):
+        """Begin collecting the current request's statements."""
+        g.sql_request = RequestStats(self.slow_seconds)
+
+    def finish(self, endpoint):
+        """Fold the current request's statements into the totals of endpoint."""
+        stats = g.pop('sql_request', None)
+        if stats is None:
+            return
+        endpoint = endpoint or '<unmatched>'
+        for text, seconds, rows in stats.slow:
+            log.warning("slow query (%.1f ms, %d rows) in %s: %s", seconds * 1000, rows, endpoint, text[:500])
+        repeated = [(text, entry[0]) for text, entry in stats.statements.items()
+                    if entry[0] >= self.n_plus_one and text[:6].upper() == 'SELECT']
+
+        with self._lock:
+            totals = self.endpoints.get(endpoint)
+            if totals is None:
+                totals = self.endpoints[endpoint] = {
+                    'requests': 0, 'queries': 0, 'seconds': 0.0, 'rows': 0, 'max_queries': 0, 'slow': 0,
+                    'n_plus_one': 0, 'queries_hist': _histogram(QUERY_BUCKETS),
+                    'seconds_hist': _histogram(SECONDS_BUCKETS)}
+            totals['requests'] += 1
+            totals['queries'] += stats.queries
+            totals['seconds'] += stats.seconds
+            totals['rows'] += stats.rows
+            totals['max_queries'] = max(totals['max_queries'], stats.queries)
+            totals['slow'] += len(stats.slow)
+            totals['n_plus_one'] += bool(repeated)
+            _observe(totals['queries_hist'], QUERY_BUCKETS, stats.queries)
+            _observe(totals['seconds_hist'], SECONDS_BUCKETS, stats.seconds)
+
+            for text, (runs, seconds, rows, slowest) in stats.statements.items():
+                entry = self.statements.setdefault((endpoint, text), {'runs': 0, 'seconds': 0.0, 'rows': 0,
+                                                                      'max_seconds': 0.0})
+                entry['runs'] += runs
+                entry['seconds'] += seconds
+                entry['rows'] += rows
+                entry['max_seconds'] = max(entry['max_seconds'], slowest)
+            while len(self.statements) > STATEMENT_LIMIT:
+                del self.statements[min(self.statements, key=lambda key: self.statements[key]['seconds'])]
+
+            for text, runs in repeated:
+                suspect = self.suspects.setdefault((endpoint, text), {'requests': 0, 'max_runs': 0})
+                suspect['requests'] += 1
+                suspect['max_runs'] = max(suspect['max_runs'], runs)
+            now = time.time()
+            for text, seconds, rows in stats.slow:
+                self.slow_log.appendleft({'at': now, 'endpoint': endpoint, 'sql': text, 'seconds': seconds,
+                                          'rows': rows})
+
+    def report(self, limit=25):
+        """Top offenders for the admin page: endpoints, statements, N+1 suspects and recent slow queries."""
+        with self._lock:
+            endpoints = [dict(name=name, **{k: v for k, v in totals.items() if not k.endswith('_hist')})
+                         for name, totals in self.endpoints.items()]
+            statements = [dict(endpoint=endpoint, sql=text, id=statement_id(text), **entry)
+                          for (endpoint, text), entry in self.statements.items()]
+            suspects = [dict(endpoint=endpoint, sql=text, id=statement_id(text), **entry)
+                        for (endpoint, text), entry in self.suspects.items()]
+            slow = list(self.slow_log)
+            started = self.started
+        for row in endpoints:
+            row['avg_queries'] = round(row['queries'] / row['requests'], 1)
+            row['avg_ms'] = round(row['seconds'] * 1000 / row['requests'], 2)
+        for row in statements:
+            row['avg_ms'] = round(row['seconds'] * 1000 / row['runs'], 2)
+            row['avg_rows'] = round(row['rows'] / row['runs'], 1)
+        endpoints.sort(key=lambda row: row['seconds'], reverse=True)
+        statements.sort(key=lambda row: row['seconds'], reverse=True)
+        suspects.sort(key=lambda row: (row['max_runs'], row['requests']), reverse=True)
+        return {'since': started, 'slow_seconds': self.slow_seconds, 'n_plus_one': self.n_plus_one,
+                'endpoints': endpoints[:limit], 'statements': statements[:limit], 'suspects': suspects[:limit],
+                'slow': slow[:limit]}
+
+    def prometheus(self):
+        """All totals in the Prometheus text exposition format."""
+        with self._lock:
+            endpoints = sorted(self.endpoints.items())
+            statements = sorted(self.statements.items())
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def histogram(name, key, buckets, help_text):
+            family(name, 'histogram', help_text)
+            for endpoint, totals in endpoints:
+                hist = totals[key]
+                label = f'endpoint="{_label(endpoint)}"'
+                for bound, count in zip(buckets, hist['buckets']):
+                    lines.append(f'{name}_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{{label},le="+Inf"}} {hist["count"]}')
+                lines.append(f'{name}_sum{{{label}}} {hist["sum"]}')
+                lines.append(f'{name}_count{{{label}}} {hist["count"]}')
+
+        histogram('sql_queries_per_request', 'queries_hist', QUERY_BUCKETS, 'SQL statements run per request.')
+        histogram('sql_request_seconds', 'seconds_hist', SECONDS_BUCKETS, 'Time spent in MySQL per request.')
+        for name, key, help_text in (
+                ('sql_rows_total', 'rows', 'Rows returned or affected.'),
+                ('sql_slow_queries_total', 'slow', 'Statements slower than the slow query threshold.'),
+                ('sql_n_plus_one_requests_total', 'n_plus_one', 'Requests that repeated one SELECT suspiciously often.')):
+            family(name, 'counter', help_text)
+            for endpoint, totals in endpoints:
+                lines.append(f'{name}{{endpoint="{_label(endpoint)}"}} {totals[key]}')
+
+        for name, key, help_text in (
+                ('sql_statement_executions_total', 'runs', 'Executions per endpoint and statement fingerprint.'),
+                ('sql_statement_seconds_total', 'seconds', 'Time per endpoint and statement fingerprint.')):
+            family(name, 'counter', help_text)
+            for (endpoint, text), entry in statements:
+                lines.append(f'{name}{{endpoint="{_label(endpoint)}",statement="{statement_id(text)}"}} {entry[key]}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,57 @@
+// Preserve sidebar scroll position on page load and prevent scroll jump
+document.addEventListener('DOMContentLoaded', function() {
+  const sidebar = document.getElementById('sidebar');
+  const sidebarList = document.getElementById('sidebar-list');
+  const activeLink = sidebarList.querySelector('a.active');
+
+  // Restore saved scroll position if available
+  const savedScrollTop = localStorage.getItem('sidebarScrollTop');
+  if (savedScrollTop !== null) {
+    sidebar.scrollTop = parseInt(savedScrollTop, 10);
+  } else if (activeLink) {
+    // Calculate the position to scroll so active link is centered in sidebar view
+    const sidebarRect = sidebar.getBoundingClientRect();
+    const activeRect = activeLink.getBoundingClientRect();
+    const offset = activeRect.top - sidebarRect.top;
+    const scrollTop = sidebar.scrollTop;
+    const scrollTo = scrollTop + offset - sidebar.clientHeight / 2 + activeLink.clientHeight / 2;
+
+    // Only scroll if active link is not fully visible in sidebar viewport
+    const isFullyVisible = activeRect.top >= sidebarRect.top && activeRect.bottom <= sidebarRect.bottom;
+    if (!isFullyVisible) {
+      sidebar.scrollTop = scrollTo;
+    }
+  }
+
+  // Save scroll position on scroll event
+  sidebar.addEventListener('scroll', function() {
+    localStorage.setItem('sidebarScrollTop', sidebar.scrollTop);
+  });
+});
+
+// Delete forms with data-delete-plan ask with the dry-run counts of the rows that go along
+// (/api/delete_plan, see cascade_delete.py); without them, the plain data-confirm question
+document.addEventListener('submit', function(event) {
+  const form = event.target;
+  if (!form.dataset.deletePlan) return;
+  event.preventDefault();
+  fetch(form.dataset.deletePlan, { credentials: 'same-origin', headers: { 'Accept': 'application/json' } })
+    .then(function(response) {
+      if (!response.ok) throw new Error(response.statusText);
+      return response.json();
+    })
+    .then(function(plan) {
+      const lines = plan.delete
+        .filter(function(item) { return item.table !== plan.table; })
+        .map(function(item) { return '  ' + item.table + ': ' + item.rows; });
+      const cleared = plan.set_null.map(function(item) { return '  ' + item.column + ': ' + item.rows; });
+      let message = form.dataset.confirm;
+      if (lines.length) message += '\n\nThis also deletes:\n' + lines.join('\n');
+      if (cleared.length) message += '\n\nand clears:\n' + cleared.join('\n');
+      return message;
+    })
+    .catch(function() { return form.dataset.confirm; })
+    .then(function(message) {
+      if (confirm(message)) form.submit();
+    });
+});
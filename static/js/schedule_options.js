@@ -0,0 +1,56 @@
+// Session -> department -> program -> course dropdowns of the schedule forms.
+// The whole tree comes from one /api/schedule_options request (see schedule_options.py);
+// every change after that is answered in the browser. Until it arrives the selects keep
+// the full lists rendered with the page.
+function cascadeScheduleOptions(url) {
+    var session = document.getElementById("session");
+    var department = document.getElementById("department");
+    var program = document.getElementById("program");
+    var course = document.getElementById("course");
+    var tree = null;
+
+    function fill(select, placeholder, items) {
+        select.innerHTML = "";
+        select.add(new Option(placeholder, ""));
+        (items || []).forEach(function (item) {
+            select.add(new Option(item[1], item[0]));
+        });
+    }
+
+    function find(items, id) {
+        return (items || []).find(function (item) { return String(item[0]) === id; });
+    }
+
+    function departmentsOf(sessionId) {
+        var found = find(tree.sessions, sessionId);
+        return found ? found[2] : [];
+    }
+
+    function programsOf(sessionId, deptId) {
+        var found = find(departmentsOf(sessionId), deptId);
+        return found ? found[2] : [];
+    }
+
+    session.addEventListener("change", function () {
+        if (!tree) return;
+        fill(department, "-- Select Department --", departmentsOf(session.value));
+        fill(program, "-- Select Program --", []);
+        fill(course, "-- Select Course --", []);
+    });
+
+    department.addEventListener("change", function () {
+        if (!tree) return;
+        fill(program, "-- Select Program --", programsOf(session.value, department.value));
+        fill(course, "-- Select Course --", []);
+    });
+
+    program.addEventListener("change", function () {
+        if (!tree) return;
+        fill(course, "-- Select Course --", tree.courses[department.value]);
+    });
+
+    fetch(url, { credentials: "same-origin" })
+        .then(function (response) { return response.json(); })
+        .then(function (data) { tree = data; })
+        .catch(function (error) { console.error("Error fetching schedule options:", error); });
+}
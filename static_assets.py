@@ -0,0 +1,196 @@
+"""Fingerprinted static assets with long-lived caching.
+
+The CSS and JS the pages share live in static/ (css/base.css and
+js/base.js for base.html, css/schedule/*.css for the standalone timetable
+pages) instead of inline blocks, and Bootstrap and Font Awesome are
+vendored under static/vendor/ so the app works without the CDNs.
+
+The build step copies css/, js/ and vendor/ into static/dist/: CSS and JS
+are minified (files already named *.min.* are left alone) and renamed
+with a hash of their content, e.g. dist/css/base.3f2a9c1b04.css, and
+static/dist/manifest.json maps each source path to its built file. Fonts
+and images keep their names, so the relative url()s in vendored CSS still
+resolve; the vendor folders carry the library version instead.
+
+Templates link assets with asset_url('css/base.css'). With a manifest it
+returns the fingerprinted file, which StaticAssets serves with
+Cache-Control: public, max-age=31536000, immutable; a changed file gets a
+new name, so browsers never need to revalidate. Without one (no build
+yet) it returns the source file, and a vendored file not downloaded yet
+falls back to its CDN URL. HTML pages keep their own no-store or
+conditional headers. The manifest is part of the page ETags
+(data_versions.code_version, taken at startup), so after a new build and
+restart the pages that link to it get new ETags.
+
+Usage (from the project root; --vendor needs network access once):
+
+    python static_assets.py --vendor    # download the vendored files that are missing, then build
+    python static_assets.py             # rebuild static/dist after changing a CSS or JS file
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import urllib.parse
+import urllib.request
+
+from flask import request, url_for
+
+DIST = 'dist'
+MANIFEST = 'dist/manifest.json'
+SOURCE_FOLDERS = ('css', 'js', 'vendor')
+HASH_LENGTH = 10
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Vendored file (under static/) -> where it is downloaded from
+VENDOR = {
+    'vendor/bootstrap-5.3.0/css/bootstrap.min.css':
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
+    'vendor/bootstrap-5.3.0/js/bootstrap.bundle.min.js':
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js',
+    'vendor/font-awesome-6.4.0/css/all.min.css':
+        'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css',
+}
+
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_CSS_SPACE = re.compile(r'\s+')
+_CSS_PUNCTUATION = re.compile(r'\s*([{};,])\s*')
+_CSS_URL = re.compile(r'''url\(\s*['"]?(?!data:|https?:|//)([^'")?#]+)''')
+
+
+def minify_css(text):
+    """Comments and insignificant whitespace removed; selectors and values left as written."""
+    text = _CSS_COMMENT.sub('', text)
+    text = _CSS_SPACE.sub(' ', text)
+    text = _CSS_PUNCTUATION.sub(r'\1', text)
+    return text.replace(';}', '}').strip() + '\n'
+
+
+def minify_js(text):
+    """Indentation, blank lines and whole-line // comments removed.
+
+    Line breaks are kept, so statements that rely on automatic semicolon
+    insertion still end where they did.
+    """
+    lines = (line.strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//')) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def download_vendor(static_folder, log=None):
+    """Download the VENDOR files missing from static_folder, with the fonts their CSS points to."""
+    pending = [(path, url) for path, url in VENDOR.items()]
+    while pending:
+        path, url = pending.pop()
+        target = os.path.join(static_folder, path)
+        if not os.path.isfile(target):
+            with urllib.request.urlopen(url, timeout=30) as response:
+                data = response.read()
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(data)
+            if log:
+                log(f"downloaded {path} ({len(data)} bytes)")
+        if path.endswith('.css'):
+            with open(target, encoding='utf-8') as f:
+                references = set(_CSS_URL.findall(f.read()))
+            for reference in sorted(references):
+                local = os.path.normpath(os.path.join(os.path.dirname(path), reference)).replace(os.sep, '/')
+                pending.append((local, urllib.parse.urljoin(url, reference)))
+
+
+def build(static_folder, log=None):
+    """Rebuild static_folder/dist from the source folders; return the manifest."""
+    dist = os.path.join(static_folder, DIST)
+    shutil.rmtree(dist, ignore_errors=True)
+    manifest = {}
+    for folder in SOURCE_FOLDERS:
+        for dirpath, _, filenames in os.walk(os.path.join(static_folder, folder)):
+            for name in sorted(filenames):
+                path = os.path.join(dirpath, name)
+                source = os.path.relpath(path, static_folder).replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    data = f.read()
+                stem, ext = os.path.splitext(source)
+                if ext in MINIFIERS and not stem.endswith('.min'):
+                    data = MINIFIERS[ext](data.decode('utf-8')).encode('utf-8')
+                if ext in MINIFIERS:
+                    built = f"{DIST}/{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}"
+                    manifest[source] = built
+                else:
+                    built = f"{DIST}/{source}"
+                target = os.path.join(static_folder, built)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, 'wb') as f:
+                    f.write(data)
+                if log and ext in MINIFIERS:
+                    log(f"{source:<52} -> {built} ({len(data)} bytes)")
+    with open(os.path.join(static_folder, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+class StaticAssets:
+    """asset_url() for templates, and immutable caching for the files it links to."""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.manifest = {}
+        self._mtime = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.add_template_global(self.url, 'asset_url')
+        app.after_request(self._cache_headers)
+
+    def _current_manifest(self):
+        # Reloaded when a build replaced it, so a running app picks up new files
+        path = os.path.join(self.app.static_folder, MANIFEST)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            mtime = None
+        if mtime != self._mtime:
+            manifest = {}
+            if mtime is not None:
+                with open(path, encoding='utf-8') as f:
+                    manifest = json.load(f)
+            self.manifest, self._mtime = manifest, mtime
+        return self.manifest
+
+    def url(self, path):
+        """URL of static/<path>: its fingerprinted build, else the source file, else its CDN copy."""
+        built = self._current_manifest().get(path)
+        if built:
+            return url_for('static', filename=built)
+        if path in VENDOR and not os.path.isfile(os.path.join(self.app.static_folder, path)):
+            return VENDOR[path]
+        return url_for('static', filename=path)
+
+    def _cache_headers(self, response):
+        filename = (request.view_args or {}).get('filename', '')
+        if request.endpoint == 'static' and filename.startswith(DIST + '/') and response.status_code in (200, 304):
+            response.headers['Cache-Control'] = IMMUTABLE
+        return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--vendor', action='store_true', help='download missing vendored files first')
+    args = parser.parse_args()
+
+    static_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    if args.vendor:
+        download_vendor(static_folder, log=print)
+    manifest = build(static_folder, log=print)
+    print(f"{len(manifest)} file(s) fingerprinted into static/{DIST}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""Incremental maintenance of the student_timetable_reports table.
+
+student_timetable_reports holds one row per (student, semester, course,
+day, slot) built from assign_courses_to_student, current_semester and
+schedule, with the course, faculty and room names copied in. The old
+populate_student_reports scripts emptied the table and refilled it with a
+single INSERT ... SELECT, which kept it locked for the whole run.
+
+Every refresh here is scoped to a set of (StudentID, SemesterID) pairs.
+The join is run for just those pairs and compared with the rows already
+stored; only the differences are written, new or changed rows as batched
+multi-row upserts and vanished rows as batched deletes. The routes that
+write schedule or assign_courses_to_student refresh the pairs they touch.
+rebuild() walks every student in StudentID chunks with the same diff and
+commits after each chunk.
+
+Usage (from the project root, after `python migrate.py`):
+
+    python student_reports.py --rebuild              # refresh every student
+    python student_reports.py --rebuild --chunk 1000
+    python student_reports.py --student 42 --student 43
+
+Renaming a course, faculty member or room does not go through these
+hooks; run --rebuild afterwards to refresh the copied names.
+"""
+import argparse
+
+import MySQLdb.cursors
+
+BATCH_SIZE = 1000   # rows per multi-row upsert / ids per DELETE
+CHUNK_SIZE = 500    # students (or student/semester pairs) per refresh step
+
+KEY_COLUMNS = ('StudentID', 'SemesterID', 'CourseID', 'DayOfWeek', 'SlotID')
+VALUE_COLUMNS = ('ProgramID', 'FacultyID', 'RoomID', 'CourseName', 'FacultyName', 'RoomNumber', 'StartTime', 'EndTime')
+COLUMNS = KEY_COLUMNS + VALUE_COLUMNS
+
+# The rows populate_student_reports_v3.py produced, limited by {where}
+SOURCE_QUERY = """
+    SELECT DISTINCT acs.StudentID, cs.SemesterID, sch.CourseID, sch.DayOfWeek, sch.SlotID,
+           acs.ProgramID, sch.FacultyID, sch.RoomID, c.CourseName,
+           CONCAT(f.FirstName, ' ', f.LastName) AS FacultyName, r.RoomNumber, ts.StartTime, ts.EndTime
+    FROM assign_courses_to_student acs
+    JOIN current_semester cs ON acs.CurrentSemesterID = cs.CurrentSemesterID
+    JOIN schedule sch ON sch.ProgramID = acs.ProgramID AND sch.SemesterID = cs.SemesterID AND sch.CourseID = acs.CourseID
+    JOIN courses c ON sch.CourseID = c.CourseID
+    JOIN faculty f ON sch.FacultyID = f.FacultyID
+    JOIN rooms r ON sch.RoomID = r.RoomID
+    JOIN time_slots ts ON sch.SlotID = ts.SlotID
+    JOIN students s ON acs.StudentID = s.StudentID
+    WHERE {where}
+"""
+
+STORED_QUERY = f"SELECT ReportID, {', '.join(COLUMNS)} FROM student_timetable_reports WHERE {{where}}"
+
+UPSERT = (f"INSERT INTO student_timetable_reports ({', '.join(COLUMNS)}) "
+          f"VALUES ({', '.join(['%s'] * len(COLUMNS))}) "
+          f"ON DUPLICATE KEY UPDATE {', '.join(f'{c} = VALUES({c})' for c in VALUE_COLUMNS)}")
+
+
+def _sync(cur, source_where, stored_where, params):
+    """Make the stored rows matching stored_where equal the join rows matching source_where.
+
+    Both filters must select the same students/semesters. Returns
+    (rows written, rows deleted).
+    """
+    cur.execute(SOURCE_QUERY.format(where=source_where), params)
+    wanted = {tuple(row[c] for c in KEY_COLUMNS): tuple(row[c] for c in VALUE_COLUMNS) for row in cur.fetchall()}
+
+    cur.execute(STORED_QUERY.format(where=stored_where), params)
+    stale = []
+    for row in cur.fetchall():
+        key = tuple(row[c] for c in KEY_COLUMNS)
+        if key not in wanted:
+            stale.append(row['ReportID'])
+        elif wanted[key] == tuple(row[c] for c in VALUE_COLUMNS):
+            del wanted[key]  # already up to date
+
+    for i in range(0, len(stale), BATCH_SIZE):
+        batch = stale[i:i + BATCH_SIZE]
+        cur.execute(f"DELETE FROM student_timetable_reports WHERE ReportID IN ({', '.join(['%s'] * len(batch))})", batch)
+    changed = [key + values for key, values in wanted.items()]
+    for i in range(0, len(changed), BATCH_SIZE):
+        cur.executemany(UPSERT, changed[i:i + BATCH_SIZE])
+    return len(changed), len(stale)
+
+
+def refresh_pairs(connection, pairs):
+    """Refresh the reports of the given (StudentID, SemesterID) pairs; return (written, deleted)."""
+    pairs = sorted({(int(student), int(semester)) for student, semester in pairs})
+    written = deleted = 0
+    cur = connection.cursor(MySQLdb.cursors.DictCursor)
+    for i in range(0, len(pairs), CHUNK_SIZE):
+        chunk = pairs[i:i + CHUNK_SIZE]
+        marks = ', '.join(['(%s, %s)'] * len(chunk))
+        w, d = _sync(cur, f"(acs.StudentID, cs.SemesterID) IN ({marks})", f"(StudentID, SemesterID) IN ({marks})",
+                     [value for pair in chunk for value in pair])
+        connection.commit()
+        written += w
+        deleted += d
+    cur.close()
+    return written, deleted
+
+
+def refresh_for_schedule(connection, *rows):
+    """Refresh every student who takes the course of any given schedule row.
+
+    Pass the row as it was before and after an edit, so students dropped
+    from the old course/semester are refreshed too. Rows only need
+    ProgramID, SemesterID and CourseID.
+    """
+    keys = sorted({(int(r['ProgramID']), int(r['SemesterID']), int(r['CourseID'])) for r in rows
+                   if r and r.get('ProgramID') and r.get('SemesterID') and r.get('CourseID')})
+    if not keys:
+        return 0, 0
+    cur = connection.cursor(MySQLdb.cursors.DictCursor)
+    pairs = set()
+    for i in range(0, len(keys), CHUNK_SIZE):
+        chunk = keys[i:i + CHUNK_SIZE]
+        cur.execute(f"""
+            SELECT DISTINCT acs.StudentID, cs.SemesterID
+            FROM assign_courses_to_student acs
+            JOIN current_semester cs ON acs.CurrentSemesterID = cs.CurrentSemesterID
+            WHERE (acs.ProgramID, cs.SemesterID, acs.CourseID) IN ({', '.join(['(%s, %s, %s)'] * len(chunk))})
+        """, [value for key in chunk for value in key])
+        pairs.update((row['StudentID'], row['SemesterID']) for row in cur.fetchall())
+    cur.close()
+    return refresh_pairs(connection, pairs)
+
+
+def refresh_for_assignment(connection, student_id, current_semester_id):
+    """Refresh one student's semester after an assign_courses_to_student change."""
+    cur = connection.cursor(MySQLdb.cursors.DictCursor)
+    cur.execute("SELECT SemesterID FROM current_semester WHERE CurrentSemesterID = %s", (current_semester_id,))
+    row = cur.fetchone()
+    cur.close()
+    if not row or row['SemesterID'] is None:
+        return 0, 0
+    return refresh_pairs(connection, [(student_id, row['SemesterID'])])
+
+
+def rebuild(connection, chunk_size=CHUNK_SIZE, log=None):
+    """Refresh every student, chunk_size students per transaction; return (written, deleted)."""
+    cur = connection.cursor(MySQLdb.cursors.DictCursor)
+    written = deleted = 0
+    last_id = 0
+    while True:
+        cur.execute("SELECT StudentID FROM students WHERE StudentID > %s ORDER BY StudentID LIMIT %s",
+                    (last_id, chunk_size))
+        ids = [row['StudentID'] for row in cur.fetchall()]
+        if not ids:
+            break
+        low, high = ids[0], ids[-1]
+        w, d = _sync(cur, "acs.StudentID BETWEEN %s AND %s", "StudentID BETWEEN %s AND %s", (low, high))
+        connection.commit()
+        written += w
+        deleted += d
+        last_id = high
+        if log:
+            log(f"students {low}-{high}: {w} written, {d} deleted")
+    cur.close()
+    return written, deleted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rebuild', action='store_true', help='refresh the reports of every student')
+    parser.add_argument('--chunk', type=int, default=CHUNK_SIZE, help='students per transaction for --rebuild')
+    parser.add_argument('--student', type=int, action='append', default=[], help='refresh one student (repeatable)')
+    args = parser.parse_args()
+    if not args.rebuild and not args.student:
+        parser.error("give --rebuild or --student")
+
+    from app import app, mysql
+
+    with app.app_context():
+        connection = mysql.connection
+        if args.rebuild:
+            written, deleted = rebuild(connection, args.chunk, log=print)
+        else:
+            cur = connection.cursor(MySQLdb.cursors.DictCursor)
+            cur.execute(f"""
+                SELECT DISTINCT acs.StudentID, cs.SemesterID
+                FROM assign_courses_to_student acs
+                JOIN current_semester cs ON acs.CurrentSemesterID = cs.CurrentSemesterID
+                WHERE acs.StudentID IN ({', '.join(['%s'] * len(args.student))})
+                UNION
+                SELECT StudentID, SemesterID FROM student_timetable_reports
+                WHERE StudentID IN ({', '.join(['%s'] * len(args.student))})
+            """, args.student * 2)
+            pairs = [(row['StudentID'], row['SemesterID']) for row in cur.fetchall()]
+            cur.close()
+            written, deleted = refresh_pairs(connection, pairs)
+        print(f"{written} row(s) written, {deleted} row(s) deleted.")
+
+
+if __name__ == '__main__':
+    main()
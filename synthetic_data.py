@@ -0,0 +1,321 @@
+"""Deterministic synthetic campus data at configurable scale.
+
+generate() builds the rows of every table in database_schema.sql from a
+seed and a few sizes; the same seed and sizes always give the same rows.
+load() writes them into a database created with create_database() (the
+schema plus the migrations), then rebuilds the tables derived from them:
+student_timetable_reports, attendance_rollups, and, through the migration
+triggers, schedule_view. It writes through data_versions.VersionedConnection
+like the app, so the data_versions counters move with every load.
+
+What gets generated, with the default sizes:
+
+- 20 departments, 1000 faculty, 20000 students, 400 rooms, 8 semesters,
+  4 sessions and 28 half-hour time slots a day from 08:00;
+- enough programs for --schedule classes a week: every program has
+  8 courses per semester and each course meets 3 times a week, so 60000
+  classes take 313 programs and 20032 courses;
+- the schedule itself, placed without conflicts: a room, a faculty member
+  and a program's semester hold at most one class per day and slot, and a
+  course meets at most once a day. Classes that find no free cell are
+  left out and counted (raise --rooms or --slots if that happens);
+- offered courses and teachers, one current semester per program, every
+  student assigned to and enrolled in the 8 courses of their program's
+  current semester, and --attendance-days days of attendance for each;
+- the legacy timetables table (one row per course) and an admin login
+  (admin / admin123). Faculty and students log in with their e-mail and
+  the password "password".
+
+Usage (from the project root; the database is dropped and created again):
+
+    python synthetic_data.py
+    python synthetic_data.py --database timetable_synthetic --students 20000 --faculty 1000 --rooms 400 \\
+        --schedule 60000 --seed 1
+"""
+import argparse
+import datetime
+import math
+import os
+import random
+import time
+
+import attendance_rollups
+import student_reports
+from data_versions import VersionedConnection
+from migrate import apply_migrations, split_statements
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+DAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday')
+TERM_START = datetime.date(2026, 8, 31)     # a Monday; every current semester starts here
+TERM_DAYS = 120
+FIRST_SLOT = datetime.datetime(2000, 1, 1, 8, 0)
+SLOT_MINUTES = 30
+PLACEMENT_TRIES = 30    # random cells tried per class before scanning them all
+BATCH_SIZE = 5000       # rows per multi-row INSERT
+PRESENT_RATE = 0.85
+
+DEFAULT_SIZES = {
+    'departments': 20,
+    'faculty': 1000,
+    'students': 20000,
+    'rooms': 400,
+    'schedule': 60000,
+    'semesters': 8,
+    'sessions': 4,
+    'slots': 28,                 # time slots per day
+    'courses_per_semester': 8,
+    'weekly_sessions': 3,        # classes per course per week
+    'attendance_days': 4,        # attendance dates per student and course
+}
+
+
+def program_count(sizes):
+    """Programs needed for sizes['schedule'] weekly classes."""
+    per_program = sizes['semesters'] * sizes['courses_per_semester'] * sizes['weekly_sessions']
+    return max(1, math.ceil(sizes['schedule'] / per_program))
+
+
+def _place(lessons, sizes, rng):
+    """Conflict-free (day, slot, room) for every weekly class; return (schedule rows, unplaced count)."""
+    days, slots, rooms = len(DAYS), sizes['slots'], sizes['rooms']
+    cells = days * slots
+    used_rooms = [0] * cells
+    busy = set()    # (cell, 'f', FacultyID) and (cell, 'p', ProgramID, SemesterID)
+    rows = []
+    unplaced = 0
+    for lesson in lessons:
+        faculty_key, group_key = ('f', lesson['FacultyID']), ('p', lesson['ProgramID'], lesson['SemesterID'])
+        used_days = set()
+
+        def free(cell):
+            return (used_rooms[cell] < rooms and cell // slots not in used_days
+                    and (cell, faculty_key) not in busy and (cell, group_key) not in busy)
+
+        for _ in range(lesson['Sessions']):
+            cell = next((c for c in (rng.randrange(cells) for _ in range(PLACEMENT_TRIES)) if free(c)), None)
+            if cell is None:
+                start = rng.randrange(cells)
+                cell = next((c % cells for c in range(start, start + cells) if free(c % cells)), None)
+            if cell is None:
+                unplaced += 1
+                continue
+            # Rooms are handed out in a different order in every cell so they fill evenly
+            room_id = (used_rooms[cell] + cell * 7) % rooms + 1
+            used_rooms[cell] += 1
+            used_days.add(cell // slots)
+            busy.add((cell, faculty_key))
+            busy.add((cell, group_key))
+            rows.append((lesson['CourseID'], lesson['FacultyID'], room_id, cell % slots + 1, DAYS[cell // slots],
+                         lesson['SemesterID'], lesson['ProgramID']))
+    return rows, unplaced
+
+
+def teaching_days(count):
+    """The first count Monday-Saturday dates of the term."""
+    dates = []
+    day = TERM_START
+    while len(dates) < count:
+        if day.weekday() < 6:
+            dates.append(day)
+        day += datetime.timedelta(days=1)
+    return dates
+
+
+def generate(sizes=None, seed=1):
+    """[(table, columns, rows)] in foreign key order, plus a summary dict."""
+    sizes = dict(DEFAULT_SIZES, **(sizes or {}))
+    rng = random.Random(seed)
+    tables = []
+    departments = range(1, sizes['departments'] + 1)
+    tables.append(('departments', ('DepartmentID', 'DepartmentName'), [(d, f"Department {d}") for d in departments]))
+
+    faculty_by_department = {}
+    faculty = []
+    for f in range(1, sizes['faculty'] + 1):
+        department = (f - 1) % sizes['departments'] + 1
+        faculty_by_department.setdefault(department, []).append(f)
+        faculty.append((f, f"Faculty{f}", f"Teacher{f}", f"faculty{f}@campus.example", 'password', department))
+    tables.append(('faculty', ('FacultyID', 'FirstName', 'LastName', 'Email', 'password', 'DepartmentID'), faculty))
+
+    tables.append(('semesters', ('SemesterID', 'SemesterName'),
+                   [(s, f"Semester {s}") for s in range(1, sizes['semesters'] + 1)]))
+    first_year = TERM_START.year - sizes['sessions'] + 1
+    tables.append(('sessions', ('SessionID', 'StartYear', 'EndYear'),
+                   [(s, first_year + s - 1, first_year + s + 3) for s in range(1, sizes['sessions'] + 1)]))
+    room_numbers = {r: f"{chr(ord('A') + (r - 1) // 100 % 26)}-{(r - 1) % 100 + 1:03d}"
+                    for r in range(1, sizes['rooms'] + 1)}
+    tables.append(('rooms', ('RoomID', 'RoomNumber'), list(room_numbers.items())))
+    slots = []
+    for s in range(1, sizes['slots'] + 1):
+        start = FIRST_SLOT + datetime.timedelta(minutes=SLOT_MINUTES * (s - 1))
+        slots.append((s, start.time(), (start + datetime.timedelta(minutes=SLOT_MINUTES)).time()))
+    tables.append(('time_slots', ('SlotID', 'StartTime', 'EndTime'), slots))
+
+    programs = []
+    courses = []
+    offered = []
+    teachers = []
+    lessons = []
+    current = []
+    courses_of = {}     # (ProgramID, SemesterID) -> [CourseID]
+    for p in range(1, program_count(sizes) + 1):
+        department = (p - 1) % sizes['departments'] + 1
+        programs.append((p, f"Program {p}", (p - 1) % sizes['sessions'] + 1, department))
+        current.append((p, p, rng.randint(1, sizes['semesters']), TERM_START,
+                        TERM_START + datetime.timedelta(days=TERM_DAYS)))
+        for semester in range(1, sizes['semesters'] + 1):
+            for k in range(sizes['courses_per_semester']):
+                course = len(courses) + 1
+                teacher = rng.choice(faculty_by_department.get(department) or [f[0] for f in faculty])
+                courses.append((course, f"Course {p}-{semester}-{k + 1}", department, teacher))
+                offered.append((course, course, semester, department))
+                teachers.append((course, teacher, course, department, p))
+                courses_of.setdefault((p, semester), []).append(course)
+                lessons.append({'CourseID': course, 'FacultyID': teacher, 'ProgramID': p, 'SemesterID': semester,
+                                'Sessions': sizes['weekly_sessions']})
+    # The last program only gets the classes still needed to reach sizes['schedule']
+    extra = sum(lesson['Sessions'] for lesson in lessons) - sizes['schedule']
+    for lesson in reversed(lessons):
+        if extra <= 0:
+            break
+        cut = min(extra, lesson['Sessions'])
+        lesson['Sessions'] -= cut
+        extra -= cut
+    tables.append(('offered_programs', ('ProgramID', 'ProgramName', 'SessionID', 'DepartmentID'), programs))
+    tables.append(('courses', ('CourseID', 'CourseName', 'DepartmentID', 'FacultyID'), courses))
+    tables.append(('offered_courses', ('OfferedCourseID', 'CourseID', 'SemesterID', 'DepartmentID'), offered))
+    tables.append(('offered_teachers', ('OfferedTeacherID', 'FacultyID', 'OfferedCourseID', 'DepartmentID',
+                                        'ProgramID'), teachers))
+    tables.append(('current_semester', ('CurrentSemesterID', 'ProgramID', 'SemesterID', 'StartDate', 'EndDate'),
+                   current))
+
+    rng.shuffle(lessons)
+    schedule, unplaced = _place(lessons, sizes, rng)
+    tables.append(('schedule', ('CourseID', 'FacultyID', 'RoomID', 'SlotID', 'DayOfWeek', 'SemesterID', 'ProgramID'),
+                   schedule))
+    slot_times = {slot[0]: slot[1:] for slot in slots}
+    first_class = {}
+    for row in schedule:
+        first_class.setdefault(row[0], row)
+    tables.append(('timetables', ('TimetableID', 'CourseID', 'DayOfWeek', 'StartTime', 'EndTime', 'RoomNumber',
+                                  'TaughtBy'),
+                   [(i, course, row[4], *slot_times[row[3]], room_numbers[row[2]], row[1])
+                    for i, (course, row) in enumerate(sorted(first_class.items()), 1)]))
+
+    students, assignments, enrolled, attendance = [], [], [], []
+    dates = teaching_days(sizes['attendance_days'])
+    current_of = {program: (current_id, semester) for current_id, program, semester, _, _ in current}
+    for s in range(1, sizes['students'] + 1):
+        program = (s - 1) % len(programs) + 1
+        _, _, session, department = programs[program - 1]
+        students.append((s, f"Student{s}", f"Learner{s}", f"EN{s:06d}", f"student{s}@campus.example", 'password',
+                         department))
+        current_id, semester = current_of[program]
+        for course in courses_of[(program, semester)]:
+            assignments.append((s, program, session, current_id, course, 'Yes', 'No'))
+            enrolled.append((s, course, semester))
+            for date in dates:
+                attendance.append((s, course, date, 'Present' if rng.random() < PRESENT_RATE else 'Absent'))
+    tables.append(('students', ('StudentID', 'FirstName', 'LastName', 'EnrollmentNo', 'Email', 'password',
+                                'DepartmentID'), students))
+    tables.append(('assign_courses_to_student', ('StudentID', 'ProgramID', 'SessionID', 'CurrentSemesterID',
+                                                 'CourseID', 'Allowed', 'Is_Repeater'), assignments))
+    tables.append(('enrolledstudents', ('StudentID', 'CourseID', 'SemesterID'), enrolled))
+    tables.append(('attendance', ('StudentID', 'CourseID', 'AttendanceDate', 'AttendanceStatus'), attendance))
+    tables.append(('admin', ('username', 'password'), [('admin', 'admin123')]))
+
+    summary = {'seed': seed, 'sizes': sizes, 'programs': len(programs), 'courses': len(courses),
+               'schedule': len(schedule), 'unplaced': unplaced, 'rows': {name: len(rows) for name, _, rows in tables}}
+    return tables, summary
+
+
+def connect(config, name=None, connection_class=VersionedConnection):
+    """A connection to the configured server (and database name) that moves data_versions on commit."""
+    kwargs = {'db': name} if name else {}
+    return connection_class(host=config['MYSQL_HOST'], user=config['MYSQL_USER'], passwd=config['MYSQL_PASSWORD'],
+                            **kwargs)
+
+
+def create_database(config, name, connection_class=VersionedConnection):
+    """Drop and create database name with database_schema.sql and the migrations; return a connection to it."""
+    conn = connect(config, connection_class=connection_class)
+    cur = conn.cursor()
+    cur.execute(f"DROP DATABASE IF EXISTS `{name}`")
+    cur.execute(f"CREATE DATABASE `{name}`")
+    conn.close()
+    conn = connect(config, name, connection_class)
+    with open(os.path.join(ROOT, 'database_schema.sql'), encoding='utf-8') as f:
+        cur = conn.cursor()
+        for statement in split_statements(f.read()):
+            if statement.upper().startswith('CREATE TABLE'):
+                cur.execute(statement)
+    conn.commit()
+    apply_migrations(conn, log=lambda message: None)
+    return conn
+
+
+def insert_many(cur, table, columns, rows):
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    for i in range(0, len(rows), BATCH_SIZE):
+        cur.executemany(sql, rows[i:i + BATCH_SIZE])
+
+
+def load(conn, tables, log=None):
+    """Insert the generated tables, then rebuild the derived ones."""
+    cur = conn.cursor()
+    for table, columns, rows in tables:
+        start = time.perf_counter()
+        insert_many(cur, table, columns, rows)
+        conn.commit()
+        if log:
+            log(f"{table:<28} {len(rows):>9} rows {time.perf_counter() - start:8.1f} s")
+    cur.execute("ANALYZE TABLE schedule, schedule_view, attendance, assign_courses_to_student")
+    cur.fetchall()
+    cur.close()
+    start = time.perf_counter()
+    written, _ = student_reports.rebuild(conn)
+    if log:
+        log(f"{'student_timetable_reports':<28} {written:>9} rows {time.perf_counter() - start:8.1f} s")
+    start = time.perf_counter()
+    written = attendance_rollups.backfill(conn)
+    if log:
+        log(f"{'attendance_rollups':<28} {written:>9} rows {time.perf_counter() - start:8.1f} s")
+
+
+def add_size_arguments(parser):
+    """--students, --faculty, ... for every size, defaulting to DEFAULT_SIZES."""
+    for name, value in DEFAULT_SIZES.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=value, dest=name)
+    parser.add_argument('--seed', type=int, default=1)
+
+
+def sizes_from(args):
+    return {name: getattr(args, name) for name in DEFAULT_SIZES}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', default='timetable_synthetic', help='database to (re)create')
+    add_size_arguments(parser)
+    args = parser.parse_args()
+
+    from app import app
+
+    if args.database == app.config['MYSQL_DB']:
+        parser.error(f"{args.database} is the app's own database; choose another name")
+    start = time.perf_counter()
+    tables, summary = generate(sizes_from(args), args.seed)
+    print(f"Generated {sum(summary['rows'].values())} rows in {time.perf_counter() - start:.1f} s "
+          f"({summary['programs']} programs, {summary['courses']} courses, {summary['schedule']} classes, "
+          f"{summary['unplaced']} unplaced)")
+    conn = create_database(app.config, args.database)
+    try:
+        load(conn, tables, log=print)
+    finally:
+        conn.close()
+    print(f"Database {args.database} ready.")
+
+
+if __name__ == '__main__':
+    main()
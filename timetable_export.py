@@ -0,0 +1,413 @@
+"""Streaming timetable export as CSV, XLSX or iCalendar (ICS).
+
+The schedule joined with courses, faculty, rooms, time slots, programs and
+semesters is read through a server-side cursor (SSDictCursor) and turned
+into file bytes as it arrives, so memory stays flat whether the export is
+one faculty member or the whole institution. The rows are ordered by the
+split key first, which the schedule indexes of migration 0002 serve
+without a sort.
+
+Splits:
+
+    (none)    one file with every matching row
+    program   one part per program
+    faculty   one part per faculty member
+    room      one part per room
+
+A split CSV or ICS export is a ZIP archive with one file per part, and a
+split XLSX export is one workbook with a sheet per part. XLSX is written
+here directly (inline strings, one sheet at a time) because openpyxl
+cannot stream a workbook to a response before it is complete.
+
+Usage:
+
+    python timetable_export.py --format csv --output timetable.csv
+    python timetable_export.py --format xlsx --split faculty --semester 2
+    python timetable_export.py --format ics --split room --output rooms.zip
+"""
+import argparse
+import csv
+import datetime
+import io
+import re
+import zipfile
+from xml.sax.saxutils import escape, quoteattr
+
+import MySQLdb.cursors
+
+from timetable_grid import time_label
+
+FORMATS = ('csv', 'xlsx', 'ics')
+SPLITS = ('program', 'faculty', 'room')
+
+# Rows fetched from the server-side cursor per round trip
+FETCH_SIZE = 1000
+# Rows written between two yields of the output stream
+FLUSH_ROWS = 500
+
+MIMETYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'ics': 'text/calendar',
+    'zip': 'application/zip',
+}
+
+# current_semester has no unique key on (ProgramID, SemesterID): the term dates are
+# grouped per pair so a duplicate row cannot export a class twice
+EXPORT_QUERY = """
+    SELECT s.ScheduleID, s.ProgramID, s.SemesterID, s.FacultyID, s.RoomID, s.DayOfWeek, s.DayNo,
+           op.ProgramName, sem.SemesterName, c.CourseName,
+           CONCAT_WS(' ', f.FirstName, f.LastName) AS FacultyName, r.RoomNumber,
+           ts.StartTime, ts.EndTime, cs.StartDate, cs.EndDate
+    FROM schedule s
+    JOIN courses c ON s.CourseID = c.CourseID
+    JOIN faculty f ON s.FacultyID = f.FacultyID
+    JOIN rooms r ON s.RoomID = r.RoomID
+    JOIN time_slots ts ON s.SlotID = ts.SlotID
+    LEFT JOIN offered_programs op ON s.ProgramID = op.ProgramID
+    LEFT JOIN semesters sem ON s.SemesterID = sem.SemesterID
+    LEFT JOIN (
+        SELECT ProgramID, SemesterID, MIN(StartDate) AS StartDate, MAX(EndDate) AS EndDate
+        FROM current_semester
+        GROUP BY ProgramID, SemesterID
+    ) cs ON cs.ProgramID = s.ProgramID AND cs.SemesterID = s.SemesterID
+    WHERE {where}
+    ORDER BY {order}
+"""
+
+# ORDER BY per split; each follows the leading columns of a schedule index
+ORDERS = {
+    None: 's.ProgramID, s.SemesterID, s.DayNo, s.SlotID',
+    'program': 's.ProgramID, s.SemesterID, s.DayNo, s.SlotID',
+    'faculty': 's.FacultyID, s.DayNo, s.SlotID',
+    'room': 's.RoomID, s.DayNo, s.SlotID',
+}
+
+SPLIT_KEYS = {
+    'program': ('ProgramID', 'ProgramName'),
+    'faculty': ('FacultyID', 'FacultyName'),
+    'room': ('RoomID', 'RoomNumber'),
+}
+
+FILTERS = (('program_id', 's.ProgramID'), ('semester_id', 's.SemesterID'),
+           ('faculty_id', 's.FacultyID'), ('room_id', 's.RoomID'))
+
+HEADER = ('Program', 'Semester', 'Day', 'Start', 'End', 'Course', 'Faculty', 'Room')
+
+
+def export_rows(connection, split=None, **filters):
+    """Yield the matching schedule rows one at a time from a server-side cursor.
+
+    filters: program_id, semester_id, faculty_id, room_id (None = all).
+    The connection cannot run other queries until the generator is done.
+    """
+    where, params = ['1 = 1'], []
+    for name, column in FILTERS:
+        if filters.get(name) is not None:
+            where.append(f"{column} = %s")
+            params.append(filters[name])
+    cur = connection.cursor(MySQLdb.cursors.SSDictCursor)
+    try:
+        cur.execute(EXPORT_QUERY.format(where=' AND '.join(where), order=ORDERS[split]), params)
+        while True:
+            rows = cur.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cur.close()
+
+
+def row_values(row):
+    return (row['ProgramName'] or '', row['SemesterName'] or '', row['DayOfWeek'], time_label(row['StartTime']),
+            time_label(row['EndTime']), row['CourseName'], row['FacultyName'], row['RoomNumber'])
+
+
+def _groups(rows, split):
+    """Yield (name, rows of that part) for consecutive rows sharing the split key."""
+    if split is None:
+        yield 'timetable', rows
+        return
+    key_column, name_column = SPLIT_KEYS[split]
+    rows = iter(rows)
+    pending = [next(rows, None)]
+
+    def part(key):
+        while pending[0] is not None and pending[0][key_column] == key:
+            yield pending[0]
+            pending[0] = next(rows, None)
+
+    while pending[0] is not None:
+        first = pending[0]
+        key = first[key_column]
+        yield f"{first[name_column] or split} {key}", part(key)
+        # Skip whatever the consumer left of this part
+        for _ in part(key):
+            pass
+
+
+def _safe_name(name, limit=80):
+    return re.sub(r'[^\w.-]+', '_', name).strip('_')[:limit] or 'part'
+
+
+class _Sink:
+    """Write-only file object the output generator drains after each write."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+# -------------------- CSV --------------------
+
+def _csv_chunks(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(HEADER)
+    for i, row in enumerate(rows, start=1):
+        writer.writerow(row_values(row))
+        if i % FLUSH_ROWS == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+# -------------------- ICS --------------------
+
+def ics_text(value):
+    return (str(value or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def ics_line(line):
+    """Fold a content line at 75 octets (RFC 5545 section 3.1)."""
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line + '\r\n'
+    parts, start, limit = [], 0, 75
+    while start < len(data):
+        end = min(start + limit, len(data))
+        while end < len(data) and (data[end] & 0xC0) == 0x80:  # do not split a UTF-8 sequence
+            end -= 1
+        parts.append(data[start:end].decode('utf-8'))
+        start, limit = end, 74
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _time_of(value):
+    label = time_label(value)
+    return datetime.time(int(label[:2]), int(label[3:5])) if label else datetime.time(0, 0)
+
+
+def first_date(day_no, start_date):
+    """First date on or after start_date that falls on ISO weekday day_no."""
+    return start_date + datetime.timedelta(days=(day_no - start_date.isoweekday()) % 7)
+
+
+def ics_event(row, stamp, uid_domain='timetable'):
+    """VEVENT lines for one weekly schedule row, repeating between the semester's StartDate and EndDate.
+
+    Without current_semester dates the event starts this week and repeats
+    without an end.
+    """
+    start_date = row.get('StartDate')
+    if start_date is None:
+        today = datetime.date.today()
+        start_date = today - datetime.timedelta(days=today.isoweekday() - 1)
+    day = first_date(row['DayNo'] or 1, start_date)
+    start = datetime.datetime.combine(day, _time_of(row['StartTime']))
+    end = datetime.datetime.combine(day, _time_of(row['EndTime']))
+    description = ' - '.join(str(v) for v in (row['FacultyName'], row.get('ProgramName'), row.get('SemesterName')) if v)
+    rule = 'FREQ=WEEKLY'
+    if row.get('EndDate') is not None:
+        rule += f";UNTIL={row['EndDate'].strftime('%Y%m%d')}T235959"
+    lines = [
+        'BEGIN:VEVENT',
+        f"UID:schedule-{row['ScheduleID']}@{uid_domain}",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART:{start.strftime('%Y%m%dT%H%M%S')}",
+        f"DTEND:{end.strftime('%Y%m%dT%H%M%S')}",
+        f"RRULE:{rule}",
+        f"SUMMARY:{ics_text(row['CourseName'])}",
+        f"LOCATION:{ics_text(row['RoomNumber'])}",
+        f"DESCRIPTION:{ics_text(description)}",
+        'END:VEVENT',
+    ]
+    return ''.join(ics_line(line) for line in lines)
+
+
+def ics_header(name):
+    return ''.join(ics_line(line) for line in ('BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//Timetable//Export//EN',
+                                               'CALSCALE:GREGORIAN', f"X-WR-CALNAME:{ics_text(name)}"))
+
+
+ICS_FOOTER = 'END:VCALENDAR\r\n'
+
+
+def _ics_chunks(rows, name):
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    parts = [ics_header(name)]
+    for i, row in enumerate(rows, start=1):
+        parts.append(ics_event(row, stamp))
+        if i % FLUSH_ROWS == 0:
+            yield ''.join(parts).encode('utf-8')
+            parts = []
+    parts.append(ICS_FOOTER)
+    yield ''.join(parts).encode('utf-8')
+
+
+# -------------------- XLSX --------------------
+
+_XML = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+_MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_ILLEGAL_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _xlsx_row(number, values):
+    cells = ''.join(f'<c t="inlineStr"><is><t xml:space="preserve">{escape(_ILLEGAL_XML.sub("", str(v)))}</t></is></c>'
+                    for v in values)
+    return f'<row r="{number}">{cells}</row>'
+
+
+def _sheet_title(name, used):
+    title = re.sub(r'[\[\]:*?/\\]', ' ', name).strip()[:31] or 'Sheet'
+    base, n = title, 2
+    while title.lower() in used:
+        suffix = f" ({n})"
+        title, n = base[:31 - len(suffix)] + suffix, n + 1
+    used.add(title.lower())
+    return title
+
+
+def _xlsx_chunks(rows, split):
+    sink = _Sink()
+    titles, used = [], set()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as book:
+        for name, part in _groups(rows, split):
+            titles.append(_sheet_title(name, used))
+            with book.open(f"xl/worksheets/sheet{len(titles)}.xml", 'w') as sheet:
+                sheet.write(f'{_XML}<worksheet xmlns="{_MAIN_NS}"><sheetData>{_xlsx_row(1, HEADER)}'.encode())
+                for number, row in enumerate(part, start=2):
+                    sheet.write(_xlsx_row(number, row_values(row)).encode('utf-8'))
+                    if number % FLUSH_ROWS == 0:
+                        yield sink.take()
+                sheet.write(b'</sheetData></worksheet>')
+            yield sink.take()
+        if not titles:
+            titles.append('timetable')
+            book.writestr('xl/worksheets/sheet1.xml', f'{_XML}<worksheet xmlns="{_MAIN_NS}"><sheetData>'
+                                                      f'{_xlsx_row(1, HEADER)}</sheetData></worksheet>')
+
+        numbers = range(1, len(titles) + 1)
+        sheet_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml'
+        book.writestr('[Content_Types].xml', (
+            f'{_XML}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            + ''.join(f'<Override PartName="/xl/worksheets/sheet{n}.xml" ContentType="{sheet_type}"/>'
+                      for n in numbers)
+            + '</Types>'))
+        book.writestr('_rels/.rels', (
+            f'{_XML}<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'<Relationship Id="rId1" Type="{_REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+            '</Relationships>'))
+        book.writestr('xl/workbook.xml', (
+            f'{_XML}<workbook xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}"><sheets>'
+            + ''.join(f'<sheet name={quoteattr(title)} sheetId="{n}" r:id="rId{n}"/>'
+                      for n, title in zip(numbers, titles))
+            + '</sheets></workbook>'))
+        book.writestr('xl/_rels/workbook.xml.rels', (
+            f'{_XML}<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + ''.join(f'<Relationship Id="rId{n}" Type="{_REL_NS}/worksheet" Target="worksheets/sheet{n}.xml"/>'
+                      for n in numbers)
+            + '</Relationships>'))
+    yield sink.take()
+
+
+# -------------------- Entry points --------------------
+
+def _zip_chunks(rows, split, fmt):
+    sink = _Sink()
+    used = set()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, part in _groups(rows, split):
+            filename = _safe_name(name)
+            while filename.lower() in used:
+                filename += '_'
+            used.add(filename.lower())
+            with archive.open(f"{filename}.{fmt}", 'w') as member:
+                chunks = _csv_chunks(part) if fmt == 'csv' else _ics_chunks(part, name)
+                for chunk in chunks:
+                    member.write(chunk)
+                    yield sink.take()
+    yield sink.take()
+
+
+def output_type(fmt, split=None):
+    """(file extension, mimetype) of an export."""
+    if split and fmt in ('csv', 'ics'):
+        return 'zip', MIMETYPES['zip']
+    return fmt, MIMETYPES[fmt]
+
+
+def stream_export(connection, fmt, split=None, **filters):
+    """Yield the export file as byte chunks; see export_rows() for the filters."""
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown export format {fmt!r}")
+    if split is not None and split not in SPLITS:
+        raise ValueError(f"unknown export split {split!r}")
+    rows = export_rows(connection, split, **filters)
+    if fmt == 'xlsx':
+        chunks = _xlsx_chunks(rows, split)
+    elif split:
+        chunks = _zip_chunks(rows, split, fmt)
+    elif fmt == 'csv':
+        chunks = _csv_chunks(rows)
+    else:
+        chunks = _ics_chunks(rows, 'Timetable')
+    for chunk in chunks:
+        if chunk:
+            yield chunk
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('--split', choices=SPLITS)
+    parser.add_argument('--program', type=int)
+    parser.add_argument('--semester', type=int)
+    parser.add_argument('--faculty', type=int)
+    parser.add_argument('--room', type=int)
+    parser.add_argument('--output', help='file to write (default timetable[_<split>].<ext>)')
+    args = parser.parse_args()
+
+    from app import app, mysql
+
+    extension, _ = output_type(args.format, args.split)
+    output = args.output or f"timetable{'_' + args.split if args.split else ''}.{extension}"
+    size = 0
+    with app.app_context(), open(output, 'wb') as f:
+        for chunk in stream_export(mysql.connection, args.format, args.split, program_id=args.program,
+                                   semester_id=args.semester, faculty_id=args.faculty, room_id=args.room):
+            f.write(chunk)
+            size += len(chunk)
+    print(f"Wrote {output} ({size} bytes)")
+
+
+if __name__ == '__main__':
+    main()
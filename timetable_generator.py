@@ -0,0 +1,238 @@
+"""Automatic timetable generator.
+
+Builds schedule rows for the programs listed in current_semester from
+offered_courses/offered_teachers, rooms and time_slots. It follows the
+same rules add_class enforces:
+
+- a room is never booked twice in the same day/slot
+- a faculty member is never booked twice in the same day/slot
+- a course is held at most once per program per day
+
+and additionally never gives a program two classes in the same slot.
+Rows already in `schedule` are kept and worked around, so the generator
+can also top up a partly filled timetable.
+
+Usage (from the project root):
+
+    python timetable_generator.py --program 3 --semester 2
+    python timetable_generator.py --all --sessions 3 --dry-run
+
+The same generator is available to admins at /timetable/generate.
+"""
+import argparse
+import random
+from collections import Counter
+
+from occupancy_index import OccupancyIndex
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+
+# Weekly sessions per course when nothing more specific is known
+SESSIONS_PER_WEEK = 2
+
+SCHEDULE_COLUMNS = ('CourseID', 'FacultyID', 'RoomID', 'SlotID', 'DayOfWeek', 'SemesterID', 'ProgramID')
+
+
+def generate_timetable(lessons, rooms, slots, days=DAYS, existing=(), sessions_per_week=SESSIONS_PER_WEEK,
+                       attempts=5, seed=0):
+    """Place every lesson into a (day, slot, room).
+
+    lessons  -- dicts with CourseID, FacultyID, ProgramID, SemesterID and an
+                optional Sessions count
+    rooms    -- RoomIDs to choose from
+    slots    -- SlotIDs in time order
+    existing -- schedule rows that are already booked and must be kept
+
+    Returns (placements, unplaced). placements are new schedule rows;
+    unplaced lists the lessons that could not get all their sessions,
+    with Missing and Reason keys. The first attempt is deterministic;
+    later attempts shuffle ties and only run if something was left over.
+    """
+    existing = list(existing)
+    rng = random.Random(seed)
+    best = None
+    for attempt in range(max(1, attempts)):
+        result = _place(lessons, rooms, slots, days, existing, sessions_per_week, rng if attempt else None)
+        if best is None or _missing(result[1]) < _missing(best[1]):
+            best = result
+        if not best[1]:
+            break
+    return best
+
+
+def _missing(unplaced):
+    return sum(u['Missing'] for u in unplaced)
+
+
+def _place(lessons, rooms, slots, days, existing, sessions_per_week, rng):
+    index = OccupancyIndex()
+    index.load(existing)
+
+    already = Counter((r['ProgramID'], r['SemesterID'], r['CourseID']) for r in existing)
+    program_day_load = Counter((r['ProgramID'], r['SemesterID'], r['DayOfWeek']) for r in existing)
+
+    # Most constrained first: busiest faculty, then busiest programs
+    faculty_load = Counter()
+    program_load = Counter()
+    for lesson in lessons:
+        need = lesson.get('Sessions') or sessions_per_week
+        faculty_load[lesson['FacultyID']] += need
+        program_load[(lesson['ProgramID'], lesson['SemesterID'])] += need
+    tiebreak = (lambda: rng.random()) if rng else (lambda: 0)
+    order = sorted(lessons, key=lambda l: (-faculty_load[l['FacultyID']],
+                                           -program_load[(l['ProgramID'], l['SemesterID'])],
+                                           tiebreak()))
+
+    # First room that might still be free for each (day, slot); rooms are
+    # only ever taken, so everything before the cursor stays busy.
+    room_cursor = {}
+    placements = []
+    unplaced = []
+    next_id = -1
+
+    for lesson in order:
+        program, semester = lesson['ProgramID'], lesson['SemesterID']
+        course, faculty = lesson['CourseID'], lesson['FacultyID']
+        need = (lesson.get('Sessions') or sessions_per_week) - already[(program, semester, course)]
+        for placed in range(max(0, need)):
+            # Spread a program's week: try its least loaded days first
+            day_order = sorted(days, key=lambda d: (program_day_load[(program, semester, d)], tiebreak()))
+            spot = None
+            for day in day_order:
+                if index.course_conflict(program, day, course, semester):
+                    continue
+                for slot in slots:
+                    if index.faculty_conflict(faculty, slot, day):
+                        continue
+                    if index.program_conflict(program, slot, day, semester):
+                        continue
+                    i = room_cursor.get((day, slot), 0)
+                    while i < len(rooms) and index.room_conflict(rooms[i], slot, day):
+                        i += 1
+                    room_cursor[(day, slot)] = i
+                    if i < len(rooms):
+                        spot = (day, slot, rooms[i])
+                        break
+                if spot:
+                    break
+
+            if not spot:
+                unplaced.append(dict(lesson, Missing=need - placed,
+                                     Reason="No day/slot with the faculty, program and a room all free."))
+                break
+
+            day, slot, room = spot
+            row = {'CourseID': course, 'FacultyID': faculty, 'RoomID': room, 'SlotID': slot,
+                   'DayOfWeek': day, 'SemesterID': semester, 'ProgramID': program}
+            index.add(next_id, row)
+            next_id -= 1
+            program_day_load[(program, semester, day)] += 1
+            placements.append(row)
+
+    return placements, unplaced
+
+
+def find_conflicts(rows):
+    """Return (reason, row) pairs for every rule broken within rows."""
+    conflicts = []
+    seen_room, seen_faculty, seen_program, seen_course = set(), set(), set(), set()
+    for row in rows:
+        checks = (
+            (seen_room, (row['RoomID'], row['DayOfWeek'], row['SlotID']), "Room double-booked"),
+            (seen_faculty, (row['FacultyID'], row['DayOfWeek'], row['SlotID']), "Faculty double-booked"),
+            (seen_program, (row['ProgramID'], row['SemesterID'], row['DayOfWeek'], row['SlotID']), "Program has two classes in one slot"),
+            (seen_course, (row['ProgramID'], row['SemesterID'], row['DayOfWeek'], row['CourseID']), "Course held twice on one day"),
+        )
+        for seen, key, reason in checks:
+            if key in seen:
+                conflicts.append((reason, row))
+            seen.add(key)
+    return conflicts
+
+
+# -------------------- Database I/O --------------------
+
+def load_inputs(cur, program_id=None, semester_id=None):
+    """Read lessons, rooms, slots and existing bookings with a DictCursor.
+
+    Lessons come from offered_teachers/offered_courses for the
+    program/semester pairs in current_semester. When a course has more
+    than one teacher for a program, the first one is used.
+    """
+    query = """
+        SELECT oc.CourseID, ot.FacultyID, ot.ProgramID, cs.SemesterID
+        FROM offered_teachers ot
+        JOIN offered_courses oc ON ot.OfferedCourseID = oc.OfferedCourseID
+        JOIN current_semester cs ON cs.ProgramID = ot.ProgramID AND cs.SemesterID = oc.SemesterID
+    """
+    conditions = []
+    params = []
+    if program_id:
+        conditions.append("ot.ProgramID = %s")
+        params.append(program_id)
+    if semester_id:
+        conditions.append("cs.SemesterID = %s")
+        params.append(semester_id)
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY ot.ProgramID, cs.SemesterID, oc.CourseID, ot.OfferedTeacherID"
+    cur.execute(query, tuple(params))
+    lessons = {}
+    for row in cur.fetchall():
+        lessons.setdefault((row['ProgramID'], row['SemesterID'], row['CourseID']), row)
+
+    cur.execute("SELECT RoomID FROM rooms ORDER BY RoomID")
+    rooms = [r['RoomID'] for r in cur.fetchall()]
+    cur.execute("SELECT SlotID FROM time_slots ORDER BY StartTime")
+    slots = [s['SlotID'] for s in cur.fetchall()]
+    cur.execute("SELECT ScheduleID, CourseID, FacultyID, RoomID, SlotID, DayOfWeek, SemesterID, ProgramID FROM schedule")
+    existing = cur.fetchall()
+    return list(lessons.values()), rooms, slots, existing
+
+
+def save_placements(cur, placements):
+    """Insert generated rows; the caller commits."""
+    if placements:
+        cur.executemany(
+            "INSERT INTO schedule (CourseID, FacultyID, RoomID, SlotID, DayOfWeek, SemesterID, ProgramID) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            [tuple(row[c] for c in SCHEDULE_COLUMNS) for row in placements])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a conflict-free timetable into the schedule table.")
+    parser.add_argument('--program', type=int, help='ProgramID to fill')
+    parser.add_argument('--semester', type=int, help='SemesterID to fill')
+    parser.add_argument('--all', action='store_true', help='fill every program/semester in current_semester')
+    parser.add_argument('--sessions', type=int, default=SESSIONS_PER_WEEK, help='weekly sessions per course')
+    parser.add_argument('--dry-run', action='store_true', help='print the result without saving it')
+    args = parser.parse_args()
+    if not args.all and not args.program:
+        parser.error("give --program (and optionally --semester) or --all")
+
+    import MySQLdb.cursors
+    import student_reports
+    from app import app, mysql
+
+    with app.app_context():
+        cur = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        lessons, rooms, slots, existing = load_inputs(cur, args.program, args.semester)
+        placements, unplaced = generate_timetable(lessons, rooms, slots, existing=existing,
+                                                  sessions_per_week=args.sessions)
+        for row in placements:
+            print("{DayOfWeek:<10} slot {SlotID:<4} room {RoomID:<5} course {CourseID:<5} "
+                  "faculty {FacultyID:<5} program {ProgramID}/{SemesterID}".format(**row))
+        for lesson in unplaced:
+            print(f"UNPLACED course {lesson['CourseID']} program {lesson['ProgramID']}: "
+                  f"{lesson['Missing']} session(s) missing. {lesson['Reason']}")
+        if not args.dry_run:
+            save_placements(cur, placements)
+            mysql.connection.commit()
+            student_reports.refresh_for_schedule(mysql.connection, *placements)
+        cur.close()
+        print(f"{len(placements)} classes {'would be ' if args.dry_run else ''}scheduled, "
+              f"{len(unplaced)} course(s) incomplete.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Day x slot grids for the timetable pages.
+
+The faculty and student timetable templates used to loop over every
+schedule row for every day and every slot, reformatting times on each
+pass. These helpers place every row into its cell in one pass and
+precompute all the time labels, so the templates only walk a ready-made
+matrix.
+"""
+import datetime
+
+
+def time_label(value):
+    """Format a TIME column (timedelta from MySQLdb, time or string) as HH:MM."""
+    if isinstance(value, datetime.timedelta):
+        seconds = value.seconds
+        return f"{seconds // 3600:02d}:{(seconds % 3600) // 60:02d}"
+    if isinstance(value, datetime.time):
+        return value.strftime('%H:%M')
+    return str(value)[:5] if value is not None else ''
+
+
+def slot_headers(time_slots):
+    """Column headers: one dict per time slot with its HH:MM labels."""
+    headers = []
+    for slot in time_slots:
+        start, end = time_label(slot['StartTime']), time_label(slot['EndTime'])
+        headers.append({'SlotID': slot['SlotID'], 'Start': start, 'End': end, 'Label': f"{start} - {end}"})
+    return headers
+
+
+def build_grid(schedules, days, time_slots):
+    """Lay schedule rows out as [{'day': name, 'cells': [[row, ...] per slot]}].
+
+    Rows need DayOfWeek and SlotID; each gets a TimeLabel. Rows on days or
+    slots outside the grid are left out, as the old template loops did.
+    """
+    slot_pos = {slot['SlotID']: i for i, slot in enumerate(time_slots)}
+    rows = [{'day': day, 'cells': [[] for _ in time_slots]} for day in days]
+    day_pos = {day: rows[i]['cells'] for i, day in enumerate(days)}
+    for sched in schedules:
+        cells = day_pos.get(sched['DayOfWeek'])
+        pos = slot_pos.get(sched['SlotID'])
+        if cells is None or pos is None:
+            continue
+        sched['TimeLabel'] = f"{time_label(sched['StartTime'])} - {time_label(sched['EndTime'])}"
+        cells[pos].append(sched)
+    return rows
+
+
+def group_by_faculty(schedules, faculties, days, time_slots):
+    """Map FacultyID -> {'faculty', 'schedules', 'grid'} in faculty order.
+
+    Schedules are bucketed by FacultyID in a single pass instead of
+    filtering the whole list once per faculty member.
+    """
+    by_faculty = {}
+    for sched in schedules:
+        by_faculty.setdefault(sched['FacultyID'], []).append(sched)
+    grouped = {}
+    for faculty in faculties:
+        rows = by_faculty.get(faculty['FacultyID'], [])
+        grouped[faculty['FacultyID']] = {
+            'faculty': faculty,
+            'schedules': rows,
+            'grid': build_grid(rows, days, time_slots) if rows else [],
+        }
+    return grouped